@@ -2,14 +2,18 @@ from __future__ import annotations
 
 import collections
 import functools
+import itertools
 import logging
 import random
 import secrets
+import time
 import warnings
 from argparse import Namespace
+from array import array
 from collections import Counter, deque, defaultdict
-from collections.abc import Collection, MutableSequence
+from collections.abc import Collection, MutableMapping, MutableSequence, MutableSet
 from enum import IntEnum, IntFlag
+from types import MemberDescriptorType
 from typing import (AbstractSet, Any, Callable, ClassVar, Dict, Iterable, Iterator, List, Literal, Mapping, NamedTuple,
                     Optional, Protocol, Set, Tuple, Union, TYPE_CHECKING, Literal, overload)
 import dataclasses
@@ -19,6 +23,7 @@ from typing_extensions import NotRequired, TypedDict
 import NetUtils
 import Options
 import Utils
+import tracing
 
 if TYPE_CHECKING:
     from entrance_rando import ERPlacementState
@@ -87,6 +92,8 @@ class MultiWorld():
     progression_balancing: Dict[int, Options.ProgressionBalancing]
     completion_condition: Dict[int, Callable[[CollectionState], bool]]
     indirect_connections: Dict[Region, Set[Entrance]]
+    region_graphs: Dict[int, RegionGraph]
+    """Compiled region graphs of the players using World.compiled_region_graph, set by freeze_region_graphs"""
     exclude_locations: Dict[int, Options.ExcludeLocations]
     priority_locations: Dict[int, Options.PriorityLocations]
     start_inventory: Dict[int, Options.StartInventory]
@@ -166,6 +173,7 @@ class MultiWorld():
         self.early_items = {player: {} for player in self.player_ids}
         self.local_early_items = {player: {} for player in self.player_ids}
         self.indirect_connections = {}
+        self.region_graphs = {}
         self.start_inventory_from_pool: Dict[int, Options.StartInventoryPool] = {}
         self.plando_item_blocks = {}
 
@@ -513,6 +521,17 @@ class MultiWorld():
         state.can_reach(Region) in the Entrance's traversal condition, as opposed to pure transition logic."""
         self.indirect_connections.setdefault(region, set()).add(entrance)
 
+    def freeze_region_graphs(self) -> None:
+        """Compiles the region graphs of all worlds using World.compiled_region_graph, once entrances are connected.
+        CollectionStates created afterwards search those players' regions over the compiled graphs."""
+        for player in self.player_ids:
+            if self.worlds[player].compiled_region_graph:
+                graph = RegionGraph.compile(self, player)
+                if graph:
+                    self.region_graphs[player] = graph
+                else:
+                    logging.debug(f"Not compiling the region graph of player {player}, it has open or foreign exits.")
+
     def get_locations(self, player: Optional[int] = None) -> Iterable[Location]:
         if player is not None:
             return self.regions.location_cache[player].values()
@@ -527,11 +546,11 @@ class MultiWorld():
 
     def get_reachable_locations(self, state: Optional[CollectionState] = None, player: Optional[int] = None) -> List[Location]:
         state: CollectionState = state if state else self.state
-        return [location for location in self.get_locations(player) if location.can_reach(state)]
+        return state.reachable_locations(self.get_locations(player))
 
     def get_placeable_locations(self, state=None, player=None) -> List[Location]:
         state: CollectionState = state if state else self.state
-        return [location for location in self.get_locations(player) if location.item is None and location.can_reach(state)]
+        return state.reachable_locations(location for location in self.get_locations(player) if location.item is None)
 
     def get_unfilled_locations_for_players(self, location_names: List[str], players: Iterable[int]):
         for player in players:
@@ -567,7 +586,7 @@ class MultiWorld():
         if starting_state:
             if self.has_beaten_game(starting_state):
                 return True
-            state = starting_state.copy()
+            state = starting_state.copy(copy_on_write=True)
         else:
             state = CollectionState(self)
             if self.has_beaten_game(state):
@@ -581,79 +600,86 @@ class MultiWorld():
 
         return False
 
-    def get_spheres(self) -> Iterator[Set[Location]]:
+    def get_spheres(self, sphere_index: Optional[SphereIndex] = None) -> Iterator[Set[Location]]:
         """
         yields a set of locations for each logical sphere
 
         If there are unreachable locations, the last sphere of reachable
         locations is followed by an empty set, and then a set of all of the
         unreachable locations.
+
+        :param sphere_index: index of the multiworld as it is now to read the spheres from, instead of sweeping
         """
-        state = CollectionState(self)
-        locations = set(self.get_filled_locations())
+        if sphere_index:
+            yield from sphere_index.get_spheres()
+            return
 
-        while locations:
-            sphere: Set[Location] = set()
+        state = CollectionState(self)
+        frontier = LocationFrontier(state, self.get_filled_locations())
 
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+        while frontier.remaining:
+            sphere = set(frontier.find_reachable())
             yield sphere
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
+                yield frontier.remaining  # unreachable locations
                 break
 
             for location in sphere:
                 state.collect(location.item, True, location)
-            locations -= sphere
+            frontier.remove(sphere)
 
-    def get_sendable_spheres(self) -> Iterator[Set[Location]]:
+    def get_sendable_spheres(self, sphere_index: Optional[SphereIndex] = None) -> Iterator[Set[Location]]:
         """
         yields a set of multiserver sendable locations (location.item.code: int) for each logical sphere
 
         If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
         and then a set of all of the unreachable locations.
+
+        :param sphere_index: index of the multiworld as it is now to read the spheres from, instead of sweeping
         """
+        if sphere_index:
+            yield from sphere_index.get_sendable_spheres()
+            return
+
         state = CollectionState(self)
-        locations: Set[Location] = set()
-        events: Set[Location] = set()
+        locations: List[Location] = []
+        events: List[Location] = []
         for location in self.get_filled_locations():
             if type(location.item.code) is int and type(location.address) is int:
-                locations.add(location)
+                locations.append(location)
             else:
-                events.add(location)
-
-        while locations:
-            sphere: Set[Location] = set()
+                events.append(location)
+        frontier = LocationFrontier(state, locations)
+        event_frontier = LocationFrontier(state, events)
 
+        while frontier.remaining:
             # cull events out
-            done_events: Set[Union[Location, None]] = {None}
+            done_events = event_frontier.find_reachable()
             while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
+                for event in done_events:
+                    state.collect(event.item, True, event)
+                event_frontier.remove(done_events)
+                done_events = event_frontier.find_reachable()
 
+            sphere = set(frontier.find_reachable())
             yield sphere
             if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
+                yield frontier.remaining  # unreachable locations
                 break
 
             for location in sphere:
                 state.collect(location.item, True, location)
-            locations -= sphere
+            frontier.remove(sphere)
+
+    def fulfills_accessibility(self, state: Optional[CollectionState] = None,
+                               sphere_index: Optional[SphereIndex] = None):
+        """
+        Check if accessibility rules are fulfilled with current or supplied state.
 
-    def fulfills_accessibility(self, state: Optional[CollectionState] = None):
-        """Check if accessibility rules are fulfilled with current or supplied state."""
-        if not state:
+        :param sphere_index: index of the multiworld as it is now to start from, if no state is supplied
+        """
+        index = None if state else sphere_index
+        if not state and not index:
             state = CollectionState(self)
         players: Dict[str, Set[int]] = {
             "minimal": set(),
@@ -684,6 +710,14 @@ class MultiWorld():
 
         locations = [location for location in self.get_locations() if location_relevant(location)]
 
+        if index:
+            # everything reachable was already collected into the index's state, leaving just unfilled locations
+            state = index.state
+            locations = [location for location in locations if location not in index.sphere_of]
+            beatable_fulfilled = self.has_beaten_game(state)
+            if all_done():
+                return True
+
         while locations:
             sphere: List[Location] = []
             for n in range(len(locations) - 1, -1, -1):
@@ -718,30 +752,174 @@ class MultiWorld():
 PathValue = Tuple[str, Optional["PathValue"]]
 
 
+class ItemIndex:
+    """Dense integer ids for the item names of a world and precomputed ids for its item name groups."""
+    __slots__ = ("ids", "group_ids")
+
+    ids: Dict[str, int]
+    group_ids: Dict[str, Tuple[int, ...]]
+
+    def __init__(self, item_names: Iterable[str], item_name_groups: Mapping[str, AbstractSet[str]]):
+        names = set(item_names)
+        for group in item_name_groups.values():
+            names |= group
+        self.ids = {name: index for index, name in enumerate(sorted(names))}
+        self.group_ids = {group_name: tuple(sorted(self.ids[item_name] for item_name in group))
+                          for group_name, group in item_name_groups.items()}
+
+
+class ItemCounts(MutableMapping):
+    """
+    Counter compatible item counts of one player, backed by an array indexed by an ItemIndex.
+    Names that are not part of the index, like event items, are kept in a dict.
+    Unlike Counter, a count of 0 for an indexed name is treated like the name being absent, and arithmetic operators
+    are not supported.
+    """
+    __slots__ = ("index", "counts", "extra")
+
+    index: ItemIndex
+    counts: array
+    extra: Dict[str, int]
+
+    def __init__(self, index: ItemIndex):
+        self.index = index
+        self.counts = array("q", bytes(8 * len(index.ids)))
+        self.extra = {}
+
+    def __getitem__(self, item: str) -> int:
+        index = self.index.ids.get(item)
+        if index is None:
+            return self.extra.get(item, 0)
+        return self.counts[index]
+
+    def __setitem__(self, item: str, count: int) -> None:
+        index = self.index.ids.get(item)
+        if index is None:
+            self.extra[item] = count
+        else:
+            self.counts[index] = count
+
+    def __delitem__(self, item: str) -> None:
+        index = self.index.ids.get(item)
+        if index is None:
+            self.extra.pop(item, None)
+        else:
+            self.counts[index] = 0
+
+    def __contains__(self, item: object) -> bool:
+        index = self.index.ids.get(item)  # type: ignore[arg-type]
+        if index is None:
+            return item in self.extra
+        return self.counts[index] != 0
+
+    def __iter__(self) -> Iterator[str]:
+        counts = self.counts
+        for item, index in self.index.ids.items():
+            if counts[index]:
+                yield item
+        yield from self.extra
+
+    def __len__(self) -> int:
+        return len(self.counts) - self.counts.count(0) + len(self.extra)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({dict(self.items())})"
+
+    def get(self, item: str, default: Any = None) -> Any:
+        return self[item] if item in self else default
+
+    def copy(self) -> ItemCounts:
+        new = ItemCounts.__new__(ItemCounts)
+        new.index = self.index
+        new.counts = self.counts[:]
+        new.extra = self.extra.copy()
+        return new
+
+    def total(self) -> int:
+        return sum(self.counts) + sum(self.extra.values())
+
+    def update(self, other: Union[Mapping[str, int], Iterable[str], None] = None, /, **kwargs: int) -> None:
+        """Adds the counts of other, like Counter.update, instead of replacing them like dict.update."""
+        if other is not None:
+            if isinstance(other, Mapping):
+                for item, count in other.items():
+                    self[item] += count
+            else:
+                for item in other:
+                    self[item] += 1
+        for item, count in kwargs.items():
+            self[item] += count
+
+    def subtract(self, other: Union[Mapping[str, int], Iterable[str], None] = None, /, **kwargs: int) -> None:
+        """Subtracts the counts of other, like Counter.subtract."""
+        if other is not None:
+            if isinstance(other, Mapping):
+                for item, count in other.items():
+                    self[item] -= count
+            else:
+                for item in other:
+                    self[item] -= 1
+        for item, count in kwargs.items():
+            self[item] -= count
+
+    def most_common(self, n: Optional[int] = None) -> List[Tuple[str, int]]:
+        return Counter(dict(self.items())).most_common(n)
+
+    def elements(self) -> Iterator[str]:
+        return Counter(dict(self.items())).elements()
+
+
 class CollectionState():
-    prog_items: Dict[int, Counter[str]]
+    prog_items: Dict[int, Union[Counter[str], ItemCounts]]
     multiworld: MultiWorld
     reachable_regions: Dict[int, Set[Region]]
-    blocked_connections: Dict[int, Set[Entrance]]
+    blocked_connections: Dict[int, Union[Set[Entrance], RegionGraph.EntranceSet]]
     advancements: Set[Location]
     path: Dict[Union[Region, Entrance], PathValue]
     locations_checked: Set[Location]
     stale: Dict[int, bool]
     allow_partial_entrances: bool
+    changed_items: Dict[int, Set[str]]
+    """Item names changed since the last reachability update, only for players using World.rule_dependency_index"""
+    dependent_connections: Dict[int, Dict[str, Set[Entrance]]]
+    """Blocked Entrances by the item names their access_rule declared, shared between copies of a state"""
+    undeclared_connections: Dict[int, Set[Entrance]]
+    """Blocked Entrances that have to be re-tested on every update, shared between copies of a state"""
+    shared_players: Set[int]
+    """Players whose prog_items, reachable_regions and blocked_connections may be shared with a copy-on-write copy or
+    still be needed to roll back to a checkpoint"""
+    checkpoints: List[CollectionStateCheckpoint]
+    """Checkpoints that can still be rolled back to, innermost last"""
+    checked_log: List[Location]
+    """Locations added to locations_checked while there are checkpoints"""
+    advancement_log: List[Location]
+    """Locations added to advancements while there are checkpoints"""
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
 
     def __init__(self, parent: MultiWorld, allow_partial_entrances: bool = False):
         assert parent.worlds, "CollectionState created without worlds initialized in parent"
-        self.prog_items = {player: Counter() for player in parent.get_all_ids()}
+        self.prog_items = {player: ItemCounts(parent.worlds[player].get_item_index())
+                           if parent.worlds[player].indexed_prog_items else Counter()
+                           for player in parent.get_all_ids()}
         self.multiworld = parent
-        self.reachable_regions = {player: set() for player in parent.get_all_ids()}
-        self.blocked_connections = {player: set() for player in parent.get_all_ids()}
+        self.reachable_regions = {}
+        self.blocked_connections = {}
+        for player in parent.get_all_ids():
+            self.reachable_regions[player], self.blocked_connections[player] = self._new_reachability(player)
         self.advancements = set()
         self.path = {}
         self.locations_checked = set()
         self.stale = {player: True for player in parent.get_all_ids()}
         self.allow_partial_entrances = allow_partial_entrances
+        self.changed_items = {player: set() for player in parent.get_all_ids()
+                              if parent.worlds[player].rule_dependency_index}
+        self.dependent_connections = {player: defaultdict(set) for player in self.changed_items}
+        self.undeclared_connections = {player: set() for player in self.changed_items}
+        self.shared_players = set()
+        self.checkpoints = []
+        self.checked_log = []
+        self.advancement_log = []
         for function in self.additional_init_functions:
             function(self, parent)
         for items in parent.precollected_items.values():
@@ -752,23 +930,42 @@ class CollectionState():
         self.stale[player] = False
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
-        queue = deque(self.blocked_connections[player])
+        if player in self.changed_items:
+            queue = deque(self._get_connections_to_retest(player))
+        else:
+            queue = deque(self.blocked_connections[player])
         start: Region = world.get_region(world.origin_region_name)
 
+        if player in self.shared_players:
+            # a copy-on-write copy only needs its own structures once reachability actually changes
+            if start in reachable_regions and self._connections_stay_blocked(player, queue):
+                return
+            self._unshare(player)
+            reachable_regions = self.reachable_regions[player]
+
         # init on first call - this can't be done on construction since the regions don't exist yet
         if start not in reachable_regions:
             reachable_regions.add(start)
             self.blocked_connections[player].update(start.exits)
             queue.extend(start.exits)
 
-        if world.explicit_indirect_conditions:
+        if type(self.blocked_connections[player]) is RegionGraph.EntranceSet:
+            self._update_reachable_regions_compiled(player, queue, world.explicit_indirect_conditions)
+        elif world.explicit_indirect_conditions:
             self._update_reachable_regions_explicit_indirect_conditions(player, queue)
         else:
             self._update_reachable_regions_auto_indirect_conditions(player, queue)
 
+    def _new_reachability(self, player: int) -> Tuple[Set[Region], Union[Set[Entrance], RegionGraph.EntranceSet]]:
+        """Creates empty reachable_regions and blocked_connections for the player, the latter as a
+        RegionGraph.EntranceSet if the player's region graph is compiled"""
+        graph = self.multiworld.region_graphs.get(player)
+        return set(), graph.entrance_set() if graph else set()
+
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
+        indexed = player in self.changed_items
         # run BFS on all connections, and keep track of those blocked by missing items
         while queue:
             connection = queue.popleft()
@@ -777,6 +974,8 @@ class CollectionState():
                 blocked_connections.remove(connection)
             elif connection.can_reach(self):
                 if self.allow_partial_entrances and not new_region:
+                    if indexed:
+                        self.undeclared_connections[player].add(connection)
                     continue
                 assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
                 reachable_regions.add(new_region)
@@ -789,10 +988,13 @@ class CollectionState():
                 for new_entrance in self.multiworld.indirect_connections.get(new_region, set()):
                     if new_entrance in blocked_connections and new_entrance not in queue:
                         queue.append(new_entrance)
+            elif indexed:
+                self._index_blocked_connection(player, connection)
 
     def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
+        indexed = player in self.changed_items
         new_connection: bool = True
         # run BFS on all connections, and keep track of those blocked by missing items
         while new_connection:
@@ -804,6 +1006,8 @@ class CollectionState():
                     blocked_connections.remove(connection)
                 elif connection.can_reach(self):
                     if self.allow_partial_entrances and not new_region:
+                        if indexed:
+                            self.undeclared_connections[player].add(connection)
                         continue
                     assert new_region, f"tried to search through an Entrance \"{connection}\" with no connected Region"
                     reachable_regions.add(new_region)
@@ -812,24 +1016,257 @@ class CollectionState():
                     queue.extend(new_region.exits)
                     self.path[new_region] = (new_region.name, self.path.get(connection, None))
                     new_connection = True
+                elif indexed:
+                    self._index_blocked_connection(player, connection)
+            # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
+            if indexed:
+                # connections with declared item dependencies cannot be unblocked by newly reached regions
+                queue.extend(self.undeclared_connections[player] & blocked_connections)
+            else:
+                queue.extend(blocked_connections)
+
+    def _update_reachable_regions_compiled(self, player: int, queue: deque, explicit_indirect_conditions: bool):
+        """
+        Same search as on sets, but over the ids of the player's RegionGraph. Free entrances that still have no
+        access_rule are passed as soon as their parent region is reached instead of being queued and tested.
+        """
+        reachable_regions = self.reachable_regions[player]
+        graph: RegionGraph = self.multiworld.region_graphs[player]
+        blocked: bytearray = self.blocked_connections[player].flags
+        path = self.path
+        regions = graph.regions
+        entrances = graph.entrances
+        entrance_ids = graph.entrance_ids
+        entrance_targets = graph.entrance_targets
+        free_entrances = graph.free_entrances
+        default_rule = default_access_rule
+        exit_offsets = graph.exit_offsets
+        indirect_offsets = graph.indirect_offsets
+        indirect_entrances = graph.indirect_entrances
+        indexed = player in self.changed_items
+        queue = deque(map(entrance_ids.__getitem__, queue))
+        passed: deque[int] = deque()
+        new_connection: bool = True
+        # run BFS on all connections, and keep track of those blocked by missing items
+        while new_connection:
+            new_connection = False
+            while queue:
+                connection_id = queue.popleft()
+                if regions[entrance_targets[connection_id]] in reachable_regions:
+                    blocked[connection_id] = 0
+                elif entrances[connection_id].can_reach(self):
+                    blocked[connection_id] = 0
+                    passed.append(connection_id)
+                    while passed:
+                        passed_id = passed.popleft()
+                        new_region_id = entrance_targets[passed_id]
+                        new_region = regions[new_region_id]
+                        if new_region in reachable_regions:
+                            continue
+                        reachable_regions.add(new_region)
+                        path[new_region] = (new_region.name, path.get(entrances[passed_id], None))
+                        # a region's exits have consecutive ids
+                        for exit_id in range(exit_offsets[new_region_id], exit_offsets[new_region_id + 1]):
+                            exit_ = entrances[exit_id]
+                            # access rules may still be set after the graph was compiled
+                            if not free_entrances[exit_id] or exit_.access_rule is not default_rule:
+                                blocked[exit_id] = 1
+                                queue.append(exit_id)
+                            elif regions[entrance_targets[exit_id]] not in reachable_regions:
+                                # what Entrance.can_reach would do, without testing anything
+                                if not exit_.hide_path and exit_ not in path:
+                                    path[exit_] = (exit_.name, path[new_region])
+                                passed.append(exit_id)
+                        if explicit_indirect_conditions:
+                            # Retry connections if the new region can unblock them
+                            for indirect_id in indirect_entrances[indirect_offsets[new_region_id]:
+                                                                  indirect_offsets[new_region_id + 1]]:
+                                if blocked[indirect_id] and indirect_id not in queue:
+                                    queue.append(indirect_id)
+                    new_connection = not explicit_indirect_conditions
+                elif indexed:
+                    self._index_blocked_connection(player, entrances[connection_id])
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
-            queue.extend(blocked_connections)
+            if new_connection:
+                if indexed:
+                    # connections with declared item dependencies cannot be unblocked by newly reached regions
+                    queue.extend(entrance_id for entrance_id in map(entrance_ids.__getitem__,
+                                                                    self.undeclared_connections[player])
+                                 if blocked[entrance_id])
+                else:
+                    queue.extend(self.blocked_connections[player].ids())
+
+    def _connections_stay_blocked(self, player: int, queue: deque) -> bool:
+        """Tests if none of the queued connections can be passed, without modifying reachable or blocked sets."""
+        reachable_regions = self.reachable_regions[player]
+        indexed = player in self.changed_items
+        for connection in queue:
+            new_region = connection.connected_region
+            if new_region in reachable_regions:
+                return False
+            elif connection.can_reach(self):
+                if new_region or not self.allow_partial_entrances:
+                    return False
+                if indexed:
+                    self.undeclared_connections[player].add(connection)
+            elif indexed:
+                self._index_blocked_connection(player, connection)
+        return True
+
+    def _index_blocked_connection(self, player: int, connection: Entrance) -> None:
+        """Remembers which items can unblock a connection, or that it has to be re-tested on every update."""
+        dependencies: Optional[AbstractSet[str]] = getattr(connection.access_rule, "item_dependencies", None)
+        if dependencies is None or type(connection).can_reach is not Entrance.can_reach:
+            self.undeclared_connections[player].add(connection)
+        else:
+            dependent_connections = self.dependent_connections[player]
+            for item_name in dependencies:
+                dependent_connections[item_name].add(connection)
+
+    def _get_connections_to_retest(self, player: int) -> Set[Entrance]:
+        """Collects the blocked connections that may have been unblocked by the items changed since the last update."""
+        blocked_connections = self.blocked_connections[player]
+        dependent_connections = self.dependent_connections[player]
+        changed_items = self.changed_items[player]
+        retest = self.undeclared_connections[player] & blocked_connections
+        for item_name in changed_items:
+            if item_name in dependent_connections:
+                retest |= dependent_connections[item_name] & blocked_connections
+        changed_items.clear()
+        return retest
+
+    def copy(self, copy_on_write: bool = False) -> CollectionState:
+        """
+        Creates an independent copy of this state.
 
-    def copy(self) -> CollectionState:
+        :param copy_on_write: Share each player's prog_items, reachable_regions and blocked_connections between both
+            states until either of them changes that player's data through collect(), remove(), add_item(),
+            remove_item(), set_item() or a reachability update, instead of copying all of them upfront.
+            Code writing to these structures directly has to use a regular copy.
+        """
+        if tracing.current:
+            tracing.current.count("copy-on-write state copies" if copy_on_write else "state copies")
         ret = CollectionState(self.multiworld)
-        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
-        ret.reachable_regions = {player: region_set.copy() for player, region_set in
-                                 self.reachable_regions.items()}
-        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
-                                   self.blocked_connections.items()}
+        if copy_on_write:
+            ret.prog_items = self.prog_items.copy()
+            ret.reachable_regions = self.reachable_regions.copy()
+            ret.blocked_connections = self.blocked_connections.copy()
+            ret.shared_players = set(self.prog_items)
+            self.shared_players.update(ret.shared_players)
+            for checkpoint in self.checkpoints:
+                checkpoint.copied = True
+        else:
+            ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
+            ret.reachable_regions = {player: region_set.copy() for player, region_set in
+                                     self.reachable_regions.items()}
+            ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
+                                       self.blocked_connections.items()}
         ret.advancements = self.advancements.copy()
         ret.path = self.path.copy()
         ret.locations_checked = self.locations_checked.copy()
         ret.allow_partial_entrances = self.allow_partial_entrances
+        ret.changed_items = {player: changed.copy() for player, changed in self.changed_items.items()}
+        # the dependency index only ever grows and every lookup is filtered by blocked_connections, so it can be shared
+        ret.dependent_connections = self.dependent_connections
+        ret.undeclared_connections = self.undeclared_connections
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
 
+    def _unshare(self, player: int) -> None:
+        """
+        Replaces the player's structures that may be shared with a copy-on-write copy or be needed to roll back to a
+        checkpoint by private copies.
+        """
+        self.shared_players.remove(player)
+        mixins: Optional[CollectionState] = None
+        for checkpoint in self.checkpoints:
+            if player not in checkpoint.players:
+                checkpoint.players[player] = (self.prog_items[player], self.reachable_regions[player],
+                                              self.blocked_connections[player])
+            if not checkpoint.mixins_saved:
+                # the first change since the checkpoint, logic mixins can only have changed along with the items
+                if mixins is None:
+                    mixins = self._copy_mixins()
+                checkpoint.mixins = mixins
+                checkpoint.mixins_saved = True
+        self.prog_items[player] = self.prog_items[player].copy()
+        self.reachable_regions[player] = self.reachable_regions[player].copy()
+        self.blocked_connections[player] = self.blocked_connections[player].copy()
+
+    def _copy_mixins(self) -> Optional[CollectionState]:
+        """Returns a placeholder state holding a copy of the state added by logic mixins, if there are any."""
+        if not self.additional_copy_functions:
+            return None
+        mixins = CollectionState.__new__(CollectionState)
+        mixins.multiworld = self.multiworld
+        for function in self.additional_copy_functions:
+            function(self, mixins)
+        return mixins
+
+    def make_writable(self, player: int) -> None:
+        """
+        Allows writing to the player's prog_items, reachable_regions and blocked_connections directly, even if they are
+        shared with a copy-on-write copy or needed to roll back to a checkpoint.
+        """
+        if player in self.shared_players:
+            self._unshare(player)
+
+    def checkpoint(self) -> CollectionStateCheckpoint:
+        """
+        Starts logging changes to this state, so it can be rolled back to how it is now.
+        Each player's prog_items, reachable_regions and blocked_connections are only copied once they change, checked
+        locations and advancements are logged as they are added. Logic mixins are saved on the first change and
+        restored like copy() does, so mixins without copy_mixin are initialized again by their init_mixin.
+
+        Changes have to go through this state's methods, or code writing to the per-player structures directly has to
+        call make_writable first. Advancements removed directly are not restored.
+        """
+        checkpoint = CollectionStateCheckpoint(self)
+        self.checkpoints.append(checkpoint)
+        self.shared_players.update(self.prog_items)
+        return checkpoint
+
+    def rollback(self, checkpoint: CollectionStateCheckpoint) -> None:
+        """Undoes all changes since checkpoint was created, dropping it and every checkpoint created after it."""
+        index = self.checkpoints.index(checkpoint)
+        del self.checkpoints[index:]
+        for player, (prog_items, reachable_regions, blocked_connections) in checkpoint.players.items():
+            self.prog_items[player] = prog_items
+            self.reachable_regions[player] = reachable_regions
+            self.blocked_connections[player] = blocked_connections
+        # restored structures may still be shared with copies made before the checkpoint, or made from it
+        self.shared_players = set(self.prog_items) if checkpoint.copied else checkpoint.shared_players
+        if self.checkpoints:
+            self.shared_players.update(self.prog_items)
+
+        self.locations_checked.difference_update(self.checked_log[checkpoint.checked_position:])
+        del self.checked_log[checkpoint.checked_position:]
+        self.advancements.difference_update(self.advancement_log[checkpoint.advancement_position:])
+        del self.advancement_log[checkpoint.advancement_position:]
+        if checkpoint.path is not None:
+            self.path = checkpoint.path
+        # entries are only ever added to path, or replaced after a remove, so the new ones are the last ones
+        for _ in range(len(self.path) - checkpoint.path_length):
+            self.path.popitem()
+        self.stale = checkpoint.stale
+        self.changed_items = checkpoint.changed_items
+        if checkpoint.mixins_saved:
+            for function in self.additional_init_functions:
+                function(self, self.multiworld)
+            for function in self.additional_copy_functions:
+                function(checkpoint.mixins, self)
+
+    def commit(self, checkpoint: CollectionStateCheckpoint) -> None:
+        """Keeps all changes since checkpoint was created, dropping it and every checkpoint created after it."""
+        index = self.checkpoints.index(checkpoint)
+        del self.checkpoints[index:]
+        if not self.checkpoints:
+            if not checkpoint.copied:
+                self.shared_players &= checkpoint.shared_players
+            self.checked_log.clear()
+            self.advancement_log.clear()
+
     def can_reach(self,
                   spot: Union[Location, Entrance, Region, str],
                   resolution_hint: Optional[str] = None,
@@ -855,6 +1292,31 @@ class CollectionState():
     def can_reach_region(self, spot: str, player: int) -> bool:
         return self.multiworld.get_region(spot, player).can_reach(self)
 
+    def reachable_locations(self, locations: Iterable[Location]) -> List[Location]:
+        """
+        Returns the locations that can be reached in this state, keeping their order.
+        Each parent region is only checked once, and access rules are only evaluated in reachable regions.
+        """
+        region_reachable: Dict[Region, bool] = {}
+        overrides_can_reach: Dict[type, bool] = {}
+        reachable: List[Location] = []
+        for location in locations:
+            location_type = type(location)
+            overridden = overrides_can_reach.get(location_type)
+            if overridden is None:
+                overridden = overrides_can_reach[location_type] = location_type.can_reach is not Location.can_reach
+            region = location.parent_region
+            if overridden or not region:
+                if location.can_reach(self):
+                    reachable.append(location)
+                continue
+            region_reached = region_reachable.get(region)
+            if region_reached is None:
+                region_reached = region_reachable[region] = region.can_reach(self)
+            if region_reached and location.access_rule(self):
+                reachable.append(location)
+        return reachable
+
     def sweep_for_events(self, locations: Optional[Iterable[Location]] = None) -> None:
         Utils.deprecate("sweep_for_events has been renamed to sweep_for_advancements. The functionality is the same. "
                         "Please switch over to sweep_for_advancements.")
@@ -870,8 +1332,9 @@ class CollectionState():
         players_to_check = all_players
         # As an optimization, it is assumed that each player's world only logically depends on itself. However, worlds
         # are allowed to logically depend on other worlds, so once there are no more players that should be checked
-        # under this assumption, an extra sweep iteration is performed that checks every player, to confirm that the
-        # sweep is finished.
+        # under this assumption, an extra sweep iteration is performed that checks every player whose world does not
+        # declare World.self_contained_logic, to confirm that the sweep is finished.
+        cross_dependent_players: Optional[Set[int]] = None
         checking_if_finished = False
         while players_to_check:
             next_advancements_per_player: List[Tuple[int, List[Location]]] = []
@@ -884,18 +1347,14 @@ class CollectionState():
 
                 # Accessibility of each location is checked first because a player's region accessibility cache becomes
                 # stale whenever one of their own items is collected into the state.
-                reachable_locations: List[Location] = []
-                unreachable_locations: List[Location] = []
-                for location in locations:
-                    if location.can_reach(self):
-                        # Locations containing items that do not belong to `player` could be collected immediately
-                        # because they won't stale `player`'s region accessibility cache, but, for simplicity, all the
-                        # items at reachable locations are collected in a single loop.
-                        reachable_locations.append(location)
-                    else:
-                        unreachable_locations.append(location)
-                if unreachable_locations:
-                    next_advancements_per_player.append((player, unreachable_locations))
+                # Locations containing items that do not belong to `player` could be collected immediately because
+                # they won't stale `player`'s region accessibility cache, but, for simplicity, all the items at
+                # reachable locations are collected in a single loop.
+                reachable_locations = self.reachable_locations(locations)
+                if len(reachable_locations) != len(locations):
+                    reached = set(reachable_locations)
+                    next_advancements_per_player.append(
+                        (player, [location for location in locations if location not in reached]))
 
                 # A previous player's locations processed in the current `while players_to_check` iteration could have
                 # collected items belonging to `player`, but now that all of `player`'s reachable locations have been
@@ -910,20 +1369,22 @@ class CollectionState():
 
                 # Collect the items from the reachable locations.
                 for advancement in reachable_locations:
-                    self.advancements.add(advancement)
-                    item = advancement.item
-                    assert isinstance(item, Item), "tried to collect advancement Location with no Item"
-                    if self.collect(item, True, advancement):
+                    if self.collect_advancement(advancement):
                         # The player the item belongs to may be able to reach additional locations in the next sweep
                         # iteration.
-                        next_players_to_check.add(item.player)
+                        next_players_to_check.add(advancement.item.player)
 
             if not next_players_to_check:
                 if not checking_if_finished:
                     # It is assumed that each player's world only logically depends on itself, which may not be the
-                    # case, so confirm that the sweep is finished by doing an extra iteration that checks every player.
+                    # case, so confirm that the sweep is finished by doing an extra iteration that checks every player
+                    # that could depend on another.
                     checking_if_finished = True
-                    next_players_to_check = all_players
+                    if cross_dependent_players is None:
+                        worlds = self.multiworld.worlds
+                        cross_dependent_players = {player for player in all_players
+                                                   if not worlds[player].self_contained_logic}
+                    next_players_to_check = cross_dependent_players
             else:
                 checking_if_finished = False
 
@@ -978,19 +1439,32 @@ class CollectionState():
             advancements_per_player = list(advancements_per_player_dict.items())
             del advancements_per_player_dict
 
+        trace = tracing.current
         if yield_each_sweep:
+            if trace:
+                trace.count("sweeps")
             # Return a generator that will yield at the end of each sweep iteration.
             return self._sweep_for_advancements_impl(advancements_per_player, True)
         else:
+            start = time.perf_counter_ns() if trace else None
             # Create the generator, but tell it not to yield anything, so it will run to completion in zero iterations
             # once started, then start and exhaust the generator by attempting to iterate it.
             for _ in self._sweep_for_advancements_impl(advancements_per_player, False):
                 assert False, "Generator yielded when it should have run to completion without yielding"
+            if trace:
+                trace.count("sweeps", start)
             return None
 
     # item name related
+    # players with ItemCounts are looked up by their index directly, as going through its mapping interface is slower
     def has(self, item: str, player: int, count: int = 1) -> bool:
-        return self.prog_items[player][item] >= count
+        player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            index = player_prog_items.index.ids.get(item)
+            if index is None:
+                return player_prog_items.extra.get(item, 0) >= count
+            return player_prog_items.counts[index] >= count
+        return player_prog_items[item] >= count
 
     # for loops are specifically used in all/any/count methods, instead of all()/any()/sum(), to avoid the overhead of
     # creating and iterating generator instances. In `return all(player_prog_items[item] for item in items)`, the
@@ -998,6 +1472,13 @@ class CollectionState():
     def has_all(self, items: Iterable[str], player: int) -> bool:
         """Returns True if each item name of items is in state at least once."""
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            ids, counts, extra = player_prog_items.index.ids, player_prog_items.counts, player_prog_items.extra
+            for item in items:
+                index = ids.get(item)
+                if not (extra.get(item, 0) if index is None else counts[index]):
+                    return False
+            return True
         for item in items:
             if not player_prog_items[item]:
                 return False
@@ -1006,6 +1487,13 @@ class CollectionState():
     def has_any(self, items: Iterable[str], player: int) -> bool:
         """Returns True if at least one item name of items is in state at least once."""
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            ids, counts, extra = player_prog_items.index.ids, player_prog_items.counts, player_prog_items.extra
+            for item in items:
+                index = ids.get(item)
+                if extra.get(item, 0) if index is None else counts[index]:
+                    return True
+            return False
         for item in items:
             if player_prog_items[item]:
                 return True
@@ -1014,6 +1502,13 @@ class CollectionState():
     def has_all_counts(self, item_counts: Mapping[str, int], player: int) -> bool:
         """Returns True if each item name is in the state at least as many times as specified."""
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            ids, counts, extra = player_prog_items.index.ids, player_prog_items.counts, player_prog_items.extra
+            for item, count in item_counts.items():
+                index = ids.get(item)
+                if (extra.get(item, 0) if index is None else counts[index]) < count:
+                    return False
+            return True
         for item, count in item_counts.items():
             if player_prog_items[item] < count:
                 return False
@@ -1022,18 +1517,39 @@ class CollectionState():
     def has_any_count(self, item_counts: Mapping[str, int], player: int) -> bool:
         """Returns True if at least one item name is in the state at least as many times as specified."""
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            ids, counts, extra = player_prog_items.index.ids, player_prog_items.counts, player_prog_items.extra
+            for item, count in item_counts.items():
+                index = ids.get(item)
+                if (extra.get(item, 0) if index is None else counts[index]) >= count:
+                    return True
+            return False
         for item, count in item_counts.items():
             if player_prog_items[item] >= count:
                 return True
         return False
 
     def count(self, item: str, player: int) -> int:
-        return self.prog_items[player][item]
+        player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            index = player_prog_items.index.ids.get(item)
+            if index is None:
+                return player_prog_items.extra.get(item, 0)
+            return player_prog_items.counts[index]
+        return player_prog_items[item]
 
     def has_from_list(self, items: Iterable[str], player: int, count: int) -> bool:
         """Returns True if the state contains at least `count` items matching any of the item names from a list."""
         found: int = 0
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            ids, counts, extra = player_prog_items.index.ids, player_prog_items.counts, player_prog_items.extra
+            for item_name in items:
+                index = ids.get(item_name)
+                found += extra.get(item_name, 0) if index is None else counts[index]
+                if found >= count:
+                    return True
+            return False
         for item_name in items:
             found += player_prog_items[item_name]
             if found >= count:
@@ -1045,6 +1561,14 @@ class CollectionState():
         Ignores duplicates of the same item."""
         found: int = 0
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            ids, counts, extra = player_prog_items.index.ids, player_prog_items.counts, player_prog_items.extra
+            for item_name in items:
+                index = ids.get(item_name)
+                found += (extra.get(item_name, 0) if index is None else counts[index]) > 0
+                if found >= count:
+                    return True
+            return False
         for item_name in items:
             found += player_prog_items[item_name] > 0
             if found >= count:
@@ -1055,6 +1579,12 @@ class CollectionState():
         """Returns the cumulative count of items from a list present in state."""
         player_prog_items = self.prog_items[player]
         total = 0
+        if type(player_prog_items) is ItemCounts:
+            ids, counts, extra = player_prog_items.index.ids, player_prog_items.counts, player_prog_items.extra
+            for item_name in items:
+                index = ids.get(item_name)
+                total += extra.get(item_name, 0) if index is None else counts[index]
+            return total
         for item_name in items:
             total += player_prog_items[item_name]
         return total
@@ -1063,6 +1593,13 @@ class CollectionState():
         """Returns the cumulative count of items from a list present in state. Ignores duplicates of the same item."""
         player_prog_items = self.prog_items[player]
         total = 0
+        if type(player_prog_items) is ItemCounts:
+            ids, counts, extra = player_prog_items.index.ids, player_prog_items.counts, player_prog_items.extra
+            for item_name in items:
+                index = ids.get(item_name)
+                if (extra.get(item_name, 0) if index is None else counts[index]) > 0:
+                    total += 1
+            return total
         for item_name in items:
             if player_prog_items[item_name] > 0:
                 total += 1
@@ -1073,6 +1610,13 @@ class CollectionState():
         """Returns True if the state contains at least `count` items present in a specified item group."""
         found: int = 0
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            counts = player_prog_items.counts
+            for index in player_prog_items.index.group_ids[item_name_group]:
+                found += counts[index]
+                if found >= count:
+                    return True
+            return False
         for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
             found += player_prog_items[item_name]
             if found >= count:
@@ -1085,6 +1629,13 @@ class CollectionState():
         """
         found: int = 0
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            counts = player_prog_items.counts
+            for index in player_prog_items.index.group_ids[item_name_group]:
+                found += counts[index] > 0
+                if found >= count:
+                    return True
+            return False
         for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]:
             found += player_prog_items[item_name] > 0
             if found >= count:
@@ -1094,6 +1645,8 @@ class CollectionState():
     def count_group(self, item_name_group: str, player: int) -> int:
         """Returns the cumulative count of items from an item group present in state."""
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            return sum(map(player_prog_items.counts.__getitem__, player_prog_items.index.group_ids[item_name_group]))
         return sum(
             player_prog_items[item_name]
             for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]
@@ -1103,16 +1656,32 @@ class CollectionState():
         """Returns the cumulative count of items from an item group present in state.
         Ignores duplicates of the same item."""
         player_prog_items = self.prog_items[player]
+        if type(player_prog_items) is ItemCounts:
+            counts = player_prog_items.counts
+            return sum(counts[index] > 0 for index in player_prog_items.index.group_ids[item_name_group])
         return sum(
             player_prog_items[item_name] > 0
             for item_name in self.multiworld.worlds[player].item_name_groups[item_name_group]
         )
 
     # Item related
+    def collect_advancement(self, location: Location) -> bool:
+        """Adds the location to advancements and collects its item without sweeping, like sweeping does."""
+        if self.checkpoints and location not in self.advancements:
+            self.advancement_log.append(location)
+        self.advancements.add(location)
+        item = location.item
+        assert isinstance(item, Item), "tried to collect advancement Location with no Item"
+        return self.collect(item, True, location)
+
     def collect(self, item: Item, prevent_sweep: bool = False, location: Optional[Location] = None) -> bool:
         if location:
+            if self.checkpoints and location not in self.locations_checked:
+                self.checked_log.append(location)
             self.locations_checked.add(location)
 
+        if item.player in self.shared_players:
+            self._unshare(item.player)
         changed = self.multiworld.worlds[item.player].collect(self, item)
 
         self.stale[item.player] = True
@@ -1131,14 +1700,24 @@ class CollectionState():
         :param count: How many of the item to add.
         """
         assert count > 0
+        if player in self.shared_players:
+            self._unshare(player)
         self.prog_items[player][item] += count
+        if player in self.changed_items:
+            self.changed_items[player].add(item)
 
     def remove(self, item: Item):
+        if item.player in self.shared_players:
+            self._unshare(item.player)
         changed = self.multiworld.worlds[item.player].remove(self, item)
         if changed:
+            # regions reached again replace their entries in path
+            for checkpoint in self.checkpoints:
+                if checkpoint.path is None:
+                    checkpoint.path = self.path.copy()
             # invalidate caches, nothing can be trusted anymore now
-            self.reachable_regions[item.player] = set()
-            self.blocked_connections[item.player] = set()
+            self.reachable_regions[item.player], self.blocked_connections[item.player] = \
+                self._new_reachability(item.player)
             self.stale[item.player] = True
 
     def remove_item(self, item: str, player: int, count: int = 1) -> None:
@@ -1150,9 +1729,13 @@ class CollectionState():
         :param count: How many of the item to remove.
         """
         assert count > 0
+        if player in self.shared_players:
+            self._unshare(player)
         self.prog_items[player][item] -= count
         if self.prog_items[player][item] < 1:
             del (self.prog_items[player][item])
+        if player in self.changed_items:
+            self.changed_items[player].add(item)
 
     def set_item(self, item: str, player: int, count: int) -> None:
         """
@@ -1163,10 +1746,73 @@ class CollectionState():
         :param count: How many of the item to now have.
         """
         assert count >= 0
+        if player in self.shared_players:
+            self._unshare(player)
         if count == 0:
             del (self.prog_items[player][item])
         else:
             self.prog_items[player][item] = count
+        if player in self.changed_items:
+            self.changed_items[player].add(item)
+
+
+class CollectionStateCheckpoint:
+    """Undo log of a CollectionState since CollectionState.checkpoint() was called."""
+    players: Dict[int, Tuple[Union[Counter[str], ItemCounts], Set[Region], Set[Entrance]]]
+    """The original prog_items, reachable_regions and blocked_connections of each player changed since"""
+    shared_players: Set[int]
+    copied: bool
+    """Whether a copy-on-write copy was made since, which may share the original structures"""
+    checked_position: int
+    advancement_position: int
+    path_length: int
+    path: Optional[Dict[Union[Region, Entrance], PathValue]]
+    """Copy of the path before its entries could be replaced"""
+    stale: Dict[int, bool]
+    changed_items: Dict[int, Set[str]]
+    mixins_saved: bool
+    """Whether the state changed since and the state added by logic mixins was saved"""
+    mixins: Optional[CollectionState]
+    """Holds the state added by logic mixins with copy_mixin, if there are any"""
+
+    def __init__(self, state: CollectionState) -> None:
+        self.players = {}
+        self.shared_players = set(state.shared_players)
+        self.copied = False
+        self.checked_position = len(state.checked_log)
+        self.advancement_position = len(state.advancement_log)
+        self.path_length = len(state.path)
+        self.path = None
+        self.stale = state.stale.copy()
+        self.changed_items = {player: changed.copy() for player, changed in state.changed_items.items()}
+        self.mixins_saved = False
+        self.mixins = None
+
+
+def default_access_rule(state: CollectionState) -> bool:
+    """The access_rule of every Location and Entrance that was not given one."""
+    return True
+
+
+def default_item_rule(item: Item) -> bool:
+    """The item_rule of every Location that was not given one."""
+    return True
+
+
+def default_always_allow(state: CollectionState, item: Item) -> bool:
+    """The always_allow of every Location that was not given one."""
+    return False
+
+
+SlotDefaults = Tuple[Tuple[str, Any], ...]
+
+
+def _unshadowed_defaults(cls: type, defaults: SlotDefaults) -> Optional[SlotDefaults]:
+    """Returns the slot defaults that __init__ of cls should assign, or None if it can assign all of them.
+    Defaults for slots that cls shadows with a class attribute, like an access_rule method, are left out."""
+    unshadowed = tuple((name, value) for name, value in defaults
+                       if isinstance(getattr(cls, name), MemberDescriptorType))
+    return None if len(unshadowed) == len(defaults) else unshadowed
 
 
 class EntranceType(IntEnum):
@@ -1175,22 +1821,44 @@ class EntranceType(IntEnum):
 
 
 class Entrance:
-    access_rule: Callable[[CollectionState], bool] = staticmethod(lambda state: True)
-    hide_path: bool = False
+    """
+    A connection from parent_region to connected_region.
+    Attributes are stored in __slots__. Subclasses that don't declare __slots__ themselves get a __dict__ for their
+    own attributes, and may still override access_rule or hide_path with a class attribute or method.
+    """
+    __slots__ = ("access_rule", "hide_path", "player", "name", "parent_region", "connected_region",
+                 "randomization_group", "randomization_type")
+    access_rule: Callable[[CollectionState], bool]
+    hide_path: bool
     player: int
     name: str
     parent_region: Optional[Region]
-    connected_region: Optional[Region] = None
+    connected_region: Optional[Region]
     randomization_group: int
     randomization_type: EntranceType
 
+    _slot_defaults: ClassVar[SlotDefaults] = (("access_rule", default_access_rule), ("hide_path", False))
+    _unshadowed_defaults: ClassVar[Optional[SlotDefaults]] = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._unshadowed_defaults = _unshadowed_defaults(cls, Entrance._slot_defaults)
+
     def __init__(self, player: int, name: str = "", parent: Optional[Region] = None,
                  randomization_group: int = 0, randomization_type: EntranceType = EntranceType.ONE_WAY) -> None:
         self.name = name
         self.parent_region = parent
+        self.connected_region = None
         self.player = player
         self.randomization_group = randomization_group
         self.randomization_type = randomization_type
+        defaults = self._unshadowed_defaults
+        if defaults is None:
+            self.access_rule = default_access_rule
+            self.hide_path = False
+        else:
+            for attribute, value in defaults:
+                setattr(self, attribute, value)
 
     def can_reach(self, state: CollectionState) -> bool:
         assert self.parent_region, f"called can_reach on an Entrance \"{self}\" with no parent_region"
@@ -1237,6 +1905,12 @@ class Entrance:
 
 
 class Region:
+    """
+    A node of a player's region graph, holding locations and connected to other regions through entrances.
+    Attributes are stored in __slots__. Subclasses that don't declare __slots__ themselves get a __dict__ for their
+    own attributes.
+    """
+    __slots__ = ("name", "_hint_text", "player", "multiworld", "entrances", "_exits", "_locations")
     name: str
     _hint_text: str
     player: int
@@ -1458,6 +2132,128 @@ class Region:
         return self.multiworld.get_name_string_for_object(self) if self.multiworld else f'{self.name} (Player {self.player})'
 
 
+class RegionGraph:
+    """
+    A player's region graph compiled into integer-indexed compressed sparse row arrays once it can no longer change.
+    Regions and their exits get consecutive ids, so the exits of region i are the entrance ids
+    exit_offsets[i] to exit_offsets[i + 1]. See World.compiled_region_graph.
+    """
+    regions: List[Region]
+    region_ids: Dict[Region, int]
+    entrances: List[Entrance]
+    """Exits of all the player's regions, grouped by parent region in region order"""
+    entrance_ids: Dict[Entrance, int]
+    exit_offsets: List[int]
+    entrance_targets: List[int]
+    """Region id each entrance is connected to"""
+    free_entrances: bytearray
+    """Whether each entrance can be passed once its parent region is reached as long as it has no access_rule, which
+    may still be set after compiling"""
+    indirect_offsets: List[int]
+    indirect_entrances: List[int]
+    """Entrance ids registered as indirect conditions of each region, in the same layout as the exits"""
+
+    class EntranceSet(MutableSet):
+        """
+        A set of the entrances of a RegionGraph, stored as one flag byte per entrance id.
+        Adding and removing are O(1) like on a set, while copying and iterating stay in C.
+        """
+        graph: RegionGraph
+        flags: bytearray
+
+        def __init__(self, graph: RegionGraph, flags: Optional[bytearray] = None):
+            self.graph = graph
+            self.flags = bytearray(len(graph.entrances)) if flags is None else flags
+
+        @classmethod
+        def _from_iterable(cls, iterable: Iterable[Entrance]) -> Set[Entrance]:
+            # results of set operations are plain sets, as they may contain entrances outside the graph
+            return set(iterable)
+
+        def __contains__(self, entrance: object) -> bool:
+            entrance_id = self.graph.entrance_ids.get(entrance)
+            return entrance_id is not None and self.flags[entrance_id] == 1
+
+        def __iter__(self) -> Iterator[Entrance]:
+            return itertools.compress(self.graph.entrances, self.flags)
+
+        def __len__(self) -> int:
+            return self.flags.count(1)
+
+        def __repr__(self) -> str:
+            return f"{self.__class__.__name__}({set(self)})"
+
+        def add(self, entrance: Entrance) -> None:
+            self.flags[self.graph.entrance_ids[entrance]] = 1
+
+        def discard(self, entrance: Entrance) -> None:
+            entrance_id = self.graph.entrance_ids.get(entrance)
+            if entrance_id is not None:
+                self.flags[entrance_id] = 0
+
+        def remove(self, entrance: Entrance) -> None:
+            if entrance not in self:
+                raise KeyError(entrance)
+            self.discard(entrance)
+
+        def update(self, entrances: Iterable[Entrance]) -> None:
+            entrance_ids = self.graph.entrance_ids
+            flags = self.flags
+            for entrance in entrances:
+                flags[entrance_ids[entrance]] = 1
+
+        def clear(self) -> None:
+            self.flags = bytearray(len(self.flags))
+
+        def copy(self) -> RegionGraph.EntranceSet:
+            return RegionGraph.EntranceSet(self.graph, self.flags[:])
+
+        def ids(self) -> Iterator[int]:
+            """Iterates over the ids of the entrances in this set"""
+            return itertools.compress(range(len(self.flags)), self.flags)
+
+    def __init__(self, regions: Iterable[Region], indirect_connections: Mapping[Region, AbstractSet[Entrance]]):
+        self.regions = list(regions)
+        self.region_ids = {region: region_id for region_id, region in enumerate(self.regions)}
+        self.entrances = [exit_ for region in self.regions for exit_ in region.exits]
+        self.entrance_ids = {entrance: entrance_id for entrance_id, entrance in enumerate(self.entrances)}
+        self.exit_offsets = [0]
+        for region in self.regions:
+            self.exit_offsets.append(self.exit_offsets[-1] + len(region.exits))
+        self.entrance_targets = [self.region_ids[entrance.connected_region] for entrance in self.entrances]
+        self.free_entrances = bytearray(entrance.access_rule is default_access_rule
+                                        and type(entrance).can_reach is Entrance.can_reach
+                                        and type(entrance.parent_region).can_reach is Region.can_reach
+                                        for entrance in self.entrances)
+        self.indirect_offsets = [0]
+        self.indirect_entrances = []
+        for region in self.regions:
+            # conditions of other players' entrances can't unblock anything in this graph
+            self.indirect_entrances.extend(sorted(self.entrance_ids[entrance]
+                                                  for entrance in indirect_connections.get(region, ())
+                                                  if entrance in self.entrance_ids))
+            self.indirect_offsets.append(len(self.indirect_entrances))
+
+    @classmethod
+    def compile(cls, multiworld: MultiWorld, player: int) -> Optional[RegionGraph]:
+        """Compiles the player's region graph, or returns None if any exit leads nowhere or to another player."""
+        regions = list(multiworld.get_regions(player))
+        known_regions = set(regions)
+        for region in regions:
+            for exit_ in region.exits:
+                target = exit_.connected_region
+                if not target or target.player != player:
+                    return None
+                if target not in known_regions:
+                    # regions that were connected but never added to the multiworld are still searched
+                    known_regions.add(target)
+                    regions.append(target)
+        return cls(regions, multiworld.indirect_connections)
+
+    def entrance_set(self) -> RegionGraph.EntranceSet:
+        return RegionGraph.EntranceSet(self)
+
+
 class LocationProgressType(IntEnum):
     DEFAULT = 1
     PRIORITY = 2
@@ -1465,24 +2261,55 @@ class LocationProgressType(IntEnum):
 
 
 class Location:
+    """
+    A place an item can be found at, in parent_region.
+    Attributes other than game are stored in __slots__. Subclasses that don't declare __slots__ themselves get a
+    __dict__ for their own attributes, and may still override the defaulted ones, like access_rule or show_in_spoiler,
+    with a class attribute or method.
+    """
     game: str = "Generic"
+    __slots__ = ("player", "name", "address", "parent_region", "locked", "show_in_spoiler", "progress_type",
+                 "always_allow", "access_rule", "item_rule", "item")
     player: int
     name: str
     address: Optional[int]
     parent_region: Optional[Region]
-    locked: bool = False
-    show_in_spoiler: bool = True
-    progress_type: LocationProgressType = LocationProgressType.DEFAULT
-    always_allow: Callable[[CollectionState, Item], bool] = staticmethod(lambda state, item: False)
-    access_rule: Callable[[CollectionState], bool] = staticmethod(lambda state: True)
-    item_rule: Callable[[Item], bool] = staticmethod(lambda item: True)
-    item: Optional[Item] = None
+    locked: bool
+    show_in_spoiler: bool
+    progress_type: LocationProgressType
+    always_allow: Callable[[CollectionState, Item], bool]
+    access_rule: Callable[[CollectionState], bool]
+    item_rule: Callable[[Item], bool]
+    item: Optional[Item]
+
+    _slot_defaults: ClassVar[SlotDefaults] = (
+        ("locked", False), ("show_in_spoiler", True), ("progress_type", LocationProgressType.DEFAULT),
+        ("always_allow", default_always_allow), ("access_rule", default_access_rule),
+        ("item_rule", default_item_rule), ("item", None),
+    )
+    _unshadowed_defaults: ClassVar[Optional[SlotDefaults]] = None
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._unshadowed_defaults = _unshadowed_defaults(cls, Location._slot_defaults)
 
     def __init__(self, player: int, name: str = '', address: Optional[int] = None, parent: Optional[Region] = None):
         self.player = player
         self.name = name
         self.address = address
         self.parent_region = parent
+        defaults = self._unshadowed_defaults
+        if defaults is None:
+            self.locked = False
+            self.show_in_spoiler = True
+            self.progress_type = LocationProgressType.DEFAULT
+            self.always_allow = default_always_allow
+            self.access_rule = default_access_rule
+            self.item_rule = default_item_rule
+            self.item = None
+        else:
+            for attribute, value in defaults:
+                setattr(self, attribute, value)
 
     def can_fill(self, state: CollectionState, item: Item, check_access: bool = True) -> bool:
         return ((
@@ -1665,6 +2492,224 @@ class EntranceInfo(TypedDict, total=False):
     direction: str
 
 
+class LocationFrontier:
+    """
+    Finds which of a set of locations became reachable in a state that only gains items, without re-testing all of
+    them every time. Locations are only tested once their parent region is reachable, and after failing a test they
+    are only re-tested once one of the items their access_rule declared `item_dependencies` for changed, see
+    worlds.generic.Rules.declare_item_dependencies. Locations without declared dependencies are re-tested every time.
+    """
+    state: CollectionState
+    remaining: Set[Location]
+    """Locations not removed yet."""
+
+    def __init__(self, state: CollectionState, locations: Iterable[Location]) -> None:
+        self.state = state
+        self.remaining = set()
+        self.unreached: Dict[Region, List[Location]] = defaultdict(list)
+        self.reached_regions: Dict[int, Set[Region]] = {}
+        self.undeclared: Set[Location] = set()
+        self.dependent: Dict[int, Dict[str, Set[Location]]] = {}
+        self.tested_counts: Dict[int, Dict[str, int]] = {}
+        for location in locations:
+            self.remaining.add(location)
+            region = location.parent_region
+            if type(location).can_reach is Location.can_reach and type(region).can_reach is Region.can_reach:
+                self.unreached[region].append(location)
+                self.reached_regions.setdefault(location.player, set())
+            else:
+                self.undeclared.add(location)
+
+    def find_reachable(self) -> List[Location]:
+        """Returns the remaining locations that can be reached in state."""
+        state = self.state
+        candidates: Set[Location] = set()
+        for player, reached_regions in self.reached_regions.items():
+            if state.stale[player]:
+                state.update_reachable_regions(player)
+            reachable_regions = state.reachable_regions[player]
+            if len(reachable_regions) != len(reached_regions):
+                for region in reachable_regions - reached_regions:
+                    candidates.update(self.unreached.pop(region, ()))
+                reached_regions.update(reachable_regions)
+        for player, tested_counts in self.tested_counts.items():
+            counts = state.prog_items[player]
+            for item_name in [item_name for item_name, count in tested_counts.items() if counts[item_name] != count]:
+                del tested_counts[item_name]
+                candidates |= self.dependent[player].pop(item_name)
+        candidates &= self.remaining
+
+        reachable = state.reachable_locations(self.undeclared)
+        for location in candidates:
+            if location.can_reach(state):
+                reachable.append(location)
+            else:
+                item_dependencies = getattr(location.access_rule, "item_dependencies", None)
+                if item_dependencies is None:
+                    self.undeclared.add(location)
+                    continue
+                dependent = self.dependent.setdefault(location.player, {})
+                tested_counts = self.tested_counts.setdefault(location.player, {})
+                counts = state.prog_items[location.player]
+                for item_name in item_dependencies:
+                    dependent.setdefault(item_name, set()).add(location)
+                    tested_counts.setdefault(item_name, counts[item_name])
+        return reachable
+
+    def remove(self, locations: Collection[Location]) -> None:
+        """Removes locations, usually after collecting them, so they are not returned again."""
+        self.remaining.difference_update(locations)
+        self.undeclared.difference_update(locations)
+
+
+class SphereIndex:
+    """
+    The logical spheres of a finished multiworld, computed once and shared by everything that needs them after fill.
+    It is not updated when items are placed or swapped, so it is only passed around while the placements don't change.
+
+    Spheres match :meth:`MultiWorld.get_spheres`, the multiserver sendable spheres of
+    :meth:`MultiWorld.get_sendable_spheres` are derived from them.
+    """
+    multiworld: MultiWorld
+    collection_order: List[Location]
+    """All reachable filled locations, in the order they were collected."""
+    sphere_starts: List[int]
+    """Position in collection_order each sphere starts at, followed by the length of collection_order."""
+    sphere_of: Dict[Location, int]
+    unreachable: Set[Location]
+    """Filled locations that can't be reached."""
+    state: CollectionState
+    """State after collecting every reachable location."""
+    sendable_spheres: List[List[Location]]
+    """Multiserver sendable locations of each sendable sphere, ending in an empty one if some can't be reached."""
+
+    def __init__(self, multiworld: MultiWorld, max_cached_states: int = 32) -> None:
+        """
+        :param multiworld: the finished multiworld to index
+        :param max_cached_states: how many of the states at the start of each sphere are kept around,
+            the states in between are rebuilt from the closest kept one
+        """
+        self.multiworld = multiworld
+        self.collection_order = []
+        self.sphere_starts = []
+        self.sphere_of = {}
+        state = CollectionState(multiworld)
+        # _state_cache[num // _cache_stride] is the state before sphere num, once num is a multiple of _cache_stride
+        self._state_cache = [state.copy(copy_on_write=True)]
+        self._cache_stride = 1
+
+        frontier = LocationFrontier(state, multiworld.get_filled_locations())
+        while frontier.remaining:
+            num = len(self.sphere_starts)
+            sphere = sorted(frontier.find_reachable())
+            if not sphere:
+                break
+            self.sphere_starts.append(len(self.collection_order))
+            self.collection_order += sphere
+            for location in sphere:
+                state.collect(location.item, True, location)
+                self.sphere_of[location] = num
+            frontier.remove(sphere)
+
+            if not (num + 1) % self._cache_stride:
+                if len(self._state_cache) >= max_cached_states:
+                    # keep every other state and only cache half as often from now on
+                    del self._state_cache[1::2]
+                    self._cache_stride *= 2
+                if not (num + 1) % self._cache_stride:
+                    self._state_cache.append(state.copy(copy_on_write=True))
+
+        self.sphere_starts.append(len(self.collection_order))
+        self.unreachable = frontier.remaining
+        self.state = state
+        self._unreachable_sendable: Set[Location] = set()
+        self.sendable_spheres = self._create_sendable_spheres()
+
+    def _create_sendable_spheres(self) -> List[List[Location]]:
+        """
+        Events are collected as soon as they can be reached, so locations can only be in an earlier sendable sphere
+        than the sphere they are in. Locations of the sphere with the same number as the current sendable sphere are
+        therefore known to be reachable without testing them.
+        """
+        state = CollectionState(self.multiworld)
+        locations: List[Location] = []
+        events: List[Location] = []
+        for location in self.multiworld.get_filled_locations():
+            if type(location.item.code) is int and type(location.address) is int:
+                locations.append(location)
+            else:
+                events.append(location)
+        frontier = LocationFrontier(state, locations)
+        event_frontier = LocationFrontier(state, events)
+
+        sendable_spheres: List[List[Location]] = []
+        while frontier.remaining:
+            num = len(sendable_spheres)
+            known_events: List[Location] = []
+            known_locations: List[Location] = []
+            if num < len(self):
+                for location in self.get_sphere(num):
+                    if location in event_frontier.remaining:
+                        known_events.append(location)
+                    elif location in frontier.remaining:
+                        known_locations.append(location)
+            frontier.remove(known_locations)
+
+            # cull events out
+            done_events = known_events
+            while True:
+                for event in done_events:
+                    state.collect(event.item, True, event)
+                event_frontier.remove(done_events)
+                done_events = event_frontier.find_reachable()
+                if not done_events:
+                    break
+
+            sphere = sorted(known_locations + frontier.find_reachable())
+            sendable_spheres.append(sphere)
+            if not sphere:
+                self._unreachable_sendable = frontier.remaining
+                break
+
+            for location in sphere:
+                state.collect(location.item, True, location)
+            frontier.remove(sphere)
+        return sendable_spheres
+
+    def __len__(self) -> int:
+        return len(self.sphere_starts) - 1
+
+    def get_sphere(self, num: int) -> List[Location]:
+        """Returns the locations of sphere num, in collection order."""
+        return self.collection_order[self.sphere_starts[num]:self.sphere_starts[num + 1]]
+
+    def get_state(self, num: int) -> CollectionState:
+        """Returns the state before sphere num. It may be shared, so it has to be copied before modifying it."""
+        cached_state = self._state_cache[num // self._cache_stride]
+        if not num % self._cache_stride:
+            return cached_state
+        state = cached_state.copy(copy_on_write=True)
+        for location in self.collection_order[self.sphere_starts[num - num % self._cache_stride]:
+                                              self.sphere_starts[num]]:
+            state.collect(location.item, True, location)
+        return state
+
+    def get_spheres(self) -> Iterator[Set[Location]]:
+        """Yields the same spheres as :meth:`MultiWorld.get_spheres` would."""
+        for num in range(len(self)):
+            yield set(self.get_sphere(num))
+        if self.unreachable:
+            yield set()
+            yield set(self.unreachable)
+
+    def get_sendable_spheres(self) -> Iterator[Set[Location]]:
+        """Yields the same spheres as :meth:`MultiWorld.get_sendable_spheres` would."""
+        for sphere in self.sendable_spheres:
+            yield set(sphere)
+        if self._unreachable_sendable:
+            yield set(self._unreachable_sendable)
+
+
 class Spoiler:
     multiworld: MultiWorld
     hashes: Dict[int, str]
@@ -1689,61 +2734,88 @@ class Spoiler:
             self.entrances[(entrance, direction, player)] = \
                 {"player": player, "entrance": entrance, "exit": exit_, "direction": direction}
 
-    def create_playthrough(self, create_paths: bool = True) -> None:
-        """Destructive to the multiworld while it is run, damage gets repaired afterwards."""
+    def create_playthrough(self, create_paths: bool = True, max_cached_states: int = 32,
+                           sphere_index: Optional[SphereIndex] = None) -> None:
+        """
+        Destructive to the multiworld while it is run, damage gets repaired afterwards.
+
+        :param create_paths: also create the paths to each required location
+        :param max_cached_states: how many of the states at the start of each sphere are kept around for culling,
+            if no sphere_index is passed
+        :param sphere_index: index of the multiworld as it is now, instead of creating one
+        """
         from itertools import chain
         # get locations containing progress items
         multiworld = self.multiworld
-        prog_locations = {location for location in multiworld.get_filled_locations() if location.item.advancement}
-        state_cache: List[Optional[CollectionState]] = [None]
-        collection_spheres: List[Set[Location]] = []
-        state = CollectionState(multiworld)
-        sphere_candidates = set(prog_locations)
-        logging.debug('Building up collection spheres.')
-        while sphere_candidates:
-
-            # build up spheres of collection radius.
-            # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-
-            sphere_candidates -= sphere
-            collection_spheres.append(sphere)
-            state_cache.append(state.copy())
-
-            logging.debug('Calculated sphere %i, containing %i of %i progress items.', len(collection_spheres),
-                          len(sphere),
-                          len(prog_locations))
-            if not sphere:
-                logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
-                    location.item.name, location.item.player, location.name, location.player) for location in
-                                                                               sphere_candidates])
-                if not multiworld.has_beaten_game(state):
-                    raise RuntimeError("During playthrough generation, the game was determined to be unbeatable. "
-                                       "Something went terribly wrong here. "
-                                       f"Unreachable progression items: {sphere_candidates}")
-                else:
-                    self.unreachables = sphere_candidates
-                    break
+        index = sphere_index or SphereIndex(multiworld, max_cached_states)
+        # build up spheres of collection radius.
+        # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
+        ordered_spheres = [[location for location in index.get_sphere(num) if location.item.advancement]
+                           for num in range(len(index))]
+        collection_spheres: List[Set[Location]] = [set(sphere) for sphere in ordered_spheres]
+        unreachables = {location for location in index.unreachable if location.item.advancement}
+        if unreachables:
+            logging.debug('The following items could not be reached: %s', ['%s (Player %d) at %s (Player %d)' % (
+                location.item.name, location.item.player, location.name, location.player) for location in
+                                                                           unreachables])
+            if not multiworld.has_beaten_game(index.state):
+                raise RuntimeError("During playthrough generation, the game was determined to be unbeatable. "
+                                   "Something went terribly wrong here. "
+                                   f"Unreachable progression items: {unreachables}")
+            self.unreachables = unreachables
+
+        def can_beat_game_from(num: int, sphere_state: CollectionState) -> bool:
+            """
+            Like multiworld.can_beat_game(sphere_state, required_locations), but the required locations are tested in
+            the order of the spheres they were found in, so most of them only have to be tested once instead of in
+            every sweep iteration.
+            """
+            state = sphere_state.copy(copy_on_write=True)
+            if multiworld.has_beaten_game(state):
+                return True
+            remaining: List[Location] = []
+            for sphere in ordered_spheres[num:]:
+                remaining += (location for location in sphere if location in required_locations)
+                while remaining:
+                    reachable = state.reachable_locations(remaining)
+                    if not reachable:
+                        break
+                    for location in reachable:
+                        state.collect(location.item, True, location)
+                    remaining = [location for location in remaining if location not in state.locations_checked]
+                if multiworld.has_beaten_game(state):
+                    return True
+            return False
 
         # in the second phase, we cull each sphere such that the game is still beatable,
         # reducing each range of influence to the bare minimum required inside it
         required_locations = {location for sphere in collection_spheres for location in sphere}
         for num, sphere in reversed(tuple(enumerate(collection_spheres))):
+            sphere_state = index.get_state(num)
             to_delete: Set[Location] = set()
-            for location in sphere:
-                # we remove the location from required_locations to sweep from, and check if the game is still beatable
-                logging.debug('Checking if %s (Player %d) is required to beat the game.', location.item.name,
-                              location.item.player)
-                required_locations.remove(location)
-                if multiworld.can_beat_game(state_cache[num], required_locations):
-                    to_delete.add(location)
+            # Locations are removed one by one in order, keeping those without which the game can't be beaten.
+            # As removing more locations can only make that harder, a batch that can be removed at once would also be
+            # removed one by one, so the batch size grows while batches can be removed and shrinks once one can't.
+            candidates = ordered_spheres[num]
+            position = 0
+            batch_size = 1
+            while position < len(candidates):
+                batch = candidates[position:position + batch_size]
+                logging.debug('Checking if %s are required to beat the game.', ", ".join(
+                    f"{location.item.name} (Player {location.item.player})" for location in batch))
+                # we remove the locations from required_locations to sweep from, and check if the game is still beatable
+                required_locations.difference_update(batch)
+                if can_beat_game_from(num, sphere_state):
+                    to_delete.update(batch)
+                    position += len(batch)
+                    batch_size *= 2
                 else:
                     # still required, got to keep it around
-                    required_locations.add(location)
+                    required_locations.update(batch)
+                    if len(batch) == 1:
+                        position += 1
+                    else:
+                        batch_size = len(batch) // 2
 
             # cull entries in spheres for spoiler walkthrough at end
             sphere -= to_delete
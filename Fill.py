@@ -1,11 +1,14 @@
 import collections
+import functools
 import itertools
 import logging
 import typing
 from collections import Counter, deque
 
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, PlandoItemBlock
+from BaseClasses import CollectionState, CollectionStateCheckpoint, Item, Location, LocationFrontier, \
+    LocationProgressType, MultiWorld, PlandoItemBlock, default_always_allow, default_item_rule
 from Options import Accessibility
+import tracing
 
 from worlds.AutoWorld import call_all
 from worlds.generic.Rules import add_item_rule
@@ -26,13 +29,202 @@ def _log_fill_progress(name: str, placed: int, total_items: int) -> None:
 
 def sweep_from_pool(base_state: CollectionState, itempool: typing.Sequence[Item] = tuple(),
                     locations: typing.Optional[typing.List[Location]] = None) -> CollectionState:
-    new_state = base_state.copy()
+    new_state = base_state.copy(copy_on_write=True)
     for item in itempool:
         new_state.collect(item, True)
     new_state.sweep_for_advancements(locations=locations)
     return new_state
 
 
+class MaximumExplorationState:
+    """
+    Keeps the maximum exploration state of fill_restrictive up to date between placement rounds.
+
+    The items of the pool are collected into a state once and taken out again as they get placed. Instead of sweeping
+    from scratch, each new exploration state replays the spheres of the previous sweep, checking that every location
+    of a sphere is still reachable before collecting it, and then sweeps for what is left. Once placed items made a
+    sphere shrink, the rest of the replay is dropped and left to the regular sweep.
+
+    The exploration state is the pool state itself, rolled back to a checkpoint once the pool changes again, so items
+    returned to the pool are only collected after that.
+    """
+    pool_state: CollectionState
+    spheres: typing.List[typing.List[Location]]
+    checkpoint: typing.Optional[CollectionStateCheckpoint]
+    returned: typing.List[Item]
+
+    def __init__(self, base_state: CollectionState, itempool: typing.Iterable[Item] = ()) -> None:
+        self.pool_state = base_state.copy()
+        self.spheres = []
+        self.checkpoint = None
+        self.returned = list(itempool)
+
+    def _update_pool(self) -> None:
+        if self.checkpoint:
+            self.pool_state.rollback(self.checkpoint)
+            self.checkpoint = None
+        for item in self.returned:
+            self.pool_state.collect(item, True)
+        self.returned.clear()
+
+    def add(self, items: typing.Iterable[Item]) -> None:
+        """Items returned to the pool."""
+        self.returned.extend(items)
+
+    def remove(self, items: typing.Iterable[Item]) -> None:
+        """Items taken out of the pool."""
+        self._update_pool()
+        for item in items:
+            self.pool_state.remove(item)
+
+    def _replay(self, state: CollectionState) -> None:
+        for i, sphere in enumerate(self.spheres):
+            # a sweep iteration may have reached some of its locations through items it collected for other players
+            # in the same iteration, so each sphere is swept on its own until it stops progressing
+            remaining = [location for location in sphere if location.advancement]
+            replayed: typing.List[Location] = []
+            while remaining:
+                reachable = state.reachable_locations(remaining)
+                if not reachable:
+                    break
+                for location in reachable:
+                    state.collect_advancement(location)
+                replayed += reachable
+                remaining = [location for location in remaining if location not in state.advancements]
+            self.spheres[i] = replayed
+            if remaining:
+                del self.spheres[i + 1:]
+                return
+
+    def sweep(self, locations: typing.Optional[typing.List[Location]] = None) -> CollectionState:
+        """Returns the exploration state, which is only valid until the pool changes or the next sweep."""
+        self._update_pool()
+        state = self.pool_state
+        self.checkpoint = state.checkpoint()
+        self._replay(state)
+        collected = state.advancements.copy()
+        for _ in state.sweep_for_advancements(locations, yield_each_sweep=True):
+            sphere = state.advancements - collected
+            if sphere:
+                # sorted so replaying collects in the same order every generation
+                self.spheres.append(sorted(sphere, key=lambda location: (location.player, location.name)))
+                collected |= sphere
+        return state
+
+
+class CandidateLocations:
+    """
+    The unfilled locations of fill_restrictive, indexed to find the first one in their original order that can take an
+    item without testing all of them.
+
+    Locations are bucketed by player and by whether they accept any item once reachable, only items that are neither
+    progression nor useful once reachable as they are excluded, or depend on the item through a custom item_rule,
+    always_allow or can_fill. Within one state, the first two kinds of bucket remember up to where they are unreachable,
+    so each of their locations is tested at most once per state. Filled locations are only marked as such.
+    """
+    _plain = 0
+    _excluded = 1
+    _custom = 2
+
+    locations: typing.List[Location]
+    filled: bytearray
+    kinds: bytearray
+    buckets: typing.Dict[typing.Tuple[int, int], typing.List[int]]
+    """Indices into locations by player and kind, in ascending order"""
+    heads: typing.Dict[typing.Tuple[int, int], int]
+    """Position of the first unfilled location in each bucket"""
+    unreachable_until: typing.Dict[typing.Tuple[int, int], int]
+    """Position in each plain or excluded bucket before which all locations are filled or unreachable in state"""
+    state: typing.Optional[CollectionState]
+    remaining: int
+
+    def __init__(self, locations: typing.Iterable[Location]) -> None:
+        self.locations = list(locations)
+        self.filled = bytearray(len(self.locations))
+        self.kinds = bytearray(len(self.locations))
+        self.buckets = {}
+        for index, location in enumerate(self.locations):
+            if type(location).can_fill is not Location.can_fill or location.item_rule is not default_item_rule \
+                    or location.always_allow is not default_always_allow:
+                kind = self._custom
+            elif location.progress_type == LocationProgressType.EXCLUDED:
+                kind = self._excluded
+            else:
+                kind = self._plain
+            self.kinds[index] = kind
+            self.buckets.setdefault((location.player, kind), []).append(index)
+        self.heads = dict.fromkeys(self.buckets, 0)
+        self.unreachable_until = {}
+        self.state = None
+        self.remaining = len(self.locations)
+
+    def __len__(self) -> int:
+        return self.remaining
+
+    def forget_reachability(self) -> None:
+        """Forgets which locations were found unreachable, for when the state passed to find lost items."""
+        self.state = None
+
+    def find(self, state: CollectionState, item: Item, check_access: bool = True,
+             player: typing.Optional[int] = None) -> typing.Optional[int]:
+        """
+        Returns the index of the first unfilled location that can be filled with item, like testing Location.can_fill
+        for each of them in order would.
+
+        :param player: only consider locations of this player
+        """
+        if state is not self.state:
+            self.state = state
+            self.unreachable_until = {}
+        best = len(self.locations)
+        for key, bucket in self.buckets.items():
+            location_player, kind = key
+            if player is not None and location_player != player:
+                continue
+            if kind == self._excluded and (item.advancement or item.useful):
+                continue
+            position = self.heads[key]
+            if check_access and kind != self._custom:
+                position = max(position, self.unreachable_until.get(key, 0))
+            for position in range(position, len(bucket)):
+                index = bucket[position]
+                if index >= best:
+                    break
+                if self.filled[index]:
+                    continue
+                location = self.locations[index]
+                if kind == self._custom:
+                    if location.can_fill(state, item, check_access):
+                        best = index
+                        break
+                elif not check_access or location.can_reach(state):
+                    best = index
+                    break
+            else:
+                position = len(bucket)
+            if check_access and kind != self._custom:
+                self.unreachable_until[key] = position
+        return best if best < len(self.locations) else None
+
+    def pop(self, index: int) -> Location:
+        """Marks the location at index as filled and returns it."""
+        location = self.locations[index]
+        self.filled[index] = 1
+        self.remaining -= 1
+        key = (location.player, self.kinds[index])
+        bucket = self.buckets[key]
+        head = self.heads[key]
+        while head < len(bucket) and self.filled[bucket[head]]:
+            head += 1
+        self.heads[key] = head
+        return location
+
+    def unfilled(self) -> typing.List[Location]:
+        """The unfilled locations in their original order."""
+        return [location for location, filled in zip(self.locations, self.filled) if not filled]
+
+
+@tracing.traced("fill")
 def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locations: typing.List[Location],
                      item_pool: typing.List[Item], single_player_placement: bool = False, lock: bool = False,
                      swap: bool = True, on_place: typing.Optional[typing.Callable[[Location], None]] = None,
@@ -58,12 +250,17 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     reachable_items: typing.Dict[int, typing.Deque[Item]] = {}
     for item in item_pool:
         reachable_items.setdefault(item.player, deque()).append(item)
+    exploration = MaximumExplorationState(base_state, item_pool)
+    candidates = CandidateLocations(locations)
 
     # for progress logging
     total = min(len(item_pool), len(locations))
     placed = 0
 
-    while any(reachable_items.values()) and locations:
+    trace = tracing.current
+    while any(reachable_items.values()) and candidates:
+        if trace:
+            trace.count("fill rounds")
         if one_item_per_player:
             # grab one item per player
             items_to_place = [items.pop()
@@ -82,16 +279,18 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                     del item_pool[-p]
                     break
 
-        maximum_exploration_state = sweep_from_pool(
-            base_state, item_pool + unplaced_items, multiworld.get_filled_locations(item.player)
-            if single_player_placement else None)
+        exploration.remove(items_to_place)
+        maximum_exploration_state = exploration.sweep(multiworld.get_filled_locations(item.player)
+                                                      if single_player_placement else None)
 
+        candidates.forget_reachability()
         has_beaten_game = multiworld.has_beaten_game(maximum_exploration_state)
 
         while items_to_place:
             # if we have run out of locations to fill,break out of this loop
-            if not locations:
+            if not candidates:
                 unplaced_items += items_to_place
+                exploration.add(items_to_place)
                 break
             item_to_place = items_to_place.pop(0)
 
@@ -105,14 +304,10 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
             else:
                 perform_access_check = True
 
-            for i, location in enumerate(locations):
-                if (not single_player_placement or location.player == item_to_place.player) \
-                        and location.can_fill(maximum_exploration_state, item_to_place, perform_access_check):
-                    # popping by index is faster than removing by content,
-                    spot_to_fill = locations.pop(i)
-                    # skipping a scan for the element
-                    break
-
+            index = candidates.find(maximum_exploration_state, item_to_place, perform_access_check,
+                                    item_to_place.player if single_player_placement else None)
+            if index is not None:
+                spot_to_fill = candidates.pop(index)
             else:
                 # we filled all reachable spots.
                 if swap:
@@ -176,10 +371,13 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
 
                             swap_count += 1
                             swapped_items[placed_item.player, placed_item.name, unsafe] = swap_count
+                            if trace:
+                                trace.count("fill swaps")
 
                             reachable_items[placed_item.player].appendleft(
                                 placed_item)
                             item_pool.append(placed_item)
+                            exploration.add((placed_item,))
 
                             # cleanup at the end to hopefully get better errors
                             cleanup_required = True
@@ -193,14 +391,18 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
                     if spot_to_fill is None:
                         # Can't place this item, move on to the next
                         unplaced_items.append(item_to_place)
+                        exploration.add((item_to_place,))
                         continue
                 else:
                     unplaced_items.append(item_to_place)
+                    exploration.add((item_to_place,))
                     continue
             multiworld.push_item(spot_to_fill, item_to_place, False)
             spot_to_fill.locked = lock
             placements.append(spot_to_fill)
             placed += 1
+            if trace:
+                trace.count("fill placements")
             if not placed % 1000:
                 _log_fill_progress(name, placed, total)
             if on_place:
@@ -209,6 +411,8 @@ def fill_restrictive(multiworld: MultiWorld, base_state: CollectionState, locati
     if total > 1000:
         _log_fill_progress(name, placed, total)
 
+    locations[:] = candidates.unfilled()
+
     if cleanup_required:
         # validate all placements and remove invalid ones
         state = sweep_from_pool(
@@ -371,9 +575,9 @@ def accessibility_corrections(multiworld: MultiWorld,
     maximum_exploration_state = sweep_from_pool(state, pool)
     minimal_players = {player for player in multiworld.player_ids if
                        multiworld.worlds[player].options.accessibility == "minimal"}
-    unreachable_locations = [location for location in multiworld.get_locations() if
-                             location.player in minimal_players and
-                             not location.can_reach(maximum_exploration_state)]
+    minimal_locations = [location for location in multiworld.get_locations() if location.player in minimal_players]
+    reachable_locations = set(maximum_exploration_state.reachable_locations(minimal_locations))
+    unreachable_locations = [location for location in minimal_locations if location not in reachable_locations]
     for location in unreachable_locations:
         if (location.item is not None and location.item.advancement and location.address is not None and not
                 location.locked and location.item.player not in minimal_players):
@@ -390,7 +594,8 @@ def accessibility_corrections(multiworld: MultiWorld,
 
 def inaccessible_location_rules(multiworld: MultiWorld, state: CollectionState, locations):
     maximum_exploration_state = sweep_from_pool(state)
-    unreachable_locations = [location for location in locations if not location.can_reach(maximum_exploration_state)]
+    reachable_locations = set(maximum_exploration_state.reachable_locations(locations))
+    unreachable_locations = [location for location in locations if location not in reachable_locations]
     if unreachable_locations:
         def forbid_important_item_rule(item: Item):
             return not ((item.classification & 0b0011) and multiworld.worlds[item.player].options.accessibility != "minimal")
@@ -415,8 +620,9 @@ def distribute_early_items(multiworld: MultiWorld,
         loc_indexes_to_remove: typing.Set[int] = set()
         base_state = multiworld.state.copy()
         base_state.sweep_for_advancements(locations=(loc for loc in multiworld.get_filled_locations() if loc.address is None))
+        reachable_locations = set(base_state.reachable_locations(fill_locations))
         for i, loc in enumerate(fill_locations):
-            if loc.can_reach(base_state):
+            if loc in reachable_locations:
                 if loc.progress_type == LocationProgressType.PRIORITY:
                     early_priority_locations.append(loc)
                 else:
@@ -730,6 +936,32 @@ def flood_items(multiworld: MultiWorld) -> None:
                 break
 
 
+def find_items_to_move(state: CollectionState, items_to_test: typing.List[Location],
+                       must_move: typing.Callable[[int], bool]) -> typing.List[Location]:
+    """
+    Returns the candidates of items_to_test that progression balancing has to move, in order, collecting them into
+    state. must_move(tested) has to tell whether items_to_test[tested] has to move, with the ones found so far and the
+    untested ones after it collected.
+    Leaving out more candidates can only make the reduced state worse, so with the candidates that have to move fixed,
+    the next one that has to move is binary searched for instead of testing every candidate.
+    """
+    items_to_move: typing.List[Location] = []
+    first_untested = 0
+    while first_untested < len(items_to_test) and must_move(len(items_to_test) - 1):
+        low, high = first_untested, len(items_to_test) - 1
+        while low < high:
+            middle = (low + high) // 2
+            if must_move(middle):
+                high = middle
+            else:
+                low = middle + 1
+        testing = items_to_test[low]
+        items_to_move.append(testing)
+        state.collect(testing.item, True, testing)
+        first_untested = low + 1
+    return items_to_move
+
+
 def balance_multiworld_progression(multiworld: MultiWorld) -> None:
     # A system to reduce situations where players have no checks remaining, popularly known as "BK mode."
     # Overall progression balancing algorithm:
@@ -768,14 +1000,37 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
         }
         sphere_num: int = 1
         moved_item_count: int = 0
+        frontier = LocationFrontier(state, unchecked_locations)
+        # The spheres after the current one that balancing looked ahead for, with whether the game is beaten before
+        # each of them, and the state with all of them collected to look further ahead from. They are kept for the
+        # next spheres and balancing attempts until items are moved.
+        explored_spheres: typing.List[typing.Tuple[typing.Set[Location], bool]] = []
+        explored_state: typing.Optional[CollectionState] = None
+        explored_frontier: typing.Optional[LocationFrontier] = None
 
         def get_sphere_locations(sphere_state: CollectionState,
                                  locations: typing.Set[Location]) -> typing.Set[Location]:
-            return {loc for loc in locations if sphere_state.can_reach(loc)}
+            return set(sphere_state.reachable_locations(locations))
 
         def item_percentage(player: int, num: int) -> float:
             return num / total_locations_count[player]
 
+        def must_move(player: int, items_to_test: typing.List[Location], locations_to_test: typing.Set[Location],
+                      beats_game: bool, threshold_percentage: float, tested: int) -> bool:
+            """Whether items_to_test[tested] has to move, given the candidates collected into state so far"""
+            reducing_checkpoint = state.checkpoint()
+            for location in reversed(items_to_test[tested + 1:]):
+                state.collect(location.item, True, location)
+            state.sweep_for_advancements(locations=locations_to_test)
+            if beats_game:
+                result = not multiworld.has_beaten_game(state)
+            else:
+                reduced_sphere = get_sphere_locations(state, locations_to_test)
+                p = item_percentage(player, reachable_locations_count[player] + len(reduced_sphere))
+                result = p < threshold_percentage
+            state.rollback(reducing_checkpoint)
+            return result
+
         # If there are no locations that aren't locked, there's no point in attempting to balance progression.
         if len(total_locations_count) == 0:
             return
@@ -784,7 +1039,12 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
             # Gather non-locked locations.
             # This ensures that only shuffled locations get counted for progression balancing,
             #   i.e. the items the players will be checking.
-            sphere_locations = get_sphere_locations(state, unchecked_locations)
+            if explored_spheres:
+                sphere_locations = explored_spheres.pop(0)[0]
+            else:
+                sphere_locations = set(frontier.find_reachable())
+                explored_state = explored_frontier = None
+            frontier.remove(sphere_locations)
             for location in sphere_locations:
                 unchecked_locations.remove(location)
                 if not location.locked:
@@ -814,16 +1074,21 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         and item_percentage(player, reachables) < threshold_percentages[player])
                 }
                 if balancing_players:
-                    balancing_state = state.copy()
-                    balancing_unchecked_locations = unchecked_locations.copy()
+                    if explored_state is None:
+                        explored_state = state.copy()
+                        for location in sphere_locations:
+                            if location.advancement:
+                                explored_state.collect(location.item, True, location)
+                        explored_frontier = LocationFrontier(explored_state, unchecked_locations)
+                    assert explored_frontier is not None
                     balancing_reachables = reachable_locations_count.copy()
-                    balancing_sphere = sphere_locations.copy()
+                    balancing_sphere = sphere_locations
+                    explored_count = 0
                     candidate_items: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
                     while True:
                         # Check locations in the current sphere and gather progression items to swap earlier
                         for location in balancing_sphere:
                             if location.advancement:
-                                balancing_state.collect(location.item, True, location)
                                 player = location.item.player
                                 # only replace items that end up in another player's world
                                 if (not location.locked and not location.item.skip_in_prog_balancing and
@@ -832,12 +1097,19 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                                         location.progress_type != LocationProgressType.PRIORITY):
                                     candidate_items[player].add(location)
                                     logging.debug(f"Candidate item: {location.name}, {location.item.name}")
-                        balancing_sphere = get_sphere_locations(balancing_state, balancing_unchecked_locations)
+                        if explored_count == len(explored_spheres):
+                            next_sphere = set(explored_frontier.find_reachable())
+                            explored_frontier.remove(next_sphere)
+                            explored_spheres.append((next_sphere, multiworld.has_beaten_game(explored_state)))
+                            for location in next_sphere:
+                                if location.advancement:
+                                    explored_state.collect(location.item, True, location)
+                        balancing_sphere, balancing_state_beats_game = explored_spheres[explored_count]
+                        explored_count += 1
                         for location in balancing_sphere:
-                            balancing_unchecked_locations.remove(location)
                             if not location.locked:
                                 balancing_reachables[location.player] += 1
-                        if multiworld.has_beaten_game(balancing_state) or all(
+                        if balancing_state_beats_game or all(
                                 item_percentage(player, reachables) >= threshold_percentages[player]
                                 for player, reachables in balancing_reachables.items()
                                 if player in threshold_percentages):
@@ -846,8 +1118,8 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                             raise RuntimeError("Not all required items reachable. Something went terribly wrong here.")
                     # Gather a set of locations which we can swap items into
                     unlocked_locations: typing.Dict[int, typing.Set[Location]] = collections.defaultdict(set)
-                    for l in unchecked_locations:
-                        if l not in balancing_unchecked_locations:
+                    for explored_sphere, _ in explored_spheres[:explored_count]:
+                        for l in explored_sphere:
                             unlocked_locations[l.player].add(l)
                     items_to_replace: typing.List[Location] = []
                     for player in balancing_players:
@@ -855,25 +1127,15 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                         items_to_test = list(candidate_items[player])
                         items_to_test.sort()
                         multiworld.random.shuffle(items_to_test)
-                        while items_to_test:
-                            testing = items_to_test.pop()
-                            reducing_state = state.copy()
-                            for location in itertools.chain((
-                                    l for l in items_to_replace
-                                    if l.item.player == player
-                            ), items_to_test):
-                                reducing_state.collect(location.item, True, location)
-
-                            reducing_state.sweep_for_advancements(locations=locations_to_test)
-
-                            if multiworld.has_beaten_game(balancing_state):
-                                if not multiworld.has_beaten_game(reducing_state):
-                                    items_to_replace.append(testing)
-                            else:
-                                reduced_sphere = get_sphere_locations(reducing_state, locations_to_test)
-                                p = item_percentage(player, reachable_locations_count[player] + len(reduced_sphere))
-                                if p < threshold_percentages[player]:
-                                    items_to_replace.append(testing)
+                        # candidates are tested from the end, each one against the state with the candidates that have
+                        # to move so far and all untested ones
+                        items_to_test.reverse()
+                        replaced_checkpoint = state.checkpoint()
+                        items_to_replace += find_items_to_move(
+                            state, items_to_test,
+                            functools.partial(must_move, player, items_to_test, locations_to_test,
+                                              balancing_state_beats_game, threshold_percentages[player]))
+                        state.rollback(replaced_checkpoint)
 
                     old_moved_item_count = moved_item_count
 
@@ -908,6 +1170,9 @@ def balance_multiworld_progression(multiworld: MultiWorld) -> None:
                             if not location.locked:
                                 reachable_locations_count[location.player] += 1
                             sphere_locations.add(location)
+                        frontier.remove(sphere_locations)
+                        explored_spheres.clear()
+                        explored_state = explored_frontier = None
 
             for location in sphere_locations:
                 if location.advancement:
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
 import copy
 import logging
 import os
@@ -11,7 +12,8 @@ import urllib.parse
 import urllib.request
 from collections import Counter
 from itertools import chain
-from typing import Any
+from collections.abc import Callable
+from typing import Any, TypeVar
 
 import ModuleUpdate
 
@@ -22,6 +24,8 @@ import Options
 from BaseClasses import seeddigits, get_seed, PlandoOptions
 from Utils import parse_yamls, version_tuple, __version__, tuplize_version
 
+T = TypeVar("T")
+
 
 def mystery_argparse(argv: list[str] | None = None):
     from settings import get_settings
@@ -57,6 +61,25 @@ def mystery_argparse(argv: list[str] | None = None):
     parser.add_argument("--spoiler_only", action="store_true",
                         help="Skips generation assertion and multidata, outputting only a spoiler log. "
                              "Intended for debugging and testing purposes.")
+    parser.add_argument("--profile_out", default=None,
+                        help="Path to write a trace of the generation to, as Chrome trace-event JSON. Records the time "
+                             "taken per stage and world, fill and sweep statistics, access rule evaluations per "
+                             "location and entrance, and peak memory. Slows down generation.")
+    parser.add_argument("--roll_workers", default=1, type=lambda value: max(int(value), 1),
+                        help="Number of processes reading and rolling player files in parallel. "
+                             "The rolled options are the same with any number of workers.")
+    parser.add_argument("--seeds", default=1, type=lambda value: max(int(value), 1),
+                        help="Number of seeds to generate from each player files folder. More than one generates in "
+                             "batch mode, which loads the worlds once and writes the results to --batch_summary. "
+                             "With --seed, the seeds count up from it.")
+    parser.add_argument("--workers", default=1, type=lambda value: max(int(value), 1),
+                        help="Number of processes generating seeds in parallel in batch mode.")
+    parser.add_argument("--batch_paths", nargs="+", default=None,
+                        help="Player files folders to generate --seeds seeds from each in batch mode. "
+                             "Output of each folder is written to a subfolder of --outputpath named after it.")
+    parser.add_argument("--batch_summary", default=None,
+                        help="Path to write the results of a batch to as JSON. "
+                             "Defaults to batch_summary.json in --outputpath.")
     args = parser.parse_args(argv)
 
     if args.skip_output and args.spoiler_only:
@@ -64,22 +87,37 @@ def mystery_argparse(argv: list[str] | None = None):
     elif args.spoiler == 0 and args.spoiler_only:
         parser.error("Cannot use --spoiler_only when --spoiler=0. Use --skip_output or set --spoiler to a different value")
 
-    if not os.path.isabs(args.weights_file_path):
-        args.weights_file_path = os.path.join(args.player_files_path, args.weights_file_path)
-    if not os.path.isabs(args.meta_file_path):
-        args.meta_file_path = os.path.join(args.player_files_path, args.meta_file_path)
+    args.batch = None
+    if args.batch_paths or args.seeds > 1:
+        if args.profile_out:
+            parser.error("Cannot use --profile_out in batch mode")
+        batch_paths = args.batch_paths or [args.player_files_path]
+        folder_names = [os.path.basename(os.path.normpath(path)) for path in batch_paths]
+        if len(set(folder_names)) != len(folder_names):
+            parser.error(f"Folders in --batch_paths need unique names. Names: {Counter(folder_names)}")
+        args.batch = [(path, *resolve_weights_paths(args, path)) for path in batch_paths]
+        if args.batch_summary is None:
+            args.batch_summary = os.path.join(args.outputpath, "batch_summary.json")
+    args.weights_file_path, args.meta_file_path = resolve_weights_paths(args, args.player_files_path)
     args.plando: PlandoOptions = PlandoOptions.from_option_string(args.plando)
 
     return args
 
 
+def resolve_weights_paths(args: argparse.Namespace, player_files_path: str) -> tuple[str, str]:
+    """Returns the weights and meta file paths of args, with relative paths resolved in player_files_path."""
+    return tuple(path if os.path.isabs(path) else os.path.join(player_files_path, path)
+                 for path in (args.weights_file_path, args.meta_file_path))
+
+
 def get_seed_name(random_source) -> str:
     return f"{random_source.randint(0, pow(10, seeddigits) - 1)}".zfill(seeddigits)
 
 
 def main(args=None) -> tuple[argparse.Namespace, int]:
     # __name__ == "__main__" check so unittests that already imported worlds don't trip this.
-    if __name__ == "__main__" and "worlds" in sys.modules:
+    # Forked batch workers inherit the worlds, loaded by their parent after it initialized logging.
+    if __name__ == "__main__" and "worlds" in sys.modules and not logging.getLogger().handlers:
         raise Exception("Worlds system should not be loaded before logging init.")
 
     if not args:
@@ -122,22 +160,20 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
 
     player_id = 1
     player_files = {}
-    for file in os.scandir(args.player_files_path):
-        fname = file.name
-        if file.is_file() and not fname.startswith(".") and not fname.lower().endswith(".ini") and \
-                os.path.join(args.player_files_path, fname) not in {args.meta_file_path, args.weights_file_path}:
-            path = os.path.join(args.player_files_path, fname)
-            try:
-                weights_for_file = []
-                for doc_idx, yaml in enumerate(read_weights_yamls(path)):
-                    if yaml is None:
-                        logging.warning(f"Ignoring empty yaml document #{doc_idx + 1} in {fname}")
-                    else:
-                        weights_for_file.append(yaml)
-                weights_cache[fname] = tuple(weights_for_file)
-                        
-            except Exception as e:
-                raise ValueError(f"File {fname} is invalid. Please fix your yaml.") from e
+    file_names = [file.name for file in os.scandir(args.player_files_path)
+                  if file.is_file() and not file.name.startswith(".") and not file.name.lower().endswith(".ini")
+                  and os.path.join(args.player_files_path, file.name) not in {args.meta_file_path,
+                                                                               args.weights_file_path}]
+    yamls = map_weights(read_weights_yamls, [(os.path.join(args.player_files_path, fname),) for fname in file_names],
+                        file_names, args.roll_workers)
+    for fname, yaml_data in zip(file_names, yamls):
+        weights_for_file = []
+        for doc_idx, yaml in enumerate(yaml_data):
+            if yaml is None:
+                logging.warning(f"Ignoring empty yaml document #{doc_idx + 1} in {fname}")
+            else:
+                weights_for_file.append(yaml)
+        weights_cache[fname] = tuple(weights_for_file)
 
     # sort dict for consistent results across platforms:
     weights_cache = {key: value for key, value in sorted(weights_cache.items(), key=lambda k: k[0].casefold())}
@@ -171,10 +207,6 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     args.sprite_pool = dict.fromkeys(range(1, args.multi+1), None)
     args.name = {}
 
-    settings_cache: dict[str, tuple[argparse.Namespace, ...]] = \
-        {fname: (tuple(roll_settings(yaml, args.plando) for yaml in yamls) if args.sameoptions else None)
-         for fname, yamls in weights_cache.items()}
-
     if meta_weights:
         for category_name, category_dict in meta_weights.items():
             for key in category_dict:
@@ -203,13 +235,32 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     name_counter = Counter()
     args.player_options = {}
 
+    # every file is rolled once per player using it, or once in total with sameoptions, each with its own seed
+    # drawn from the seeded random source, so that the files can be rolled in any order and in parallel
+    roll_paths: list[str] = list(weights_cache) if args.sameoptions else []
+    player = 1
+    while player <= args.multi and not args.sameoptions:
+        path = player_path_cache[player]
+        if not path:
+            raise RuntimeError(f'No weights specified for player {player}')
+        roll_paths.append(path)
+        player += max(len(weights_cache[path]), 1)
+    roll_jobs = [(weights_cache[path], args.plando, random.getrandbits(64)) for path in roll_paths]
+    state = random.getstate()
+    try:
+        rolled_settings = iter(map_weights(roll_file_settings, roll_jobs, roll_paths, args.roll_workers))
+    finally:
+        random.setstate(state)  # restore the random source if the files were rolled in this process
+    settings_cache: dict[str, tuple[argparse.Namespace, ...]] = \
+        dict(zip(roll_paths, rolled_settings)) if args.sameoptions else {}
+
     player = 1
     while player <= args.multi:
         path = player_path_cache[player]
         if path:
             try:
-                settings: tuple[argparse.Namespace, ...] = settings_cache[path] if settings_cache[path] else \
-                    tuple(roll_settings(yaml, args.plando) for yaml in weights_cache[path])
+                settings: tuple[argparse.Namespace, ...] = settings_cache[path] if args.sameoptions else \
+                    next(rolled_settings)
                 for settingsObject in settings:
                     for k, v in vars(settingsObject).items():
                         if v is not None:
@@ -242,6 +293,122 @@ def main(args=None) -> tuple[argparse.Namespace, int]:
     return args, seed
 
 
+def process_pool(workers: int) -> concurrent.futures.ProcessPoolExecutor:
+    """Returns a pool of worker processes forked from this one where the platform supports it,
+    so that they inherit the loaded worlds."""
+    import multiprocessing
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+    return concurrent.futures.ProcessPoolExecutor(workers, mp_context=context)
+
+
+def map_weights(function: Callable[..., T], jobs: list[tuple[Any, ...]], paths: list[str], workers: int = 1) -> list[T]:
+    """
+    Calls function with the arguments of every job, in a pool of worker processes if workers is more than 1.
+    Errors are raised as a ValueError naming the path of the weights file of the job that failed.
+    """
+    if workers > 1 and len(jobs) > 1:
+        with process_pool(min(workers, len(jobs))) as pool:
+            futures = [pool.submit(function, *job) for job in jobs]
+            results = []
+            for path, future in zip(paths, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    pool.shutdown(cancel_futures=True)
+                    raise ValueError(f"File {path} is invalid. Please fix your yaml.") from e
+            return results
+    results = []
+    for path, job in zip(paths, jobs):
+        try:
+            results.append(function(*job))
+        except Exception as e:
+            raise ValueError(f"File {path} is invalid. Please fix your yaml.") from e
+    return results
+
+
+def batch_main(args: argparse.Namespace) -> list[dict[str, Any]]:
+    """
+    Generates args.seeds seeds from each player files folder of args.batch in args.workers processes.
+    The worlds are loaded once, before the workers are forked from this process where the platform supports it.
+    Returns the result of every seed, which are also written to args.batch_summary as they complete.
+    """
+    Utils.init_logging("Generate_batch", loglevel=args.log_level, add_timestamp=args.log_time)
+    from worlds import AutoWorldRegister
+    AutoWorldRegister.world_types.load_all()  # loaded here to be inherited by the workers
+
+    jobs: list[argparse.Namespace] = []
+    for player_files_path, weights_file_path, meta_file_path in args.batch:
+        for index in range(args.seeds):
+            job = copy.copy(args)
+            job.batch = None
+            job.player_files_path, job.weights_file_path, job.meta_file_path = \
+                player_files_path, weights_file_path, meta_file_path
+            if len(args.batch) > 1:
+                job.outputpath = os.path.join(args.outputpath, os.path.basename(os.path.normpath(player_files_path)))
+            job.seed = get_seed(None if args.seed is None else args.seed + index)
+            jobs.append(job)
+
+    workers = min(args.workers, len(jobs))
+    logging.info(f"Generating {len(jobs)} seeds from {len(args.batch)} folder{'s' if len(args.batch) > 1 else ''} "
+                 f"with {workers} worker{'s' if workers > 1 else ''}.")
+    results: list[dict[str, Any]] = []
+    with process_pool(workers) as pool:
+        futures = {pool.submit(generate_batch_seed, job): job for job in jobs}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:  # the worker died, for example because it ran out of memory
+                job = futures[future]
+                result = {"player_files_path": job.player_files_path, "seed": job.seed, "status": "failed",
+                          "error": f"{type(e).__name__}: {e}"}
+            results.append(result)
+            write_batch_summary(args.batch_summary, results)
+            logging.info(f"{len(results)}/{len(jobs)}: Seed {result['seed']} of {result['player_files_path']} "
+                         f"{result['status']}.")
+
+    failed = sum(result["status"] != "success" for result in results)
+    logging.info(f"Generated {len(results) - failed} of {len(results)} seeds. Summary: {args.batch_summary}")
+    return results
+
+
+def generate_batch_seed(args: argparse.Namespace) -> dict[str, Any]:
+    """Generates one seed of a batch. Returns its result, including the error if generation failed."""
+    import time
+    import traceback
+    from Main import main as ERmain
+
+    result: dict[str, Any] = {"player_files_path": args.player_files_path, "seed": args.seed}
+    start = time.perf_counter()
+    try:
+        erargs, seed = main(args)
+        result["seed_name"] = erargs.outputname
+        result["players"] = erargs.multi
+        ERmain(erargs, seed)
+    except Exception as e:
+        logging.exception(f"Failed to generate seed {args.seed} of {args.player_files_path}.")
+        result["status"] = "failed"
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc()
+    else:
+        result["status"] = "success"
+        result["outputpath"] = args.outputpath
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def write_batch_summary(path: str, results: list[dict[str, Any]]) -> None:
+    import json
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    summary = {
+        "seeds": len(results),
+        "failed": sum(result["status"] != "success" for result in results),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+
 def read_weights_yamls(path) -> tuple[Any, ...]:
     try:
         if urllib.parse.urlparse(path).scheme in ('https', 'file'):
@@ -467,6 +634,13 @@ def handle_option(ret: argparse.Namespace, game_weights: dict, option_key: str,
         player_option.verify(AutoWorldRegister.world_types[ret.game], ret.name, plando_options)
 
 
+def roll_file_settings(weights: tuple[dict, ...], plando_options: PlandoOptions,
+                       seed: int) -> tuple[argparse.Namespace, ...]:
+    """Rolls the options of every yaml document of a weights file, with the random source seeded with seed."""
+    random.seed(seed)
+    return tuple(roll_settings(yaml, plando_options) for yaml in weights)
+
+
 def roll_settings(weights: dict, plando_options: PlandoOptions = PlandoOptions.bosses):
     """
     Roll options from specified weights, usually originating from a .yaml options file.
@@ -599,7 +773,12 @@ def roll_alttp_settings(ret: argparse.Namespace, weights):
 if __name__ == '__main__':
     import atexit
     confirmation = atexit.register(input, "Press enter to close.")
-    erargs, seed = main()
+    args = mystery_argparse()
+    if args.batch:
+        results = batch_main(args)
+        atexit.unregister(confirmation)
+        sys.exit(any(result["status"] != "success" for result in results))
+    erargs, seed = main(args)
     from Main import main as ERmain
     multiworld = ERmain(erargs, seed)
     if __debug__:
@@ -7,16 +7,16 @@ import tempfile
 import time
 from typing import Any
 import zipfile
-import zlib
 
 import worlds
-from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
+from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld, SphereIndex
 from Fill import FillError, balance_multiworld_progression, distribute_items_restrictive, flood_items, \
     parse_planned_blocks, distribute_planned_blocks, resolve_early_locations_for_planned
-from NetUtils import convert_to_base_types
+from NetUtils import check_multidata_compression, convert_to_base_types
 from Options import StartInventoryPool
-from Utils import __version__, output_path, restricted_dumps, version_tuple
+from Utils import __version__, is_compressible, output_path, version_tuple
 from settings import get_settings
+import tracing
 from worlds import AutoWorld
 from worlds.generic.Rules import exclusion_rules, locality_rules
 
@@ -24,9 +24,19 @@ __all__ = ["main"]
 
 
 def main(args, seed=None, baked_server_options: dict[str, object] | None = None):
+    if args.profile_out:
+        with tracing.record(args.profile_out):
+            return _main(args, seed, baked_server_options)
+    return _main(args, seed, baked_server_options)
+
+
+def _main(args, seed=None, baked_server_options: dict[str, object] | None = None):
     if not baked_server_options:
         baked_server_options = get_settings().server_options.as_dict()
     assert isinstance(baked_server_options, dict)
+    generator_settings = get_settings().generator
+    # fail before generating rather than once the multidata gets written
+    check_multidata_compression(generator_settings.multidata_codec, generator_settings.multidata_compression_level)
     if args.outputpath:
         os.makedirs(args.outputpath, exist_ok=True)
         output_path.cached_path = args.outputpath
@@ -51,23 +61,27 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     multiworld.state = CollectionState(multiworld)
     logger.info('Archipelago Version %s  -  Seed: %s\n', __version__, multiworld.seed)
 
-    logger.info(f"Found {len(AutoWorld.AutoWorldRegister.world_types)} World Types:")
-    longest_name = max(len(text) for text in AutoWorld.AutoWorldRegister.world_types)
+    # only list the games of this multiworld, listing all would import every world
+    games = set(multiworld.game.values())
+    world_types = {name: cls for name, cls in AutoWorld.AutoWorldRegister.world_types.loaded().items()
+                   if name in games}
+    logger.info(f"Using {len(world_types)} World Types:")
+    longest_name = max(len(text) for text in world_types)
 
-    world_classes = AutoWorld.AutoWorldRegister.world_types.values()
+    world_classes = world_types.values()
 
     version_count = max(len(cls.world_version.as_simple_string()) for cls in world_classes)
     item_count = len(str(max(len(cls.item_names) for cls in world_classes)))
     location_count = len(str(max(len(cls.location_names) for cls in world_classes)))
 
-    for name, cls in AutoWorld.AutoWorldRegister.world_types.items():
+    for name, cls in world_types.items():
         if not cls.hidden and len(cls.item_names) > 0:
             logger.info(f" {name:{longest_name}}: "
                         f"v{cls.world_version.as_simple_string():{version_count}} | "
                         f"Items: {len(cls.item_names):{item_count}} | "
                         f"Locations: {len(cls.location_names):{location_count}}")
 
-    del item_count, location_count
+    del games, world_types, item_count, location_count
 
     # This assertion method should not be necessary to run if we are not outputting any multidata.
     if not args.skip_output and not args.spoiler_only:
@@ -142,6 +156,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     multiworld.plando_item_blocks = parse_planned_blocks(multiworld)
 
     AutoWorld.call_all(multiworld, "connect_entrances")
+    multiworld.freeze_region_graphs()
     AutoWorld.call_all(multiworld, "generate_basic")
 
     # remove starting inventory from pool items.
@@ -185,9 +200,13 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         multiworld._all_state = None
 
     logger.info("Running Item Plando.")
-    resolve_early_locations_for_planned(multiworld)
-    distribute_planned_blocks(multiworld, [x for player in multiworld.plando_item_blocks
-                                           for x in multiworld.plando_item_blocks[player]])
+    with tracing.span("item plando"):
+        resolve_early_locations_for_planned(multiworld)
+        distribute_planned_blocks(multiworld, [x for player in multiworld.plando_item_blocks
+                                               for x in multiworld.plando_item_blocks[player]])
+
+    if tracing.current:
+        tracing.current.instrument_rules(multiworld)
 
     logger.info('Running Pre Main Fill.')
 
@@ -195,15 +214,17 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     logger.info(f'Filling the multiworld with {len(multiworld.itempool)} items.')
 
-    if multiworld.algorithm == 'flood':
-        flood_items(multiworld)  # different algo, biased towards early game progress items
-    elif multiworld.algorithm == 'balanced':
-        distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
+    with tracing.span("main fill"):
+        if multiworld.algorithm == 'flood':
+            flood_items(multiworld)  # different algo, biased towards early game progress items
+        elif multiworld.algorithm == 'balanced':
+            distribute_items_restrictive(multiworld, get_settings().generator.panic_method)
 
     AutoWorld.call_all(multiworld, 'post_fill')
 
     if multiworld.players > 1 and not args.skip_prog_balancing:
-        balance_multiworld_progression(multiworld)
+        with tracing.span("progression balancing"):
+            balance_multiworld_progression(multiworld)
     else:
         logger.info("Progression balancing skipped.")
 
@@ -216,11 +237,14 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
     logger.info(f'Beginning output...')
     outfilebase = 'AP_' + multiworld.seed_name
+    with tracing.span("sphere index"):
+        sphere_index = SphereIndex(multiworld)
 
     if args.spoiler_only:
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            with tracing.span("playthrough"):
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2, sphere_index=sphere_index)
 
         multiworld.spoiler.to_file(output_path('%s_Spoiler.txt' % outfilebase))
         logger.info('Done. Skipped multidata modification. Total time: %s', time.perf_counter() - start)
@@ -230,10 +254,26 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     with output as temp_dir:
         output_players = [player for player in multiworld.player_ids if AutoWorld.World.generate_output.__code__
                           is not multiworld.worlds[player].generate_output.__code__]
-        with concurrent.futures.ThreadPoolExecutor(len(output_players) + 2) as pool:
-            check_accessibility_task = pool.submit(multiworld.fulfills_accessibility)
-
-            output_file_futures = [pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir)]
+        process_output_players = [player for player in multiworld.player_ids if AutoWorld.World.write_output.__code__
+                                  is not multiworld.worlds[player].write_output.__code__]
+        with concurrent.futures.ThreadPoolExecutor(len(output_players) + len(process_output_players) + 2) as pool, \
+                concurrent.futures.ProcessPoolExecutor(max(1, min(len(process_output_players), os.cpu_count() or 1))) \
+                as process_pool:
+            if process_output_players:
+                # when forking, the first task starts all workers, which has to happen before the thread pool starts
+                # any threads, as they could hold locks the workers would inherit
+                process_pool.submit(int)
+
+            def prepare_and_write_output(player: int) -> None:
+                payload = AutoWorld.call_single(multiworld, "prepare_output", player, temp_dir)
+                if payload is not None:
+                    process_pool.submit(AutoWorld.call_write_output, type(multiworld.worlds[player]), payload,
+                                        temp_dir, player, multiworld.player_name[player]).result()
+
+            output_file_futures = [pool.submit(prepare_and_write_output, player) for player in process_output_players]
+            check_accessibility_task = pool.submit(multiworld.fulfills_accessibility, None, sphere_index)
+
+            output_file_futures.append(pool.submit(AutoWorld.call_stage, multiworld, "generate_output", temp_dir))
             for player in output_players:
                 # skip starting a thread for methods that say "pass".
                 output_file_futures.append(
@@ -243,6 +283,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
             er_hint_data: dict[int, dict[int, str]] = {}
             AutoWorld.call_all(multiworld, 'extend_hint_information', er_hint_data)
 
+            @tracing.traced("output")
             def write_multidata():
                 import NetUtils
                 from NetUtils import HintStatus
@@ -318,7 +359,7 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
                 # get spheres -> filter address==None -> skip empty
                 spheres: list[dict[int, set[int]]] = []
-                for sphere in multiworld.get_sendable_spheres():
+                for sphere in multiworld.get_sendable_spheres(sphere_index):
                     current_sphere: dict[int, set[int]] = collections.defaultdict(set)
                     for sphere_location in sphere:
                         current_sphere[sphere_location.player].add(sphere_location.address)
@@ -350,15 +391,13 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 for key in ("slot_data", "er_hint_data"):
                     multidata[key] = convert_to_base_types(multidata[key])
 
-                serialized_multidata = zlib.compress(restricted_dumps(multidata), 9)
-
                 with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(serialized_multidata)
+                    NetUtils.dump_multidata(multidata, f, generator_settings.multidata_codec,
+                                            generator_settings.multidata_compression_level)
 
             output_file_futures.append(pool.submit(write_multidata))
             if not check_accessibility_task.result():
-                if not multiworld.can_beat_game():
+                if not multiworld.has_beaten_game(sphere_index.state):
                     raise FillError("Game appears as unbeatable. Aborting.", multiworld=multiworld)
                 else:
                     logger.warning("Location Accessibility requirements not fulfilled.")
@@ -371,17 +410,20 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
 
         if args.spoiler > 1:
             logger.info('Calculating playthrough.')
-            multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2)
+            with tracing.span("playthrough"):
+                multiworld.spoiler.create_playthrough(create_paths=args.spoiler > 2, sphere_index=sphere_index)
 
         if args.spoiler:
-            multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
+            with tracing.span("spoiler"):
+                multiworld.spoiler.to_file(os.path.join(temp_dir, '%s_Spoiler.txt' % outfilebase))
 
         zipfilename = output_path(f"AP_{multiworld.seed_name}.zip")
         logger.info(f"Creating final archive at {zipfilename}")
-        with zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
-                             compresslevel=9) as zf:
+        with tracing.span("archive"), zipfile.ZipFile(zipfilename, mode="w", compression=zipfile.ZIP_DEFLATED,
+                                                      compresslevel=9) as zf:
             for file in os.scandir(temp_dir):
-                zf.write(file.path, arcname=file.name)
+                zf.write(file.path, arcname=file.name,
+                         compress_type=None if is_compressible(file.path) else zipfile.ZIP_STORED)
 
     logger.info('Done. Enjoy. Total Time: %s', time.perf_counter() - start)
     return multiworld
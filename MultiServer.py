@@ -43,7 +43,7 @@ import NetUtils
 import Utils
 from Utils import version_tuple, restricted_loads, Version, async_start, get_intended_text
 from NetUtils import Endpoint, ClientStatus, NetworkItem, decode, encode, NetworkPlayer, Permission, NetworkSlot, \
-    SlotType, LocationStore, MultiData, Hint, HintStatus
+    SlotType, LocationStore, MultiData, Hint, HintStatus, decode_multidata
 from BaseClasses import ItemClassification
 
 
@@ -235,9 +235,9 @@ class Context:
     generator_version = Version(0, 0, 0)
     checksums: typing.Dict[str, str]
     item_names: typing.Dict[str, typing.Dict[int, str]]
-    item_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
+    item_name_groups: typing.Dict[str, typing.Dict[str, typing.Collection[str]]]
     location_names: typing.Dict[str, typing.Dict[int, str]]
-    location_name_groups: typing.Dict[str, typing.Dict[str, typing.Set[str]]]
+    location_name_groups: typing.Dict[str, typing.Dict[str, typing.Collection[str]]]
     all_item_and_group_names: typing.Dict[str, typing.Set[str]]
     all_location_and_group_names: typing.Dict[str, typing.Set[str]]
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
@@ -308,6 +308,7 @@ class Context:
         self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
         self.read_data = {}
         self.spheres = []
+        self.location_spheres: typing.Dict[typing.Tuple[int, int], int] = {}
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
@@ -329,12 +330,15 @@ class Context:
         import worlds
         self.gamespackage = worlds.network_data_package["games"]
 
-        self.item_name_groups = {world_name: world.item_name_groups for world_name, world in
-                                 worlds.AutoWorldRegister.world_types.items()}
-        self.location_name_groups = {world_name: world.location_name_groups for world_name, world in
-                                     worlds.AutoWorldRegister.world_types.items()}
-        for world_name, world in worlds.AutoWorldRegister.world_types.items():
-            self.non_hintable_names[world_name] = world.hint_blacklist
+        # groups are taken from the data packages, which may be cached, so worlds are only imported for their hint
+        # blacklist once a game is hinted for
+        self.item_name_groups = {world_name: game_package["item_name_groups"] for world_name, game_package in
+                                 self.gamespackage.items()}
+        self.location_name_groups = {world_name: game_package["location_name_groups"] for world_name, game_package in
+                                     self.gamespackage.items()}
+        self.non_hintable_names = Utils.KeyedDefaultDict(
+            lambda game: worlds.AutoWorldRegister.world_types[game].hint_blacklist
+            if game in worlds.AutoWorldRegister.world_types else frozenset())
 
         for game_package in self.gamespackage.values():
             # remove groups from data sent to clients
@@ -479,11 +483,8 @@ class Context:
         self.data_filename = multidatapath
 
     @staticmethod
-    def decompress(data: bytes) -> dict:
-        format_version = data[0]
-        if format_version > 3:
-            raise Utils.VersionException("Incompatible multidata.")
-        return restricted_loads(zlib.decompress(data[1:]))
+    def decompress(data: bytes) -> MultiData:
+        return decode_multidata(data)
 
     def _load(self, decoded_obj: MultiData, game_data_packages: typing.Dict[str, typing.Any],
               use_embedded_server_options: bool):
@@ -570,6 +571,8 @@ class Context:
 
         # sorted access spheres
         self.spheres = decoded_obj.get("spheres", [])
+        self.location_spheres = {(player, location_id): i for i, sphere in enumerate(self.spheres)
+                                 for player, location_ids in sphere.items() for location_id in location_ids}
 
     # saving
 
@@ -754,9 +757,8 @@ class Context:
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
-            for i, sphere in enumerate(self.spheres):
-                if location_id in sphere.get(player, set()):
-                    return i
+            if (player, location_id) in self.location_spheres:
+                return self.location_spheres[player, location_id]
             raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {player}. "
                            f"Location or player may not exist.")
         return -1
@@ -1,15 +1,22 @@
 from __future__ import annotations
 
-from collections.abc import Mapping, Sequence
+from collections.abc import Iterator, Mapping, MutableMapping, Sequence
+import bz2
+import io
 import typing
 import enum
+import json
+import lzma
+import pickle
+import types
 import warnings
+import zlib
 from json import JSONEncoder, JSONDecoder
 
 if typing.TYPE_CHECKING:
     from websockets import WebSocketServerProtocol as ServerConnection
 
-from Utils import ByValue, Version
+from Utils import ByValue, RestrictedUnpickler, Version, VersionException, restricted_loads
 
 
 class HintStatus(ByValue, enum.IntEnum):
@@ -510,6 +517,195 @@ class MultiData(typing.TypedDict):
     race_mode: int
 
 
+multidata_format = 5
+"""
+Format version of written .archipelago files, stored in their first byte.
+Format 3 is a zlib compressed pickle of the MultiData dict.
+Format 4 is followed by the length of a table of contents as 4 bytes little endian, then the table of contents as JSON,
+mapping every key to the offset and length of its section after it. Each section is a zlib compressed pickle of the
+value, so that it can be loaded on its own.
+Format 5 is followed by the sections first, so that they can be written as they are compressed. They are followed by the
+table of contents as JSON, naming the codec of the sections and mapping every key to the offset and length of its
+section, and lastly the length of the table of contents as 4 bytes little endian.
+"""
+
+
+class _Compressor(typing.Protocol):
+    def compress(self, data: bytes, /) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
+multidata_codecs: dict[str, tuple[typing.Callable[[int], _Compressor], typing.Callable[[bytes], bytes]]] = {
+    "zlib": (zlib.compressobj, zlib.decompress),
+    "lzma": (lambda level: lzma.LZMACompressor(preset=level), lzma.decompress),
+    "bz2": (lambda level: bz2.BZ2Compressor(max(level, 1)), bz2.decompress),
+}
+"""Compressor factory taking a level from 0 to 9, and decompress function of every codec sections can use"""
+
+
+def check_multidata_compression(codec: str, level: int) -> None:
+    """Raises a ValueError if multidata can't be written with codec at level."""
+    if codec not in multidata_codecs:
+        raise ValueError(f"Unknown multidata codec {codec}. Available codecs: {', '.join(multidata_codecs)}")
+    if not isinstance(level, int) or not 0 <= level <= 9:
+        raise ValueError(f"Multidata compression level {level} is not from 0 to 9.")
+
+
+class _CompressingWriter:
+    """Writable that compresses everything written to it into file, counting the compressed bytes."""
+    __slots__ = ("file", "compressor", "length")
+
+    def __init__(self, file: typing.BinaryIO, compressor: _Compressor) -> None:
+        self.file = file
+        self.compressor = compressor
+        self.length = 0
+
+    def _write_compressed(self, data: bytes) -> None:
+        self.file.write(data)
+        self.length += len(data)
+
+    def write(self, data: bytes) -> int:
+        self._write_compressed(self.compressor.compress(data))
+        return len(data)
+
+    def flush(self) -> int:
+        """Writes the rest of the compressed data and returns the length of all of it."""
+        self._write_compressed(self.compressor.flush())
+        return self.length
+
+
+class _RestrictedPickler(pickle.Pickler):
+    """Pickler that refuses to pickle a class or function by reference if restricted_loads wouldn't load it."""
+
+    def __init__(self, file: typing.IO[bytes]) -> None:
+        super().__init__(file)
+        self.unpickler = RestrictedUnpickler(io.BytesIO())
+
+    def reducer_override(self, obj: typing.Any) -> typing.Any:
+        if isinstance(obj, (type, types.FunctionType, types.BuiltinFunctionType)):
+            name = getattr(obj, "__qualname__", obj.__name__)
+            try:
+                self.unpickler.find_class(pickle.whichmodule(obj, name), name)
+            except pickle.UnpicklingError as e:
+                raise pickle.PicklingError(e) from e
+        return NotImplemented
+
+
+def dump_multidata(multidata: Mapping[str, typing.Any], file: typing.BinaryIO,
+                   codec: str = "zlib", level: int = 6) -> None:
+    """
+    Writes multidata to file in the current format, pickling every value straight into its compressor.
+    Every class and function is checked to be loadable by restricted_loads while pickling.
+    Unchanged sections of SectionedMultiData using the same codec are kept as they are.
+    """
+    check_multidata_compression(codec, level)
+    compressor = multidata_codecs[codec][0]
+    reuse_sections = isinstance(multidata, SectionedMultiData) and multidata.codec == codec
+    sections: dict[str, tuple[int, int]] = {}
+    offset = 0
+    file.write(bytes([multidata_format]))
+    for key in multidata:
+        section = multidata.compressed_section(key) if reuse_sections else None
+        if section is None:
+            writer = _CompressingWriter(file, compressor(level))
+            try:
+                _RestrictedPickler(writer).dump(multidata[key])
+            except pickle.PicklingError as e:
+                raise pickle.PicklingError(f"{key}: {e}") from e
+            length = writer.flush()
+        else:
+            file.write(section)
+            length = len(section)
+        sections[key] = (offset, length)
+        offset += length
+    table_of_contents = json.dumps({"codec": codec, "sections": sections}).encode()
+    file.write(table_of_contents)
+    file.write(len(table_of_contents).to_bytes(4, "little"))
+
+
+def encode_multidata(multidata: Mapping[str, typing.Any], codec: str = "zlib", level: int = 6) -> bytes:
+    """Returns multidata encoded in the current format, see dump_multidata."""
+    data = io.BytesIO()
+    dump_multidata(multidata, data, codec, level)
+    return data.getvalue()
+
+
+def decode_multidata(data: bytes) -> MultiData:
+    """Decodes multidata of any supported format. Sectioned formats are loaded lazily, see SectionedMultiData."""
+    format_version = data[0]
+    if format_version > multidata_format:
+        raise VersionException("Incompatible multidata.")
+    if format_version >= 4:
+        return typing.cast(MultiData, SectionedMultiData(data))
+    return restricted_loads(zlib.decompress(data[1:]))
+
+
+class SectionedMultiData(MutableMapping[str, typing.Any]):
+    """
+    Multidata of format 4 or 5 that decompresses and unpickles each section the first time it's accessed,
+    so that readers only pay for the keys they use.
+    """
+    __slots__ = ("codec", "_decompress", "_data", "_sections", "_loaded")
+
+    codec: str
+    _decompress: typing.Callable[[bytes], bytes]
+    _data: memoryview
+    _sections: dict[str, tuple[int, int] | None]
+    """Start and end of each key's section in _data, None for keys that were set afterwards"""
+    _loaded: dict[str, typing.Any]
+
+    def __init__(self, data: bytes) -> None:
+        if data[0] == 4:
+            table_end = 5 + int.from_bytes(data[1:5], "little")
+            table_of_contents = {"codec": "zlib", "sections": json.loads(bytes(data[5:table_end]))}
+            sections_start = table_end
+        else:
+            table_start = len(data) - 4 - int.from_bytes(data[-4:], "little")
+            table_of_contents = json.loads(bytes(data[table_start:-4]))
+            sections_start = 1
+        self.codec = table_of_contents["codec"]
+        if self.codec not in multidata_codecs:
+            raise VersionException(f"Incompatible multidata codec {self.codec}.")
+        self._decompress = multidata_codecs[self.codec][1]
+        self._data = memoryview(data)
+        self._sections = {key: (sections_start + offset, sections_start + offset + length)
+                          for key, (offset, length) in table_of_contents["sections"].items()}
+        self._loaded = {}
+
+    def __getitem__(self, key: str) -> typing.Any:
+        try:
+            return self._loaded[key]
+        except KeyError:
+            start, end = self._sections[key]
+            value = self._loaded[key] = restricted_loads(self._decompress(self._data[start:end]))
+            return value
+
+    def __setitem__(self, key: str, value: typing.Any) -> None:
+        self._loaded[key] = value
+        self._sections[key] = None
+
+    def __delitem__(self, key: str) -> None:
+        del self._sections[key]
+        self._loaded.pop(key, None)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._sections)
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._sections
+
+    def compressed_section(self, key: str) -> bytes | None:
+        """Returns the compressed section of key if it wasn't accessed yet, None otherwise."""
+        if key in self._loaded:
+            return None
+        start, end = self._sections[key]
+        return bytes(self._data[start:end])
+
+
 if typing.TYPE_CHECKING:  # type-check with pure python implementation until we have a typing stub
     LocationStore = _LocationStore
 else:
@@ -352,6 +352,17 @@ def get_file_safe_name(name: str) -> str:
     return "".join(c for c in name if c not in '<>:"/\\|?*')
 
 
+def is_compressible(path: str, sample_size: int = 2 ** 16) -> bool:
+    """
+    Returns whether compressing the file at path is worth it, judging by how much a fast compression of its start
+    shrinks. Already compressed files, like zips, patch containers and multidata, are not.
+    """
+    import zlib
+    with open(path, "rb") as f:
+        sample = f.read(sample_size)
+    return len(zlib.compress(sample, 1)) < len(sample) * 0.9
+
+
 def load_data_package_for_checksum(game: str, checksum: typing.Optional[str]) -> Dict[str, Any]:
     if checksum and game:
         if checksum != get_file_safe_name(checksum):
@@ -10,7 +10,8 @@ from . import api_endpoints
 @cache.cached()
 def get_datapackage():
     from worlds import network_data_package
-    return network_data_package
+    # build every game's package, the lazy mapping would serialize as empty before any is built
+    return {"games": dict(network_data_package["games"])}
 
 
 @api_endpoints.route('/datapackage/<string:checksum>')
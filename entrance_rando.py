@@ -3,7 +3,7 @@ import logging
 import random
 import time
 from collections import deque
-from collections.abc import Callable, Iterable
+from collections.abc import Callable, Iterable, Iterator
 
 from BaseClasses import CollectionState, Entrance, Region, EntranceType
 from Options import Accessibility
@@ -16,34 +16,74 @@ class EntranceRandomizationError(RuntimeError):
 
 class EntranceLookup:
     class GroupLookup:
-        _lookup: dict[int, list[Entrance]]
+        _lookup: dict[int, dict[Entrance, None]]
+        """Targets by group. Dicts are used as ordered sets so removal is O(1) while the order shuffles depend on is
+        kept"""
+        _names: dict[int, dict[str, dict[Entrance, None]]]
+        """Targets by group and name, for find_target"""
+        _count: int
 
         def __init__(self):
             self._lookup = {}
+            self._names = {}
+            self._count = 0
 
         def __len__(self):
-            return sum(map(len, self._lookup.values()))
+            return self._count
 
         def __bool__(self):
             return bool(self._lookup)
 
         def __getitem__(self, item: int) -> list[Entrance]:
-            return self._lookup.get(item, [])
+            return list(self._lookup.get(item, ()))
 
         def __iter__(self):
             return itertools.chain.from_iterable(self._lookup.values())
 
+        def __contains__(self, entrance: Entrance) -> bool:
+            return entrance in self._lookup.get(entrance.randomization_group, ())
+
         def __repr__(self):
-            return str(self._lookup)
+            return str({group: list(targets) for group, targets in self._lookup.items()})
 
         def add(self, entrance: Entrance) -> None:
-            self._lookup.setdefault(entrance.randomization_group, []).append(entrance)
+            group = entrance.randomization_group
+            self._lookup.setdefault(group, {})[entrance] = None
+            self._names.setdefault(group, {}).setdefault(entrance.name, {})[entrance] = None
+            self._count += 1
 
         def remove(self, entrance: Entrance) -> None:
-            group = self._lookup[entrance.randomization_group]
-            group.remove(entrance)
-            if not group:
-                del self._lookup[entrance.randomization_group]
+            group = entrance.randomization_group
+            targets = self._lookup[group]
+            del targets[entrance]
+            names = self._names[group]
+            del names[entrance.name][entrance]
+            if not names[entrance.name]:
+                del names[entrance.name]
+            if not targets:
+                del self._lookup[group]
+                del self._names[group]
+            self._count -= 1
+
+        def shuffle(self, group: int, rng: random.Random) -> list[Entrance]:
+            """Shuffles the targets of a group in place and returns them in their new order"""
+            targets = list(self._lookup.get(group, ()))
+            rng.shuffle(targets)
+            if targets:
+                self._lookup[group] = dict.fromkeys(targets)
+            return targets
+
+        def find(self, name: str, group: int | None = None) -> Entrance | None:
+            """Finds the first target with the given name, searching all groups if none is given"""
+            groups = self._names if group is None else (group,)
+            for group in groups:
+                matches = self._names.get(group, {}).get(name)
+                if matches:
+                    if len(matches) == 1:
+                        return next(iter(matches))
+                    # several targets share this name, so go by the group's current order like a linear scan would
+                    return next(target for target in self._lookup[group] if target in matches)
+            return None
 
     dead_ends: GroupLookup
     others: GroupLookup
@@ -59,9 +99,108 @@ class EntranceLookup:
         self._expands_graph_cache = {}
         self._coupled = coupled
         self._usable_exits = usable_exits
+        targets = list(targets)
+        # analyze the graph once for every target instead of searching it again for each of them
+        expansions = self._analyze_graph_expansion([target.connected_region for target in targets])
+        for target in targets:
+            self._expands_graph_cache.setdefault(target, self._expands_from(target, expansions))
         for target in targets:
             self.add(target)
 
+    def _analyze_graph_expansion(self, regions: Iterable[Region]) -> dict[Region, bool | tuple[str, ...]]:
+        """
+        Finds out how the region graph can be expanded from each of the given regions. The graph is split into strongly
+        connected components, which all share one result, and each component's result is built from its own regions and
+        the results of the components it leads to, so every region and exit is only looked at once.
+
+        :param regions: The regions to start from
+        :return: A map from each region reachable from the given regions to True if it reaches progression or any
+                 randomizable exit, which always expands the graph, or else to the names of the randomizable exits it
+                 reaches, which are only kept while there is at most one of them.
+        """
+        results: dict[Region, bool | tuple[str, ...]] = {}
+        index: dict[Region, int] = {}
+        low_link: dict[Region, int] = {}
+        component_stack: list[Region] = []
+        on_stack: set[Region] = set()
+
+        def successors(region: Region) -> Iterable[Region]:
+            return (exit_.connected_region for exit_ in region.exits if exit_.connected_region)
+
+        for root in regions:
+            if root in index:
+                continue
+            index[root] = low_link[root] = len(index)
+            component_stack.append(root)
+            on_stack.add(root)
+            work: list[tuple[Region, Iterator[Region]]] = [(root, iter(successors(root)))]
+            while work:
+                region, children = work[-1]
+                for child in children:
+                    if child not in index:
+                        index[child] = low_link[child] = len(index)
+                        component_stack.append(child)
+                        on_stack.add(child)
+                        work.append((child, iter(successors(child))))
+                        break
+                    if child in on_stack:
+                        low_link[region] = min(low_link[region], index[child])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        low_link[parent] = min(low_link[parent], low_link[region])
+                    if low_link[region] == index[region]:
+                        component: list[Region] = []
+                        while True:
+                            member = component_stack.pop()
+                            on_stack.remove(member)
+                            component.append(member)
+                            if member is region:
+                                break
+                        result = self._component_expansion(component, results)
+                        for member in component:
+                            results[member] = result
+        return results
+
+    def _component_expansion(self, component: list[Region],
+                             results: dict[Region, bool | tuple[str, ...]]) -> bool | tuple[str, ...]:
+        exit_names: tuple[str, ...] = ()
+        for region in component:
+            # check if the region itself is progression
+            if region in region.multiworld.indirect_connections:
+                return True
+            # check if any placed locations are progression
+            if any(loc.advancement for loc in region.locations):
+                return True
+        for region in component:
+            for exit_ in region.exits:
+                if exit_.connected_region:
+                    # components are finished in reverse topological order, so anything outside of this one is done
+                    found = results.get(exit_.connected_region, ())
+                    if found is True:
+                        return True
+                    new_names = tuple(name for name in found if name not in exit_names)
+                elif exit_ in self._usable_exits:
+                    # in uncoupled mode any randomizable exit expands the graph, even the reverse of the way in
+                    if not self._coupled:
+                        return True
+                    new_names = (exit_.name,) if exit_.name not in exit_names else ()
+                else:
+                    continue
+                exit_names += new_names
+                # two different exits means there is always one which isn't the reverse of the way in
+                if len(exit_names) > 1:
+                    return True
+        return exit_names
+
+    def _expands_from(self, entrance: Entrance, expansions: dict[Region, bool | tuple[str, ...]]) -> bool:
+        found = expansions[entrance.connected_region]
+        # randomizable exits which are not reverse of the incoming entrance.
+        # uncoupled mode is an exception because in this case going back in the door you just came in could
+        # actually lead somewhere new
+        return found is True or any(name != entrance.name for name in found)
+
     def _can_expand_graph(self, entrance: Entrance) -> bool:
         """
         Checks whether an entrance is able to expand the region graph, either by
@@ -74,40 +213,9 @@ class EntranceLookup:
         if entrance in self._expands_graph_cache:
             return self._expands_graph_cache[entrance]
 
-        seen = {entrance.connected_region}
-        q: deque[Region] = deque()
-        q.append(entrance.connected_region)
-
-        while q:
-            region = q.popleft()
-
-            # check if the region itself is progression
-            if region in region.multiworld.indirect_connections:
-                self._expands_graph_cache[entrance] = True
-                return True
-
-            # check if any placed locations are progression
-            for loc in region.locations:
-                if loc.advancement:
-                    self._expands_graph_cache[entrance] = True
-                    return True
-
-            # check if there is a randomized exit out (expands the graph directly) or else search any connected
-            # regions to see if they are/have progression
-            for exit_ in region.exits:
-                # randomizable exits which are not reverse of the incoming entrance.
-                # uncoupled mode is an exception because in this case going back in the door you just came in could
-                # actually lead somewhere new
-                if (not exit_.connected_region and (not self._coupled or exit_.name != entrance.name)
-                        and exit_ in self._usable_exits):
-                    self._expands_graph_cache[entrance] = True
-                    return True
-                elif exit_.connected_region and exit_.connected_region not in seen:
-                    seen.add(exit_.connected_region)
-                    q.append(exit_.connected_region)
-
-        self._expands_graph_cache[entrance] = False
-        return False
+        result = self._expands_from(entrance, self._analyze_graph_expansion((entrance.connected_region,)))
+        self._expands_graph_cache[entrance] = result
+        return result
 
     def add(self, entrance: Entrance) -> None:
         lookup = self.others if self._can_expand_graph(entrance) else self.dead_ends
@@ -133,9 +241,7 @@ class EntranceLookup:
         """
         lookup = self.dead_ends if dead_end else self.others
         if preserve_group_order:
-            for group in groups:
-                self._random.shuffle(lookup[group])
-            ret = [entrance for group in groups for entrance in lookup[group]]
+            ret = [entrance for group in groups for entrance in lookup.shuffle(group, self._random)]
         else:
             ret = [entrance for group in groups for entrance in lookup[group]]
             self._random.shuffle(ret)
@@ -156,11 +262,7 @@ class EntranceLookup:
                     if (found := self.find_target(name, group, True))
                     else self.find_target(name, group, False))
         lookup = self.dead_ends if dead_end else self.others
-        targets_to_check = lookup if group is None else lookup[group]
-        for target in targets_to_check:
-            if target.name == name:
-                return target
-        return None
+        return lookup.find(name, group)
 
     def __len__(self):
         return len(self.dead_ends) + len(self.others)
@@ -219,31 +321,36 @@ class ERPlacementState:
 
     def test_speculative_connection(self, source_exit: Entrance, target_entrance: Entrance,
                                     usable_exits: set[Entrance]) -> bool:
-        copied_state = self.collection_state.copy()
-        # simulated connection. A real connection is unsafe because the region graph is shallow-copied and would
-        # propagate back to the real multiworld.
-        copied_state.reachable_regions[self.world.player].add(target_entrance.connected_region)
-        copied_state.blocked_connections[self.world.player].remove(source_exit)
-        copied_state.blocked_connections[self.world.player].update(target_entrance.connected_region.exits)
-        copied_state.update_reachable_regions(self.world.player)
-        copied_state.sweep_for_advancements()
-        # test that at there are newly reachable randomized exits that are ACTUALLY reachable
-        available_randomized_exits = copied_state.blocked_connections[self.world.player]
-        for _exit in available_randomized_exits:
-            if _exit.connected_region:
-                continue
-            # ignore the source exit, and, if coupled, the reverse exit. They're not actually new
-            if _exit.name == source_exit.name or (self.coupled and _exit.name == target_entrance.name):
-                continue
-            # make sure we are only paying attention to usable exits
-            if _exit not in usable_exits:
-                continue
-            # technically this should be is_valid_source_transition, but that may rely on side effects from
-            # on_connect, which have not happened here (because we didn't do a real connection, and if we did, we would
-            # not want them to persist). can_reach is a close enough approximation most of the time.
-            if _exit.can_reach(copied_state):
-                return True
-        return False
+        state = self.collection_state
+        checkpoint = state.checkpoint()
+        try:
+            # simulated connection. A real connection is unsafe because the region graph is shallow-copied and would
+            # propagate back to the real multiworld.
+            state.make_writable(self.world.player)
+            state.reachable_regions[self.world.player].add(target_entrance.connected_region)
+            state.blocked_connections[self.world.player].remove(source_exit)
+            state.blocked_connections[self.world.player].update(target_entrance.connected_region.exits)
+            state.update_reachable_regions(self.world.player)
+            state.sweep_for_advancements()
+            # test that at there are newly reachable randomized exits that are ACTUALLY reachable
+            available_randomized_exits = state.blocked_connections[self.world.player]
+            for _exit in available_randomized_exits:
+                if _exit.connected_region:
+                    continue
+                # ignore the source exit, and, if coupled, the reverse exit. They're not actually new
+                if _exit.name == source_exit.name or (self.coupled and _exit.name == target_entrance.name):
+                    continue
+                # make sure we are only paying attention to usable exits
+                if _exit not in usable_exits:
+                    continue
+                # technically this should be is_valid_source_transition, but that may rely on side effects from
+                # on_connect, which have not happened here (because we didn't do a real connection, and if we did, we
+                # would not want them to persist). can_reach is a close enough approximation most of the time.
+                if _exit.can_reach(state):
+                    return True
+            return False
+        finally:
+            state.rollback(checkpoint)
 
     def connect(
             self,
@@ -372,6 +479,9 @@ def randomize_entrances(
     if not world.explicit_indirect_conditions:
         raise EntranceRandomizationError("Entrance randomization requires explicit indirect conditions in order "
                                          + "to correctly analyze whether dead end regions can be required in logic.")
+    if world.rule_dependency_index:
+        raise EntranceRandomizationError("Entrance randomization is not compatible with rule_dependency_index, "
+                                         + "as it changes connections without the index noticing.")
 
     start_time = time.perf_counter()
     # similar to fill, skip validity checks on entrances if the game is beatable on minimal accessibility
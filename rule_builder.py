@@ -0,0 +1,318 @@
+"""
+Declarative access rules for Locations and Entrances.
+
+Rules are built from the nodes in this module, for example ``Has("Sword") & (Has("Bow") | Group("Spells", 2))``,
+and turned into regular ``Callable[[CollectionState], bool]`` access rules by ``compile``, which simplifies them first.
+worlds.generic.Rules.set_rule and add_rule accept these nodes directly.
+Compiled rules declare the items they depend on as ``item_dependencies``, unless they check reachability,
+see World.rule_dependency_index.
+"""
+import abc
+import dataclasses
+import typing
+from collections.abc import Callable, Iterable
+
+from BaseClasses import CollectionState
+
+if typing.TYPE_CHECKING:
+    from worlds.AutoWorld import World
+
+CollectionRule = Callable[[CollectionState], bool]
+
+
+class Rule(abc.ABC):
+    """Base class of all rule nodes."""
+
+    def simplify(self) -> "Rule":
+        """Returns an equivalent rule with constant parts and redundant nesting removed."""
+        return self
+
+    @abc.abstractmethod
+    def item_dependencies(self, world: "World") -> typing.Optional[frozenset[str]]:
+        """Returns the names of the world's items the rule depends on, or None if it depends on anything else."""
+
+    def region_dependencies(self, world: "World") -> set[str]:
+        """Returns the names of the world's regions the rule checks the reachability of, including the parent regions of
+        checked Locations and Entrances."""
+        return set()
+
+    @abc.abstractmethod
+    def _compile(self, world: "World") -> CollectionRule:
+        """Returns a new access rule for the world's player, as compile attaches the item dependencies to it."""
+
+    def compile(self, world: "World") -> CollectionRule:
+        """Simplifies the rule and turns it into an access rule for the world's player."""
+        rule = self.simplify()
+        compiled = rule._compile(world)
+        dependencies = rule.item_dependencies(world)
+        if dependencies is not None:
+            compiled.item_dependencies = dependencies
+        return compiled
+
+    def __and__(self, other: "Rule") -> "Rule":
+        return And(self, other)
+
+    def __or__(self, other: "Rule") -> "Rule":
+        return Or(self, other)
+
+
+@dataclasses.dataclass(frozen=True)
+class True_(Rule):
+    """Always fulfilled."""
+
+    def item_dependencies(self, world: "World") -> frozenset[str]:
+        return frozenset()
+
+    def _compile(self, world: "World") -> CollectionRule:
+        return lambda state: True
+
+
+@dataclasses.dataclass(frozen=True)
+class False_(Rule):
+    """Never fulfilled."""
+
+    def item_dependencies(self, world: "World") -> frozenset[str]:
+        return frozenset()
+
+    def _compile(self, world: "World") -> CollectionRule:
+        return lambda state: False
+
+
+@dataclasses.dataclass(frozen=True)
+class Has(Rule):
+    """Fulfilled if the player has at least `count` of the item."""
+    item: str
+    count: int = 1
+
+    def simplify(self) -> Rule:
+        if self.count <= 0:
+            return True_()
+        return self
+
+    def item_dependencies(self, world: "World") -> frozenset[str]:
+        return frozenset((self.item,))
+
+    def _compile(self, world: "World") -> CollectionRule:
+        player = world.player
+        item = self.item
+        count = self.count
+        if count == 1:
+            return lambda state: state.prog_items[player][item] > 0
+        return lambda state: state.prog_items[player][item] >= count
+
+
+@dataclasses.dataclass(frozen=True, init=False)
+class HasAll(Rule):
+    """Fulfilled if the player has at least one of each of the items."""
+    items: tuple[str, ...]
+
+    def __init__(self, *items: str):
+        object.__setattr__(self, "items", tuple(dict.fromkeys(items)))
+
+    def simplify(self) -> Rule:
+        if not self.items:
+            return True_()
+        if len(self.items) == 1:
+            return Has(self.items[0])
+        return self
+
+    def item_dependencies(self, world: "World") -> frozenset[str]:
+        return frozenset(self.items)
+
+    def _compile(self, world: "World") -> CollectionRule:
+        player = world.player
+        items = self.items
+
+        def has_all(state: CollectionState) -> bool:
+            player_prog_items = state.prog_items[player]
+            for item in items:
+                if not player_prog_items[item]:
+                    return False
+            return True
+
+        return has_all
+
+
+@dataclasses.dataclass(frozen=True, init=False)
+class Count(Rule):
+    """Fulfilled if the player has at least `count` of the items combined, like CollectionState.has_from_list."""
+    items: tuple[str, ...]
+    count: int
+
+    def __init__(self, items: Iterable[str], count: int):
+        object.__setattr__(self, "items", tuple(items))
+        object.__setattr__(self, "count", count)
+
+    def simplify(self) -> Rule:
+        if self.count <= 0:
+            return True_()
+        if not self.items:
+            return False_()
+        if len(self.items) == 1:
+            return Has(self.items[0], self.count)
+        return self
+
+    def item_dependencies(self, world: "World") -> frozenset[str]:
+        return frozenset(self.items)
+
+    def _compile(self, world: "World") -> CollectionRule:
+        player = world.player
+        items = self.items
+        count = self.count
+
+        def has_count(state: CollectionState) -> bool:
+            player_prog_items = state.prog_items[player]
+            found = 0
+            for item in items:
+                found += player_prog_items[item]
+                if found >= count:
+                    return True
+            return False
+
+        return has_count
+
+
+@dataclasses.dataclass(frozen=True)
+class Group(Rule):
+    """Fulfilled if the player has at least `count` items of the item name group, like CollectionState.has_group."""
+    group: str
+    count: int = 1
+
+    def simplify(self) -> Rule:
+        if self.count <= 0:
+            return True_()
+        return self
+
+    def item_dependencies(self, world: "World") -> frozenset[str]:
+        return frozenset(world.item_name_groups[self.group])
+
+    def _compile(self, world: "World") -> CollectionRule:
+        if self.group not in world.item_name_groups:
+            raise KeyError(f"{world.game} has no item name group {self.group}")
+        player = world.player
+        group = self.group
+        count = self.count
+        return lambda state: state.has_group(group, player, count)
+
+
+@dataclasses.dataclass(frozen=True)
+class CanReach(Rule):
+    """Fulfilled if the player can reach the Region, Location or Entrance with the given name."""
+    spot: str
+    resolution_hint: typing.Literal["Region", "Location", "Entrance"] = "Region"
+
+    def item_dependencies(self, world: "World") -> None:
+        return None
+
+    def region_dependencies(self, world: "World") -> set[str]:
+        if self.resolution_hint == "Region":
+            return {self.spot}
+        if self.resolution_hint == "Location":
+            parent_region = world.multiworld.get_location(self.spot, world.player).parent_region
+        else:
+            parent_region = world.multiworld.get_entrance(self.spot, world.player).parent_region
+        return {parent_region.name} if parent_region else set()
+
+    def _compile(self, world: "World") -> CollectionRule:
+        player = world.player
+        spot = self.spot
+        if self.resolution_hint == "Region":
+            return lambda state: state.can_reach_region(spot, player)
+        if self.resolution_hint == "Location":
+            return lambda state: state.can_reach_location(spot, player)
+        return lambda state: state.can_reach_entrance(spot, player)
+
+
+@dataclasses.dataclass(frozen=True, init=False)
+class _Combination(Rule):
+    rules: tuple[Rule, ...]
+
+    def __init__(self, *rules: Rule):
+        object.__setattr__(self, "rules", rules)
+
+    def _simplify_rules(self, identity: type[Rule], absorbing: type[Rule]) -> typing.Union[Rule, list[Rule]]:
+        """Flattens nested combinations of the same kind and drops duplicates and identity elements."""
+        rules: dict[Rule, None] = {}
+        for rule in self.rules:
+            rule = rule.simplify()
+            if isinstance(rule, absorbing):
+                return rule
+            if isinstance(rule, identity):
+                continue
+            if type(rule) is type(self):
+                rules.update(dict.fromkeys(rule.rules))
+            else:
+                rules[rule] = None
+        if not rules:
+            return identity()
+        if len(rules) == 1:
+            return next(iter(rules))
+        return list(rules)
+
+    def item_dependencies(self, world: "World") -> typing.Optional[frozenset[str]]:
+        dependencies: set[str] = set()
+        for rule in self.rules:
+            rule_dependencies = rule.item_dependencies(world)
+            if rule_dependencies is None:
+                return None
+            dependencies |= rule_dependencies
+        return frozenset(dependencies)
+
+    def region_dependencies(self, world: "World") -> set[str]:
+        return set().union(*(rule.region_dependencies(world) for rule in self.rules))
+
+
+class And(_Combination):
+    """Fulfilled if all of the rules are fulfilled."""
+
+    def simplify(self) -> Rule:
+        rules = self._simplify_rules(True_, False_)
+        if isinstance(rules, Rule):
+            return rules
+        # single items are cheaper to check together
+        single_items = [rule for rule in rules if isinstance(rule, (Has, HasAll)) and getattr(rule, "count", 1) == 1]
+        if len(single_items) > 1:
+            items = [item for rule in single_items
+                     for item in (rule.items if isinstance(rule, HasAll) else (rule.item,))]
+            rules = [HasAll(*items), *(rule for rule in rules if rule not in single_items)]
+            if len(rules) == 1:
+                return rules[0]
+        return And(*rules)
+
+    def _compile(self, world: "World") -> CollectionRule:
+        compiled = tuple(rule._compile(world) for rule in self.rules)
+        if len(compiled) == 2:
+            first, second = compiled
+            return lambda state: first(state) and second(state)
+
+        def all_rules(state: CollectionState) -> bool:
+            for rule in compiled:
+                if not rule(state):
+                    return False
+            return True
+
+        return all_rules
+
+
+class Or(_Combination):
+    """Fulfilled if any of the rules is fulfilled."""
+
+    def simplify(self) -> Rule:
+        rules = self._simplify_rules(False_, True_)
+        if isinstance(rules, Rule):
+            return rules
+        return Or(*rules)
+
+    def _compile(self, world: "World") -> CollectionRule:
+        compiled = tuple(rule._compile(world) for rule in self.rules)
+        if len(compiled) == 2:
+            first, second = compiled
+            return lambda state: first(state) or second(state)
+
+        def any_rule(state: CollectionState) -> bool:
+            for rule in compiled:
+                if rule(state):
+                    return True
+            return False
+
+        return any_rule
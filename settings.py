@@ -29,21 +29,23 @@ _world_settings_name_cache_updated = False
 _lock = Lock()
 
 
-def _update_cache() -> None:
-    """Load all worlds and update world_settings_name_cache"""
+def _update_cache(load_all: bool = False) -> None:
+    """Update world_settings_name_cache from the imported worlds, importing all of them first if load_all"""
     global _world_settings_name_cache_updated
     if _world_settings_name_cache_updated:
         return
 
+    from worlds.AutoWorld import AutoWorldRegister
     try:
-        from worlds.AutoWorld import AutoWorldRegister
-        for world in AutoWorldRegister.world_types.values():
+        if load_all:
+            AutoWorldRegister.world_types.load_all()
+        for world in AutoWorldRegister.world_types.loaded().values():
             annotation = world.__annotations__.get("settings", None)
             if annotation is None or annotation == "ClassVar[Optional['Group']]":
                 continue
             _world_settings_name_cache[world.settings_key] = f"{world.__module__}.{world.__name__}"
     finally:
-        _world_settings_name_cache_updated = True
+        _world_settings_name_cache_updated = not AutoWorldRegister.world_types.lazy_sources
 
 
 def fmt_doc(cls: type, level: int) -> str:
@@ -687,6 +689,20 @@ class GeneratorOptions(Group):
         start_inventory -> Move remaining items to start_inventory, generate additional filler items to fill locations.
         """
 
+    class MultidataCodec(str):
+        """
+        Compression of the sections of the multidata (.archipelago) file
+        zlib -> Fast to compress and decompress. (Default)
+        lzma -> Smallest, but slower to compress and decompress.
+        bz2 -> In between, with slow decompression.
+        """
+
+    class MultidataCompressionLevel(int):
+        """
+        Compression level of the multidata file, from 0 (fastest, largest) to 9 (slowest, smallest)
+        For zlib, levels above 6 take much longer for barely smaller files.
+        """
+
     enemizer_path: EnemizerPath = EnemizerPath("EnemizerCLI/EnemizerCLI.Core")  # + ".exe" is implied on Windows
     player_files_path: PlayerFilesPath = PlayerFilesPath("Players")
     players: Players = Players(0)
@@ -696,6 +712,8 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    multidata_codec: MultidataCodec = MultidataCodec("zlib")
+    multidata_compression_level: MultidataCompressionLevel = MultidataCompressionLevel(6)
     loglevel: str = "info"
     logtime: bool = False
 
@@ -755,8 +773,10 @@ class Settings(Group):
         elif key not in dir(self) or isinstance(super().__getattribute__(key), dict):
             # settings class not loaded yet
             if key not in _world_settings_name_cache:
-                # find world that provides the settings class
+                # find world that provides the settings class, which may not be imported yet
                 _update_cache()
+                if key not in _world_settings_name_cache:
+                    _update_cache(load_all=True)
                 # check for missing keys to update _changed
                 for world_settings_name in _world_settings_name_cache:
                     if world_settings_name not in dir(self):
@@ -866,7 +886,7 @@ class Settings(Group):
 
     def dump(self, f: TextIO, level: int = 0) -> None:
         # load all world setting classes
-        _update_cache()
+        _update_cache(load_all=True)
         for key in _world_settings_name_cache:
             self.__getattribute__(key)  # load all worlds
         super().dump(f, level)
@@ -80,6 +80,8 @@ class WorldTestBase(unittest.TestCase):
         self.world = self.multiworld.worlds[self.player]
         for step in gen_steps:
             call_all(self.multiworld, step)
+            if step == "connect_entrances":
+                self.multiworld.freeze_region_graphs()
 
     # methods that can be called within tests
     def collect_all_but(self, item_names: typing.Union[str, typing.Iterable[str]],
@@ -0,0 +1,81 @@
+def run_multidata_benchmark(path: str | None = None, players: int = 100, repeat: int = 3) -> None:
+    """
+    Compares the size and the time to write and read multidata with every codec and compression level.
+
+    :param path: .archipelago or .zip file to benchmark the multidata of. If not given, multidata resembling a seed of
+        `players` players is built from the data packages of the installed worlds.
+    :param players: number of players of the built multidata.
+    :param repeat: number of times every codec and level is timed, taking the fastest time.
+    """
+    import io
+    import logging
+    import random
+    import time
+    import zipfile
+
+    from Utils import init_logging
+    from NetUtils import NetworkSlot, SlotType, decode_multidata, dump_multidata, multidata_codecs
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    def read_multidata() -> dict:
+        if path.lower().endswith(".zip"):
+            with zipfile.ZipFile(path) as zf:
+                return dict(decode_multidata(next(zf.read(name) for name in zf.namelist()
+                                                  if name.endswith(".archipelago"))))
+        with open(path, "rb") as f:
+            return dict(decode_multidata(f.read()))
+
+    def build_multidata() -> dict:
+        from worlds import network_data_package
+        rng = random.Random(0)
+        games = sorted(game for game, package in network_data_package["games"].items()
+                       if package["location_name_to_id"] and package["item_name_to_id"])
+        slot_games = {slot: games[slot % len(games)] for slot in range(1, players + 1)}
+        item_ids = {game: list(network_data_package["games"][game]["item_name_to_id"].values()) for game in games}
+        locations = {
+            slot: {location_id: (rng.choice(item_ids[slot_games[receiver]]), receiver, rng.choice((0, 1, 2, 4)))
+                   for location_id in network_data_package["games"][game]["location_name_to_id"].values()
+                   for receiver in (rng.randint(1, players),)}
+            for slot, game in slot_games.items()
+        }
+        return {
+            "slot_data": {slot: {"seed": rng.getrandbits(32), "options": {f"option_{i}": i for i in range(50)}}
+                          for slot in slot_games},
+            "slot_info": {slot: NetworkSlot(f"Player{slot}", game, SlotType.player)
+                          for slot, game in slot_games.items()},
+            "connect_names": {f"Player{slot}": (0, slot) for slot in slot_games},
+            "locations": locations,
+            "spheres": [{slot: set(rng.sample(sorted(slot_locations), min(5, len(slot_locations))))
+                         for slot, slot_locations in locations.items()} for _ in range(20)],
+            "datapackage": {game: network_data_package["games"][game] for game in set(slot_games.values())},
+        }
+
+    multidata = read_multidata() if path else build_multidata()
+    logger.info(f"Benchmarking multidata with {len(multidata['slot_info'])} slots.")
+    for codec in multidata_codecs:
+        for level in range(10):
+            write_time = read_time = float("inf")
+            size = 0
+            for _ in range(repeat):
+                data = io.BytesIO()
+                start = time.perf_counter()
+                dump_multidata(multidata, data, codec, level)
+                write_time = min(write_time, time.perf_counter() - start)
+                size = data.tell()
+                start = time.perf_counter()
+                decoded = decode_multidata(data.getvalue())
+                for key in decoded:
+                    decoded[key]
+                read_time = min(read_time, time.perf_counter() - start)
+            logger.info(f"{codec} level {level}: {size / 1024:.1f} KiB, "
+                        f"written in {write_time:.4f} seconds, read in {read_time:.4f} seconds.")
+
+
+if __name__ == "__main__":
+    import sys
+
+    import path_change
+    path_change.change_home()
+    run_multidata_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -66,6 +66,8 @@ def setup_multiworld(worlds: list[type[World]] | type[World], steps: tuple[str,
     multiworld.state = CollectionState(multiworld)
     for step in steps:
         call_all(multiworld, step)
+        if step == "connect_entrances":
+            multiworld.freeze_region_graphs()
     return multiworld
 
 
@@ -0,0 +1,83 @@
+import json
+import os
+import unittest
+from tempfile import TemporaryDirectory
+
+import Utils
+from worlds import DataPackageCache, WorldSource
+from worlds.AutoWorld import data_package_checksum
+
+package = {
+    "item_name_groups": {"Everything": ["Item", "Other Item"]},
+    "item_name_to_id": {"Item": 1, "Other Item": 2},
+    "location_name_groups": {},
+    "location_name_to_id": {"Location": 1},
+}
+package["checksum"] = data_package_checksum(package)  # type: ignore[arg-type]
+
+
+class TestDataPackageCache(unittest.TestCase):
+    def setUp(self) -> None:
+        self.old_cache_path = getattr(Utils.cache_path, "cached_path", None)
+        self.temp_dir = TemporaryDirectory(f"archipelago_{__name__}")
+        Utils.cache_path.cached_path = os.path.join(self.temp_dir.name, "cache")
+        self.world_path = os.path.join(self.temp_dir.name, "world")
+        os.makedirs(self.world_path)
+        self.write_world("class World: pass\n")
+
+    def tearDown(self) -> None:
+        if self.old_cache_path is None:
+            del Utils.cache_path.cached_path
+        else:
+            Utils.cache_path.cached_path = self.old_cache_path
+        self.temp_dir.cleanup()
+
+    def write_world(self, code: str) -> None:
+        with open(os.path.join(self.world_path, "__init__.py"), "w") as f:
+            f.write(code)
+
+    def test_roundtrip(self) -> None:
+        cache = DataPackageCache()
+        self.assertIsNone(cache.get(WorldSource(self.world_path, relative=False), "Test Game"))
+        cache.put(WorldSource(self.world_path, relative=False), "Test Game", package)  # type: ignore[arg-type]
+        cache.save()
+        self.assertEqual(DataPackageCache().get(WorldSource(self.world_path, relative=False), "Test Game"), package)
+        self.assertIsNone(DataPackageCache().get(WorldSource(self.world_path, relative=False), "Other Game"))
+
+    def test_changed_source(self) -> None:
+        """Test that a package is not used anymore once a file or the version of its world changed."""
+        cache = DataPackageCache()
+        cache.put(WorldSource(self.world_path, relative=False), "Test Game", package)  # type: ignore[arg-type]
+        cache.save()
+        newer_source = WorldSource(self.world_path, relative=False, version=Utils.Version(0, 1, 0))
+        self.assertIsNone(DataPackageCache().get(newer_source, "Test Game"))
+        self.write_world("class World:\n    pass\n")
+        self.assertIsNone(DataPackageCache().get(WorldSource(self.world_path, relative=False), "Test Game"))
+
+    def test_client_package(self) -> None:
+        """Test that a package a client received from a server, which has no name groups, is not used."""
+        client_package = {key: value for key, value in package.items() if not key.endswith("_groups")}
+        Utils.store_data_package_for_checksum("Test Game", client_package)
+        cache = DataPackageCache()
+        cache.put(WorldSource(self.world_path, relative=False), "Test Game", package)  # type: ignore[arg-type]
+        cache.save()
+        self.assertEqual(Utils.load_data_package_for_checksum("Test Game", package["checksum"]), client_package)
+        self.assertEqual(DataPackageCache().get(WorldSource(self.world_path, relative=False), "Test Game"), package)
+
+    def test_invalid_package(self) -> None:
+        """Test that a package with missing keys, another checksum or a malformed table is not used."""
+        source = WorldSource(self.world_path, relative=False)
+        invalid_packages = {
+            "missing groups": {key: value for key, value in package.items() if key != "item_name_groups"},
+            "other checksum": {**package, "checksum": "0123456789abcdef"},
+            "malformed table": {**package, "item_name_to_id": [["Item", 1], ["Other Item", 2]]},
+            "not a package": [package],
+        }
+        for name, invalid_package in invalid_packages.items():
+            with self.subTest(name):
+                cache = DataPackageCache()
+                cache.put(source, "Test Game", package)  # type: ignore[arg-type]
+                cache.save()
+                with open(cache.package_path("Test Game", package["checksum"]), "w", encoding="utf-8") as f:
+                    json.dump(invalid_package, f)
+                self.assertIsNone(DataPackageCache().get(source, "Test Game"))
@@ -173,6 +173,43 @@ class TestEntranceLookup(unittest.TestCase):
         # wrong deadendedness
         self.assertIsNone(lookup.find_target("region0_right", ERTestGroups.RIGHT, True))
 
+    def test_find_target_after_removal(self):
+        """Tests that find_target does not find targets which have been removed from the lookup"""
+        multiworld = generate_test_multiworld()
+        generate_disconnected_region_grid(multiworld, 5)
+        exits_set = set([ex for region in multiworld.get_regions(1)
+                         for ex in region.exits if not ex.connected_region])
+
+        er_targets = [entrance for region in multiworld.get_regions(1)
+                      for entrance in region.entrances if not entrance.parent_region]
+        lookup = EntranceLookup(multiworld.worlds[1].random, coupled=True, usable_exits=exits_set, targets=er_targets)
+
+        target = lookup.find_target("region0_right")
+        lookup.remove(target)
+        self.assertIsNone(lookup.find_target("region0_right"))
+        self.assertNotIn(target, lookup.get_targets([ERTestGroups.RIGHT], False, True))
+        self.assertEqual(len(lookup), len(er_targets) - 1)
+
+    def test_dead_ends_through_cycles(self):
+        """Tests that regions which only lead back to each other are dead ends unless the cycle has a way out"""
+        multiworld = generate_test_multiworld()
+        menu = multiworld.get_region("Menu", 1)
+        first = Region("First", 1, multiworld)
+        second = Region("Second", 1, multiworld)
+        multiworld.regions += [first, second]
+        first.connect(second)
+        second.connect(first)
+        first_target = first.create_er_target("first")
+        second_target = second.create_er_target("second")
+        second_exit = second.create_exit("first")
+        menu.create_exit("menu")
+
+        lookup = EntranceLookup(multiworld.worlds[1].random, coupled=True, usable_exits={second_exit},
+                                targets=[first_target, second_target])
+        # the only way out of the cycle is the reverse of the first target
+        self.assertIn(first_target, lookup.dead_ends)
+        self.assertIn(second_target, lookup.others)
+
 class TestBakeTargetGroupLookup(unittest.TestCase):
     def test_lookup_generation(self):
         multiworld = generate_test_multiworld()
@@ -489,6 +526,15 @@ class TestRandomizeEntrances(unittest.TestCase):
         self.assertRaises(EntranceRandomizationError, randomize_entrances, multiworld.worlds[1], False,
                           directionally_matched_group_lookup)
 
+    def test_fails_with_rule_dependency_index(self):
+        """tests that entrance randomization refuses worlds indexing their rules by item dependencies"""
+        multiworld = generate_test_multiworld()
+        generate_disconnected_region_grid(multiworld, 5)
+        multiworld.worlds[1].rule_dependency_index = True
+
+        self.assertRaises(EntranceRandomizationError, randomize_entrances, multiworld.worlds[1], False,
+                          directionally_matched_group_lookup)
+
     def test_fails_when_some_unreachable_exit(self):
         """tests that entrance randomization fails if an exit is never reachable (non-minimal accessibility)"""
         multiworld = generate_test_multiworld()
@@ -1,12 +1,13 @@
-from typing import List, Iterable
+from typing import Callable, List, Iterable
 import unittest
+from unittest import mock
 
 from Options import Accessibility
 from test.general import generate_items, generate_locations, generate_test_multiworld
-from Fill import FillError, balance_multiworld_progression, fill_restrictive, \
-    distribute_early_items, distribute_items_restrictive
-from BaseClasses import Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
-    ItemClassification
+from Fill import CandidateLocations, FillError, MaximumExplorationState, balance_multiworld_progression, fill_restrictive, \
+    distribute_early_items, distribute_items_restrictive, sweep_from_pool
+from BaseClasses import CollectionState, Entrance, LocationProgressType, MultiWorld, Region, Item, Location, \
+    ItemClassification, LocationFrontier
 from worlds.generic.Rules import CollectionRule, add_item_rule, locality_rules, set_rule
 
 
@@ -464,6 +465,66 @@ class TestFillRestrictive(unittest.TestCase):
         self.assertIsNot(loc0.item, player1.prog_items[0], "Filled item was still present in item pool")
 
 
+    def test_incremental_exploration_state(self):
+        """Tests that the replayed maximum exploration state matches a full sweep as items leave the pool"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 3, 3)
+        player2 = generate_player_data(multiworld, 2, 2, 3)
+        items1, items2 = player1.prog_items, player2.prog_items
+        locations1, locations2 = player1.locations, player2.locations
+
+        # each player's spheres depend on items the other player's locations hold in the same sweep iteration
+        multiworld.push_item(locations1[0], items2[0], False)
+        set_rule(locations2[0], lambda state: state.has(items2[0].name, 2))
+        multiworld.push_item(locations2[0], items1[0], False)
+        set_rule(locations1[1], lambda state: state.has(items1[0].name, 1))
+        multiworld.push_item(locations1[1], items2[1], False)
+        set_rule(locations2[1], lambda state: state.has(items2[1].name, 2))
+        multiworld.push_item(locations2[1], items1[1], False)
+        set_rule(locations1[2], lambda state: state.has_all((items1[1].name, items1[2].name), 1))
+        multiworld.push_item(locations1[2], items2[2], False)
+
+        exploration = MaximumExplorationState(multiworld.state, [items1[2]])
+        for pool in ([items1[2]], []):
+            with self.subTest(pool=pool):
+                if not pool:
+                    exploration.remove([items1[2]])
+                state = exploration.sweep()
+                expected = sweep_from_pool(multiworld.state, pool)
+                self.assertEqual(state.advancements, expected.advancements)
+                self.assertEqual(state.prog_items, expected.prog_items)
+        self.assertNotIn(locations1[2], state.advancements)
+
+
+    def test_candidate_locations(self):
+        """Tests that the candidate index picks the first location in order that can be filled, like a linear scan"""
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, 6, 1, 1)
+        player2 = generate_player_data(multiworld, 2, 2, 0)
+        prog_item, filler_item = player1.prog_items[0], player1.basic_items[0]
+        locations = player1.locations
+        set_rule(locations[0], lambda state: False)
+        locations[1].progress_type = LocationProgressType.EXCLUDED
+        add_item_rule(locations[2], lambda item: not item.advancement)
+        locations = [player2.locations[0], *locations[:3], player2.locations[1], *locations[3:]]
+        set_rule(locations[0], lambda state: False)
+
+        candidates = CandidateLocations(locations)
+        state = multiworld.state
+        self.assertIs(locations[2], candidates.locations[candidates.find(state, filler_item)])
+        self.assertIs(locations[4], candidates.locations[candidates.find(state, prog_item)])
+        self.assertIs(locations[5], candidates.locations[candidates.find(state, prog_item, player=1)])
+        self.assertIs(locations[0], candidates.locations[candidates.find(state, prog_item, check_access=False)])
+
+        candidates.pop(4)
+        candidates.pop(5)
+        self.assertIs(locations[6], candidates.locations[candidates.find(state, prog_item)])
+        self.assertIs(locations[2], candidates.locations[candidates.find(state, filler_item, player=1)])
+        candidates.pop(2)
+        self.assertEqual(len(candidates), 5)
+        self.assertEqual(candidates.unfilled(), [locations[0], locations[1], locations[3], locations[6], locations[7]])
+
+
 class TestDistributeItemsRestrictive(unittest.TestCase):
     def test_basic_distribute(self):
         """Test that distribute_items_restrictive is deterministic"""
@@ -880,3 +941,85 @@ class TestBalanceMultiworldProgression(unittest.TestCase):
 
         self.assertRegionContains(
             self.player1.regions[2], self.player2.prog_items[0])
+
+
+class TestBalancingCandidateSearch(unittest.TestCase):
+    def generate_multiworld(self, progression_balancing: int) -> MultiWorld:
+        """
+        Player 1's second sphere holds progression items for player 2 that each unlock a region of player 2's world,
+        so how many of them balancing moves depends on the progression_balancing value.
+        """
+        multiworld = generate_test_multiworld(2)
+        player1 = generate_player_data(multiworld, 1, prog_item_count=2, basic_item_count=40)
+        player2 = generate_player_data(multiworld, 2, prog_item_count=7, basic_item_count=20)
+        multiworld.completion_condition[player1.id] = lambda state: state.has_all(names(player1.prog_items), 1)
+        multiworld.completion_condition[player2.id] = lambda state: state.has(player2.prog_items[-1].name, 2)
+
+        items = player1.basic_items + player2.basic_items
+        region = player1.generate_region(player1.menu, 20)
+        items = fill_region(multiworld, region, [player1.prog_items[0]] + items)
+        region = player1.generate_region(
+            player1.regions[1], 20, lambda state: state.has(player1.prog_items[0].name, 1))
+        items = fill_region(multiworld, region, [player1.prog_items[1]] + player2.prog_items[:-1] + items)
+        region = player1.generate_region(
+            player1.regions[2], 5, lambda state: state.has(player1.prog_items[1].name, 1))
+        items = fill_region(multiworld, region, [player2.prog_items[-1]] + items)
+        for item in player2.prog_items[:-1]:
+            region = player2.generate_region(
+                player2.menu, 4, lambda state, item_name=item.name: state.has(item_name, 2))
+            items = fill_region(multiworld, region, items)
+
+        for player in multiworld.player_ids:
+            multiworld.worlds[player].options.progression_balancing.value = progression_balancing
+        return multiworld
+
+    def test_matches_linear_scan(self) -> None:
+        """Test that binary searching for the items to move moves the same items as testing each candidate"""
+        def linear_scan(state: CollectionState, items_to_test: List[Location],
+                        must_move: Callable[[int], bool]) -> List[Location]:
+            items_to_move = []
+            for tested, location in enumerate(items_to_test):
+                if must_move(tested):
+                    items_to_move.append(location)
+                    state.collect(location.item, True, location)
+            return items_to_move
+
+        for progression_balancing in (1, 30, 50, 70, 99):
+            with self.subTest(progression_balancing=progression_balancing):
+                multiworld = self.generate_multiworld(progression_balancing)
+                placements = {location.name: location.item.name for location in multiworld.get_filled_locations()}
+                balance_multiworld_progression(multiworld)
+                balanced = {location.name: location.item.name for location in multiworld.get_filled_locations()}
+
+                multiworld = self.generate_multiworld(progression_balancing)
+                with mock.patch("Fill.find_items_to_move", linear_scan):
+                    balance_multiworld_progression(multiworld)
+                scanned = {location.name: location.item.name for location in multiworld.get_filled_locations()}
+
+                self.assertNotEqual(placements, balanced)
+                self.assertEqual(balanced, scanned)
+
+    def test_looks_ahead_once(self) -> None:
+        """Test that the spheres balancing looked ahead for are not searched again while no items were moved"""
+        multiworld = self.generate_multiworld(99)
+        for location in multiworld.get_filled_locations():
+            if location.item.player == 2 and location.item.advancement:
+                location.item.classification = ItemClassification.progression_skip_balancing
+        placements = {location.name: location.item.name for location in multiworld.get_filled_locations()}
+        frontiers: List[LocationFrontier] = []
+        found: List[Location] = []
+        find_reachable = LocationFrontier.find_reachable
+
+        def record_reachable(frontier: LocationFrontier) -> List[Location]:
+            if frontier not in frontiers:
+                frontiers.append(frontier)
+            reachable = find_reachable(frontier)
+            found.extend(reachable)
+            return reachable
+
+        with mock.patch.object(LocationFrontier, "find_reachable", record_reachable):
+            balance_multiworld_progression(multiworld)
+        self.assertEqual(len(frontiers), 2)
+        self.assertEqual(len(found), len(set(found)))
+        self.assertEqual(placements,
+                         {location.name: location.item.name for location in multiworld.get_filled_locations()})
@@ -2,7 +2,7 @@ import unittest
 
 from Fill import distribute_items_restrictive
 from NetUtils import convert_to_base_types
-from worlds.AutoWorld import AutoWorldRegister, call_all
+from worlds.AutoWorld import AutoWorldRegister, World, call_all
 from worlds import failed_world_loads
 from . import setup_solo_multiworld
 
@@ -35,6 +35,16 @@ class TestImplemented(unittest.TestCase):
                         self.assertFalse(hasattr(world_type, method),
                                          f"{method} must be implemented as a @classmethod named stage_{method}.")
 
+    def test_output_methods(self):
+        """Tests that worlds writing their output in a separate process don't also implement generate_output."""
+        for game_name, world_type in AutoWorldRegister.world_types.items():
+            if world_type.write_output.__code__ is not World.write_output.__code__:
+                with self.subTest(game_name):
+                    self.assertIs(world_type.generate_output, World.generate_output,
+                                  "generate_output is not called for worlds that implement write_output.")
+                    self.assertIsNot(world_type.prepare_output, World.prepare_output,
+                                     "write_output needs a payload from prepare_output.")
+
     def test_slot_data(self):
         """Tests that if a world creates slot data, it's json serializable."""
         # has an await for generate_output which isn't being called
@@ -51,6 +61,7 @@ class TestImplemented(unittest.TestCase):
                     convert_to_base_types(data)  # only put base data types into slot data
 
     def test_no_failed_world_loads(self):
+        AutoWorldRegister.world_types.load_all()
         if failed_world_loads:
             self.fail(f"The following worlds failed to load: {failed_world_loads}")
 
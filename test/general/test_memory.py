@@ -1,8 +1,8 @@
 import unittest
 
-from BaseClasses import MultiWorld
+from BaseClasses import CollectionState, Location, MultiWorld, default_access_rule, default_item_rule
 from worlds.AutoWorld import AutoWorldRegister
-from . import setup_solo_multiworld
+from . import generate_test_multiworld, setup_solo_multiworld
 
 
 class TestWorldMemory(unittest.TestCase):
@@ -19,3 +19,36 @@ class TestWorldMemory(unittest.TestCase):
         for game_name, weak in refs.items():
             with self.subTest("Game cleanup", game_name=game_name):
                 self.assertFalse(weak(), "World leaked a reference")
+
+
+class TestSlots(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.region = self.multiworld.get_region("Menu", 1)
+
+    def test_no_dict(self) -> None:
+        """Tests that the core classes don't give their instances a __dict__, which large multiworlds have many of."""
+        location = Location(1, "Location", None, self.region)
+        entrance = self.region.create_exit("Exit")
+        for obj in (self.region, location, entrance):
+            with self.subTest(type=type(obj).__name__):
+                self.assertFalse(hasattr(obj, "__dict__"))
+        self.assertIs(location.access_rule, default_access_rule)
+        self.assertIs(entrance.access_rule, default_access_rule)
+
+    def test_subclass_overrides(self) -> None:
+        """Tests that subclasses can still override defaulted attributes with class attributes and methods."""
+        class HiddenLocation(Location):
+            show_in_spoiler = False
+
+            def access_rule(self, state: CollectionState) -> bool:
+                return False
+
+        location = HiddenLocation(1, "Location", None, self.region)
+        self.assertFalse(location.show_in_spoiler)
+        self.assertFalse(location.can_reach(CollectionState(self.multiworld)))
+        self.assertIs(location.item_rule, default_item_rule)
+        location.show_in_spoiler = True
+        location.custom = 1
+        self.assertTrue(location.show_in_spoiler)
+        self.assertFalse(HiddenLocation.show_in_spoiler)
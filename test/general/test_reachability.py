@@ -1,8 +1,9 @@
 import unittest
 
-from BaseClasses import CollectionState
+from BaseClasses import CollectionState, Item, ItemClassification, Region
 from worlds.AutoWorld import AutoWorldRegister
-from . import setup_solo_multiworld, gen_steps
+from worlds.generic.Rules import declare_item_dependencies
+from . import setup_solo_multiworld, gen_steps, generate_test_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -79,3 +80,72 @@ class TestBase(unittest.TestCase):
                             locations.add(location)
                     self.assertGreater(len(locations), 0,
                                        msg="Need to be able to reach at least one location to get started.")
+
+
+class TestRuleDependencyIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.player = 1
+        self.multiworld.worlds[self.player].rule_dependency_index = True
+        self.calls = {"declared": 0, "undeclared": 0}
+        menu = self.multiworld.get_region("Menu", self.player)
+        self.declared = Region("Declared", self.player, self.multiworld)
+        self.undeclared = Region("Undeclared", self.player, self.multiworld)
+        self.multiworld.regions += [self.declared, self.undeclared]
+
+        def declared_rule(state: CollectionState) -> bool:
+            self.calls["declared"] += 1
+            return state.has("Key", self.player)
+
+        def undeclared_rule(state: CollectionState) -> bool:
+            self.calls["undeclared"] += 1
+            return state.has("Other Key", self.player)
+
+        menu.connect(self.declared, rule=declare_item_dependencies(declared_rule, "Key"))
+        menu.connect(self.undeclared, rule=undeclared_rule)
+
+    def create_item(self, name: str) -> Item:
+        return Item(name, ItemClassification.progression, None, self.player)
+
+    def test_declared_rule_is_only_retested_on_change(self) -> None:
+        """Tests that a blocked connection with declared dependencies is skipped until one of them is collected"""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.declared.can_reach(state))
+        self.assertEqual(self.calls["declared"], 1)
+
+        state.collect(self.create_item("Other Key"), True)
+        self.assertTrue(self.undeclared.can_reach(state))
+        self.assertFalse(self.declared.can_reach(state))
+        self.assertEqual(self.calls["declared"], 1)
+        self.assertEqual(self.calls["undeclared"], 2)
+
+        state.collect(self.create_item("Key"), True)
+        self.assertTrue(self.declared.can_reach(state))
+        self.assertEqual(self.calls["declared"], 2)
+
+    def test_declare_bound_method(self) -> None:
+        """Tests that dependencies can be declared for rules that can't hold attributes, like bound methods"""
+        class Rules:
+            def has_key(self, state: CollectionState) -> bool:
+                return state.has("Key", 1)
+
+        rule = declare_item_dependencies(Rules().has_key, "Key")
+        self.assertEqual(rule.item_dependencies, frozenset({"Key"}))
+        state = CollectionState(self.multiworld)
+        self.assertFalse(rule(state))
+        state.collect(self.create_item("Key"), True)
+        self.assertTrue(rule(state))
+
+    def test_copies_keep_their_own_changes(self) -> None:
+        """Tests that changes made to a copy do not leak into the original state"""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.declared.can_reach(state))
+        copy = state.copy()
+        copy.collect(self.create_item("Key"), True)
+        self.assertTrue(self.declared.can_reach(copy))
+        self.assertFalse(self.declared.can_reach(state))
+
+        state.collect(self.create_item("Key"), True)
+        self.assertTrue(self.declared.can_reach(state))
+        state.remove(self.create_item("Key"))
+        self.assertFalse(self.declared.can_reach(state))
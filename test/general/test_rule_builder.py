@@ -0,0 +1,98 @@
+import unittest
+
+from BaseClasses import CollectionState, Location, Region
+from rule_builder import And, CanReach, Count, False_, Group, Has, HasAll, Or, Rule, True_
+from worlds.generic.Rules import add_rule, set_rule
+from . import generate_test_multiworld
+
+
+class TestRuleBuilder(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.world = self.multiworld.worlds[1]
+        self.world.item_name_groups = {"Weapons": {"Sword", "Bow"}}
+        self.menu = self.multiworld.get_region("Menu", 1)
+        self.state = CollectionState(self.multiworld)
+
+    def test_simplify(self) -> None:
+        """Tests that constant parts and redundant nesting are removed"""
+        self.assertEqual(And(Has("Sword"), True_()).simplify(), Has("Sword"))
+        self.assertEqual(And(Has("Sword"), False_()).simplify(), False_())
+        self.assertEqual(Or(Has("Sword"), True_()).simplify(), True_())
+        self.assertEqual(Or(Has("Sword"), False_(), Has("Sword")).simplify(), Has("Sword"))
+        self.assertEqual(Or(Has("Sword"), Or(Has("Bow"), Has("Shield"))).simplify(),
+                         Or(Has("Sword"), Has("Bow"), Has("Shield")))
+        self.assertEqual(And(Has("Sword"), And(Has("Bow"), Has("Shield", 2))).simplify(),
+                         And(HasAll("Sword", "Bow"), Has("Shield", 2)))
+        self.assertEqual(Count(("Sword", "Bow"), 0).simplify(), True_())
+        self.assertEqual(HasAll().simplify(), True_())
+
+    def test_evaluation(self) -> None:
+        """Tests that compiled rules match the CollectionState helpers they replace"""
+        rules = {
+            Has("Sword"): lambda state: state.has("Sword", 1),
+            Has("Sword", 2): lambda state: state.has("Sword", 1, 2),
+            HasAll("Sword", "Bow"): lambda state: state.has_all(("Sword", "Bow"), 1),
+            Count(("Sword", "Bow"), 2): lambda state: state.has_from_list(("Sword", "Bow"), 1, 2),
+            Group("Weapons", 2): lambda state: state.has_group("Weapons", 1, 2),
+            Has("Sword") | Has("Shield"): lambda state: state.has_any(("Sword", "Shield"), 1),
+            Has("Sword") & Has("Shield"): lambda state: state.has_all(("Sword", "Shield"), 1),
+        }
+        compiled = {rule: rule.compile(self.world) for rule in rules}
+        for item in ("Sword", "Shield", "Bow", "Sword"):
+            self.state.add_item(item, 1)
+            for rule, expected in rules.items():
+                with self.subTest(rule=rule, items=self.state.prog_items[1]):
+                    self.assertEqual(compiled[rule](self.state), expected(self.state))
+
+    def test_item_dependencies(self) -> None:
+        """Tests that compiled rules declare their item dependencies unless they check reachability"""
+        rule = (Has("Sword") | Group("Weapons")).compile(self.world)
+        self.assertEqual(rule.item_dependencies, {"Sword", "Bow"})
+        rule = (Has("Sword") | CanReach("Menu")).compile(self.world)
+        self.assertFalse(hasattr(rule, "item_dependencies"))
+
+    def test_abstract(self) -> None:
+        """Tests that rules have to implement their dependencies and compilation"""
+        with self.assertRaises(TypeError):
+            Rule()  # type: ignore[abstract]
+
+    def test_constant_rules_are_not_shared(self) -> None:
+        """Tests that compiling a constant rule does not declare dependencies on a function shared with other rules"""
+        first, second = True_().compile(self.world), True_().compile(self.world)
+        self.assertIsNot(first, second)
+        self.assertIsNot(False_().compile(self.world), False_().compile(self.world))
+
+    def test_reach_location_and_entrance(self) -> None:
+        """Tests that rules reaching a Location or Entrance register its parent region as an indirect condition"""
+        target = Region("Target", 1, self.multiworld)
+        other = Region("Other", 1, self.multiworld)
+        beyond = Region("Beyond", 1, self.multiworld)
+        self.multiworld.regions += [target, other, beyond]
+        other.locations.append(Location(1, "Other Location", None, other))
+        other.connect(beyond, "Other Exit")
+        entrance = self.menu.connect(target)
+        self.menu.connect(other, rule=lambda state: state.has("Bow", 1))
+        set_rule(entrance, CanReach("Other Location", "Location") | CanReach("Other Exit", "Entrance"))
+        self.assertEqual(self.multiworld.indirect_connections[other], {entrance})
+        self.assertFalse(entrance.access_rule(self.state))
+        self.state.add_item("Bow", 1)
+        self.state.stale[1] = True
+        self.assertTrue(entrance.access_rule(self.state))
+
+    def test_set_rule(self) -> None:
+        """Tests that set_rule and add_rule accept rules and register indirect conditions"""
+        target = Region("Target", 1, self.multiworld)
+        other = Region("Other", 1, self.multiworld)
+        self.multiworld.regions += [target, other]
+        entrance = self.menu.connect(target)
+        self.menu.connect(other, rule=lambda state: state.has("Bow", 1))
+        set_rule(entrance, Has("Sword"))
+        add_rule(entrance, CanReach("Other"))
+        self.assertEqual(self.multiworld.indirect_connections[other], {entrance})
+
+        self.state.add_item("Sword", 1)
+        self.assertFalse(entrance.access_rule(self.state))
+        self.state.add_item("Bow", 1)
+        self.state.stale[1] = True
+        self.assertTrue(entrance.access_rule(self.state))
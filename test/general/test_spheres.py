@@ -0,0 +1,79 @@
+import unittest
+
+from BaseClasses import CollectionState, Item, ItemClassification, Location, LocationFrontier, Region, SphereIndex
+from Fill import distribute_items_restrictive
+from worlds.AutoWorld import AutoWorldRegister, call_all
+from worlds.generic.Rules import declare_item_dependencies
+from . import generate_test_multiworld, setup_multiworld
+
+
+class TestSphereIndex(unittest.TestCase):
+    def setUp(self) -> None:
+        world_type = AutoWorldRegister.world_types["Dragon Quest IX"]
+        self.multiworld = setup_multiworld([world_type, world_type], seed=0)
+        distribute_items_restrictive(self.multiworld)
+        call_all(self.multiworld, "post_fill")
+
+    def test_matches_sweeps(self) -> None:
+        """Tests that the spheres read from the index are the same as the ones computed by sweeping"""
+        multiworld = self.multiworld
+        spheres = list(multiworld.get_spheres())
+        sendable_spheres = list(multiworld.get_sendable_spheres())
+        fulfills_accessibility = multiworld.fulfills_accessibility()
+
+        index = SphereIndex(multiworld, max_cached_states=2)
+        self.assertEqual(list(multiworld.get_spheres(index)), spheres)
+        self.assertEqual(list(multiworld.get_sendable_spheres(index)), sendable_spheres)
+        self.assertEqual(multiworld.fulfills_accessibility(sphere_index=index), fulfills_accessibility)
+
+    def test_states(self) -> None:
+        """Tests that states rebuilt between the cached ones are the same as the ones at the start of each sphere"""
+        index = SphereIndex(self.multiworld, max_cached_states=2)
+        checked = set()
+        for num in range(len(index)):
+            with self.subTest(sphere=num):
+                state = index.get_state(num)
+                self.assertEqual(state.locations_checked, checked)
+                self.assertTrue(all(location.can_reach(state) for location in index.get_sphere(num)))
+                checked.update(index.get_sphere(num))
+        self.assertEqual(index.state.locations_checked, checked)
+
+
+class TestLocationFrontier(unittest.TestCase):
+    def test_retests_on_changes(self) -> None:
+        """Tests that locations are only tested once their region is reached or their declared dependencies change"""
+        multiworld = generate_test_multiworld()
+        menu = multiworld.get_region("Menu", 1)
+        locked = Region("Locked", 1, multiworld)
+        multiworld.regions.append(locked)
+        menu.connect(locked, rule=lambda state: state.has("Key", 1))
+        checks = {"Declared": 0, "Undeclared": 0, "Locked": 0}
+
+        def create_location(name: str, region: Region, item: str) -> Location:
+            def rule(state: CollectionState) -> bool:
+                checks[name] += 1
+                return state.has(item, 1)
+
+            location = Location(1, name, None, region)
+            location.access_rule = rule
+            region.locations.append(location)
+            return location
+
+        declared = create_location("Declared", menu, "Sword")
+        declare_item_dependencies(declared.access_rule, "Sword")
+        undeclared = create_location("Undeclared", menu, "Sword")
+        in_locked = create_location("Locked", locked, "Key")
+
+        state = CollectionState(multiworld)
+        frontier = LocationFrontier(state, (declared, undeclared, in_locked))
+        self.assertEqual(frontier.find_reachable(), [])
+        state.collect(Item("Shield", ItemClassification.progression, None, 1), True)
+        self.assertEqual(frontier.find_reachable(), [])
+        self.assertEqual(checks, {"Declared": 1, "Undeclared": 2, "Locked": 0})
+
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+        self.assertEqual(frontier.find_reachable(), [in_locked])
+        frontier.remove([in_locked])
+        state.collect(Item("Sword", ItemClassification.progression, None, 1), True)
+        self.assertEqual(set(frontier.find_reachable()), {declared, undeclared})
+        self.assertEqual(checks, {"Declared": 2, "Undeclared": 4, "Locked": 1})
@@ -0,0 +1,66 @@
+import unittest
+from typing import Dict, List, Set
+
+from BaseClasses import CollectionState, Location, MultiWorld, SphereIndex, Spoiler
+from Fill import distribute_items_restrictive
+from worlds.AutoWorld import AutoWorldRegister, call_all
+from . import setup_multiworld
+
+
+def cull_one_at_a_time(multiworld: MultiWorld) -> Dict[str, Dict[str, str]]:
+    """Culls the playthrough by removing each required location on its own, like the spoiler did before batching."""
+    spheres: List[List[Location]] = []
+    states: List[CollectionState] = []
+    state = CollectionState(multiworld)
+    for sphere in multiworld.get_spheres():
+        states.append(state.copy())
+        spheres.append(sorted(location for location in sphere if location.item.advancement))
+        for location in sphere:
+            state.collect(location.item, True, location)
+
+    required_locations = {location for sphere in spheres for location in sphere}
+    for num, sphere in reversed(tuple(enumerate(spheres))):
+        for location in sphere:
+            required_locations.remove(location)
+            if not multiworld.can_beat_game(states[num], required_locations):
+                required_locations.add(location)
+
+    playthrough: Dict[str, Dict[str, str]] = {}
+    state = CollectionState(multiworld)
+    while required_locations:
+        sphere_locations: Set[Location] = set(filter(state.can_reach, required_locations))
+        for location in sphere_locations:
+            state.collect(location.item, True, location)
+        playthrough[str(len(playthrough) + 1)] = {
+            str(location): str(location.item) for location in sorted(sphere_locations)}
+        required_locations -= sphere_locations
+    return playthrough
+
+
+class TestPlaythrough(unittest.TestCase):
+    def setUp(self) -> None:
+        world_types = [AutoWorldRegister.world_types[game] for game in ("Timespinner", "Super Mario 64")]
+        self.multiworld = setup_multiworld(world_types * 2, seed=0)
+        distribute_items_restrictive(self.multiworld)
+        call_all(self.multiworld, "post_fill")
+
+    def test_matches_culling_one_at_a_time(self) -> None:
+        """Tests that culling in sphere order and in batches keeps the same locations as culling them one by one"""
+        expected = cull_one_at_a_time(self.multiworld)
+        spoiler = Spoiler(self.multiworld)
+        spoiler.create_playthrough(create_paths=False)
+        del spoiler.playthrough["0"]
+        self.assertTrue(expected)
+        self.assertEqual(spoiler.playthrough, expected)
+
+    def test_bounded_state_cache(self) -> None:
+        """Tests that bounding the cached sphere states keeps the cache small and doesn't change the playthrough"""
+        index = SphereIndex(self.multiworld, max_cached_states=2)
+        self.assertGreater(len(index), 2)
+        self.assertLessEqual(len(index._state_cache), 2)
+
+        spoiler = Spoiler(self.multiworld)
+        spoiler.create_playthrough(create_paths=False)
+        bounded_spoiler = Spoiler(self.multiworld)
+        bounded_spoiler.create_playthrough(create_paths=False, max_cached_states=2)
+        self.assertEqual(bounded_spoiler.playthrough, spoiler.playthrough)
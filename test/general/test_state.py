@@ -1,7 +1,10 @@
 import unittest
+from collections import Counter
+from unittest import mock
 
+from BaseClasses import CollectionState, Item, ItemClassification, ItemCounts, ItemIndex, Location, MultiWorld, Region
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from . import generate_test_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -27,3 +30,318 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+
+class TestCopyOnWrite(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+        self.locked = {}
+        for player in self.multiworld.player_ids:
+            menu = self.multiworld.get_region("Menu", player)
+            locked = Region("Locked", player, self.multiworld)
+            self.multiworld.regions.append(locked)
+            menu.connect(locked, rule=lambda state, player=player: state.has("Key", player))
+            self.locked[player] = locked
+
+    def test_copies_are_independent(self) -> None:
+        """Tests that changes to either side of a copy-on-write copy do not affect the other"""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.locked[1].can_reach(state))
+        copy = state.copy(copy_on_write=True)
+        self.assertIs(copy.prog_items[2], state.prog_items[2])
+
+        copy.collect(Item("Key", ItemClassification.progression, None, 1), True)
+        self.assertTrue(self.locked[1].can_reach(copy))
+        self.assertFalse(self.locked[1].can_reach(state))
+        self.assertEqual(state.count("Key", 1), 0)
+
+        state.collect(Item("Key", ItemClassification.progression, None, 2), True)
+        self.assertTrue(self.locked[2].can_reach(state))
+        self.assertFalse(self.locked[2].can_reach(copy))
+        self.assertEqual(copy.count("Key", 2), 0)
+
+    def test_unchanged_reachability_stays_shared(self) -> None:
+        """Tests that a reachability update that finds nothing new does not copy the player's structures"""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.locked[1].can_reach(state))
+        copy = state.copy(copy_on_write=True)
+        self.assertFalse(self.locked[1].can_reach(copy))
+        self.assertIs(copy.reachable_regions[1], state.reachable_regions[1])
+        self.assertIs(copy.blocked_connections[1], state.blocked_connections[1])
+
+
+class TestItemCounts(unittest.TestCase):
+    def setUp(self) -> None:
+        self.index = ItemIndex(("Sword", "Shield", "Bow"), {"Weapons": {"Sword", "Bow"}})
+
+    def test_counter_compatibility(self) -> None:
+        """Tests that ItemCounts behaves like the Counter it replaces"""
+        counts = ItemCounts(self.index)
+        counts["Sword"] += 2
+        counts["Event"] += 1
+        self.assertEqual(counts["Sword"], 2)
+        self.assertEqual(counts["Shield"], 0)
+        self.assertEqual(counts["Event"], 1)
+        self.assertEqual(counts["Unknown"], 0)
+        self.assertIn("Sword", counts)
+        self.assertNotIn("Shield", counts)
+        self.assertEqual(counts, {"Sword": 2, "Event": 1})
+        self.assertEqual(counts.total(), 3)
+
+        copy = counts.copy()
+        del counts["Sword"]
+        del counts["Event"]
+        del counts["Unknown"]
+        self.assertEqual(len(counts), 0)
+        self.assertEqual(copy, {"Sword": 2, "Event": 1})
+
+    def test_counter_methods(self) -> None:
+        """Tests that the Counter methods worlds use on prog_items add up counts like Counter does"""
+        counts = ItemCounts(self.index)
+        counter = Counter()
+        for target in (counts, counter):
+            target.update({"Sword": 2, "Event": 1})
+            target.update(["Sword", "Bow"], Shield=3)
+            target.subtract({"Shield": 1})
+            target.subtract(["Bow"])
+        self.assertEqual(counts, {item: count for item, count in counter.items() if count})
+        self.assertEqual(counts.most_common(1), counter.most_common(1))
+        self.assertEqual(sorted(counts.elements()), sorted(counter.elements()))
+        with self.assertRaises(TypeError):
+            counts + counter
+
+    def test_group_lookups(self) -> None:
+        """Tests that group lookups on indexed prog_items match the ones on a Counter"""
+        multiworld = generate_test_multiworld()
+        world = multiworld.worlds[1]
+        world.item_name_groups = {"Weapons": {"Sword", "Bow"}}
+        state = CollectionState(multiworld)
+        state.prog_items[1] = ItemCounts(self.index)
+        state.add_item("Sword", 1, 2)
+        state.add_item("Shield", 1)
+        self.assertTrue(state.has_group("Weapons", 1, 2))
+        self.assertFalse(state.has_group("Weapons", 1, 3))
+        self.assertFalse(state.has_group_unique("Weapons", 1, 2))
+        self.assertEqual(state.count_group("Weapons", 1), 2)
+        self.assertEqual(state.count_group_unique("Weapons", 1), 1)
+        self.assertTrue(state.has_all(("Sword", "Shield"), 1))
+        self.assertEqual(state.count_from_list(("Sword", "Shield", "Bow"), 1), 3)
+
+    def test_name_lookups(self) -> None:
+        """Tests that item name lookups on indexed prog_items match the ones on a Counter"""
+        multiworld = generate_test_multiworld()
+        counter_state = CollectionState(multiworld)
+        indexed_state = CollectionState(multiworld)
+        indexed_state.prog_items[1] = ItemCounts(self.index)
+        for state in (counter_state, indexed_state):
+            state.add_item("Sword", 1, 2)
+            state.add_item("Event", 1)
+        items = ("Sword", "Shield", "Event", "Unknown")
+        for name in items:
+            self.assertEqual(indexed_state.has(name, 1), counter_state.has(name, 1), name)
+            self.assertEqual(indexed_state.count(name, 1), counter_state.count(name, 1), name)
+        for names in (items, ("Sword", "Event"), ("Shield", "Unknown")):
+            self.assertEqual(indexed_state.has_all(names, 1), counter_state.has_all(names, 1), names)
+            self.assertEqual(indexed_state.has_any(names, 1), counter_state.has_any(names, 1), names)
+            self.assertEqual(indexed_state.count_from_list(names, 1), counter_state.count_from_list(names, 1), names)
+            self.assertEqual(indexed_state.count_from_list_unique(names, 1),
+                             counter_state.count_from_list_unique(names, 1), names)
+            for count in (1, 2, 3):
+                self.assertEqual(indexed_state.has_from_list(names, 1, count),
+                                 counter_state.has_from_list(names, 1, count), (names, count))
+                self.assertEqual(indexed_state.has_from_list_unique(names, 1, count),
+                                 counter_state.has_from_list_unique(names, 1, count), (names, count))
+        for item_counts in ({"Sword": 2, "Event": 1}, {"Sword": 3, "Shield": 1}):
+            self.assertEqual(indexed_state.has_all_counts(item_counts, 1),
+                             counter_state.has_all_counts(item_counts, 1), item_counts)
+            self.assertEqual(indexed_state.has_any_count(item_counts, 1),
+                             counter_state.has_any_count(item_counts, 1), item_counts)
+
+
+class TestSelfContainedLogic(unittest.TestCase):
+    def test_skips_confirmation_pass(self) -> None:
+        """Tests that sweeps only re-check players whose logic may depend on other players once nothing is found"""
+        multiworld = generate_test_multiworld(2)
+        checks = {player: 0 for player in multiworld.player_ids}
+
+        def rule(state: CollectionState, player: int) -> bool:
+            checks[player] += 1
+            return False
+
+        for player in multiworld.player_ids:
+            location = Location(player, "Blocked", None, multiworld.get_region("Menu", player))
+            location.place_locked_item(Item("Event", ItemClassification.progression, None, player))
+            location.access_rule = lambda state, player=player: rule(state, player)
+            multiworld.get_region("Menu", player).locations.append(location)
+
+        multiworld.worlds[1].self_contained_logic = True
+        CollectionState(multiworld).sweep_for_advancements()
+        self.assertEqual(checks, {1: 1, 2: 2})
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld(2)
+        self.locked = {}
+        for player in self.multiworld.player_ids:
+            menu = self.multiworld.get_region("Menu", player)
+            locked = Region("Locked", player, self.multiworld)
+            self.multiworld.regions.append(locked)
+            menu.connect(locked, rule=lambda state, player=player: state.has("Key", player))
+            self.locked[player] = locked
+        self.location = Location(1, "Key Location", None, self.multiworld.get_region("Menu", 1))
+
+    def test_rollback(self) -> None:
+        """Tests that rolling back undoes collected items, reached regions and checked locations"""
+        state = CollectionState(self.multiworld)
+        self.assertFalse(self.locked[1].can_reach(state))
+        checkpoint = state.checkpoint()
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True, self.location)
+        self.assertTrue(self.locked[1].can_reach(state))
+        state.rollback(checkpoint)
+        self.assertEqual(state.count("Key", 1), 0)
+        self.assertFalse(self.locked[1].can_reach(state))
+        self.assertNotIn(self.location, state.locations_checked)
+        self.assertNotIn(self.locked[1], state.path)
+        self.assertFalse(state.checkpoints)
+
+    def test_nested(self) -> None:
+        """Tests that rolling back to an outer checkpoint also undoes the changes since an inner one"""
+        state = CollectionState(self.multiworld)
+        outer = state.checkpoint()
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+        inner = state.checkpoint()
+        state.collect(Item("Key", ItemClassification.progression, None, 2), True)
+        state.rollback(inner)
+        self.assertTrue(self.locked[1].can_reach(state))
+        self.assertFalse(self.locked[2].can_reach(state))
+        state.rollback(outer)
+        self.assertFalse(self.locked[1].can_reach(state))
+        self.assertEqual(state.count("Key", 1), 0)
+
+    def test_copies_are_independent(self) -> None:
+        """Tests that rolling back does not affect copy-on-write copies made since the checkpoint and vice versa"""
+        state = CollectionState(self.multiworld)
+        checkpoint = state.checkpoint()
+        copy = state.copy(copy_on_write=True)
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+        state.rollback(checkpoint)
+        copy.collect(Item("Key", ItemClassification.progression, None, 2), True)
+        self.assertTrue(self.locked[2].can_reach(copy))
+        self.assertFalse(self.locked[2].can_reach(state))
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+        self.assertFalse(self.locked[1].can_reach(copy))
+
+    def test_mixins(self) -> None:
+        """Tests that rolling back restores logic mixins like copying does, initializing those without copy_mixin"""
+        def init_mixin(state: CollectionState, multiworld: MultiWorld) -> None:
+            state.key_cache = None
+            state.keys_seen = 0
+
+        def copy_mixin(state: CollectionState, ret: CollectionState) -> CollectionState:
+            ret.keys_seen = state.keys_seen
+            return ret
+
+        with mock.patch.object(CollectionState, "additional_init_functions", [init_mixin]), \
+                mock.patch.object(CollectionState, "additional_copy_functions", [copy_mixin]):
+            state = CollectionState(self.multiworld)
+            state.key_cache = "no keys"
+            state.keys_seen = 1
+            checkpoint = state.checkpoint()
+            state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+            state.key_cache = "one key"
+            state.keys_seen = 2
+            state.rollback(checkpoint)
+            self.assertIsNone(state.key_cache)
+            self.assertEqual(state.keys_seen, 1)
+
+    def test_commit(self) -> None:
+        """Tests that committing keeps the changes and stops logging them"""
+        state = CollectionState(self.multiworld)
+        checkpoint = state.checkpoint()
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True, self.location)
+        state.commit(checkpoint)
+        self.assertTrue(self.locked[1].can_reach(state))
+        self.assertIn(self.location, state.locations_checked)
+        self.assertFalse(state.checked_log)
+
+
+class TestRegionGraph(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = generate_test_multiworld()
+        self.multiworld.worlds[1].compiled_region_graph = True
+        menu = self.multiworld.get_region("Menu", 1)
+        self.regions = [Region(f"Region {index}", 1, self.multiworld) for index in range(4)]
+        self.multiworld.regions += self.regions
+        menu.connect(self.regions[0])
+        self.regions[0].connect(self.regions[1], rule=lambda state: state.has("Key", 1))
+        self.regions[1].connect(self.regions[2])
+        self.regions[2].connect(self.regions[3], rule=lambda state: state.can_reach_region("Region 1", 1))
+        self.regions[3].connect(menu)
+        self.multiworld.register_indirect_condition(self.regions[1], self.regions[2].exits[0])
+
+    def test_matches_sets(self) -> None:
+        """Tests that searching a compiled region graph finds the same regions and blocked entrances as on sets"""
+        uncompiled = CollectionState(self.multiworld)
+        self.multiworld.freeze_region_graphs()
+        self.assertIn(1, self.multiworld.region_graphs)
+        compiled = CollectionState(self.multiworld)
+        for state in (uncompiled, compiled):
+            state.update_reachable_regions(1)
+        self.assertEqual(compiled.reachable_regions[1], uncompiled.reachable_regions[1])
+        self.assertEqual(set(compiled.blocked_connections[1]), uncompiled.blocked_connections[1])
+
+        copy = compiled.copy()
+        for state in (uncompiled, compiled):
+            state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+            state.update_reachable_regions(1)
+        self.assertEqual(compiled.reachable_regions[1], set(self.multiworld.get_regions(1)))
+        self.assertEqual(compiled.reachable_regions[1], uncompiled.reachable_regions[1])
+        self.assertEqual(set(compiled.blocked_connections[1]), uncompiled.blocked_connections[1])
+        self.assertEqual(compiled.path[self.regions[3]], uncompiled.path[self.regions[3]])
+        self.assertFalse(self.regions[1].can_reach(copy))
+
+    def test_rules_set_after_compiling(self) -> None:
+        """Tests that entrances without an access_rule when the graph was compiled are tested once they get one"""
+        self.multiworld.freeze_region_graphs()
+        self.regions[1].exits[0].access_rule = lambda state: state.has("Pass", 1)
+        state = CollectionState(self.multiworld)
+        state.collect(Item("Key", ItemClassification.progression, None, 1), True)
+        self.assertTrue(self.regions[1].can_reach(state))
+        self.assertFalse(self.regions[2].can_reach(state))
+        state.collect(Item("Pass", ItemClassification.progression, None, 1), True)
+        self.assertTrue(self.regions[2].can_reach(state))
+
+    def test_open_exits_are_not_compiled(self) -> None:
+        """Tests that graphs with exits that are not connected anywhere are left to the search on sets"""
+        self.regions[3].create_exit("Open")
+        self.multiworld.freeze_region_graphs()
+        self.assertNotIn(1, self.multiworld.region_graphs)
+
+
+class TestReachableLocations(unittest.TestCase):
+    def test_checks_regions_once(self) -> None:
+        """Tests that batch reachability keeps the order, and skips rules in regions that cannot be reached"""
+        multiworld = generate_test_multiworld()
+        menu = multiworld.get_region("Menu", 1)
+        locked = Region("Locked", 1, multiworld)
+        multiworld.regions.append(locked)
+        menu.connect(locked, rule=lambda state: state.has("Key", 1))
+        checks = []
+
+        def rule(state: CollectionState, name: str) -> bool:
+            checks.append(name)
+            return name != "Menu 0"
+
+        locations = []
+        for index, region in enumerate((menu, locked, menu, locked)):
+            location = Location(1, f"{region.name} {index}", None, region)
+            location.access_rule = lambda state, name=location.name: rule(state, name)
+            region.locations.append(location)
+            locations.append(location)
+
+        state = CollectionState(multiworld)
+        self.assertEqual(state.reachable_locations(reversed(locations)), [locations[2]])
+        self.assertEqual(checks, ["Menu 2", "Menu 0"])
+        self.assertEqual(state.reachable_locations(locations),
+                         [location for location in locations if location.can_reach(state)])
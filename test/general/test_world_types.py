@@ -0,0 +1,57 @@
+import unittest
+
+from Utils import Version
+from worlds.AutoWorld import WorldTypes
+
+
+class FakeWorldSource:
+    def __init__(self, registry: WorldTypes, game: str, version: Version, fail: bool = False) -> None:
+        self.registry = registry
+        self.game = game
+        self.path = game.lower()
+        self.version = version
+        self.fail = fail
+        self.loads = 0
+
+    def load(self) -> bool:
+        self.loads += 1
+        if self.fail:
+            return False
+        self.registry.register(self.game, type(self.game, (), {"world_version": Version(0, 0, 0)}))  # type: ignore
+        return True
+
+
+class TestWorldTypes(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = WorldTypes()
+        self.source = FakeWorldSource(self.registry, "Lazy Game", Version(1, 2, 3))
+        self.failing_source = FakeWorldSource(self.registry, "Broken Game", Version(0, 1, 0), fail=True)
+        self.assertTrue(self.registry.add_lazy_source(self.source.game, self.source))
+        self.assertTrue(self.registry.add_lazy_source(self.failing_source.game, self.failing_source))
+
+    def test_load_on_lookup(self) -> None:
+        """Test that a world is only imported once its game is looked up, taking the version of its source."""
+        self.assertEqual(self.source.loads, 0)
+        self.assertNotIn(self.source.game, self.registry.loaded())
+        world_type = self.registry[self.source.game]
+        self.assertEqual(world_type.world_version, Version(1, 2, 3))
+        self.assertIs(self.registry[self.source.game], world_type)
+        self.assertEqual(self.source.loads, 1)
+        self.assertEqual(self.failing_source.loads, 0)
+
+    def test_failed_load(self) -> None:
+        self.assertNotIn(self.failing_source.game, self.registry)
+        self.assertIsNone(self.registry.get(self.failing_source.game))
+        with self.assertRaises(KeyError):
+            self.registry[self.failing_source.game]
+        self.assertEqual(self.failing_source.loads, 1)
+
+    def test_iterate_loads_all(self) -> None:
+        self.assertEqual(list(self.registry), [self.source.game])
+        self.assertFalse(self.registry.lazy_sources)
+        self.assertEqual((self.source.loads, self.failing_source.loads), (1, 1))
+
+    def test_duplicate_source(self) -> None:
+        self.assertFalse(self.registry.add_lazy_source(self.source.game, self.failing_source))
+        self.registry.load_all()
+        self.assertFalse(self.registry.add_lazy_source(self.source.game, self.failing_source))
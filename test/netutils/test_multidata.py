@@ -0,0 +1,102 @@
+# Tests for the .archipelago formats in NetUtils
+import json
+import pickle
+import unittest
+import zlib
+from collections import Counter
+
+from NetUtils import HintStatus, NetworkItem, NetworkSlot, SectionedMultiData, SlotType, \
+    check_multidata_compression, decode_multidata, encode_multidata, multidata_codecs, multidata_format
+from Options import Toggle
+from Utils import Version
+
+sample_data = {
+    "slot_info": {1: NetworkSlot("Player1", "Archipelago", SlotType.player)},
+    "connect_names": {"Player1": (0, 1)},
+    "locations": {1: {11: (21, 1, 0)}},
+    "slot_data": {1: {"goal": 2}},
+    "seed_name": "12345",
+    "spheres": [{1: {11}}],
+}
+
+
+class TestMultiData(unittest.TestCase):
+    def test_roundtrip(self) -> None:
+        data = encode_multidata(sample_data)
+        self.assertEqual(data[0], multidata_format)
+        multidata = decode_multidata(data)
+        self.assertIsInstance(multidata, SectionedMultiData)
+        self.assertEqual(list(multidata), list(sample_data))
+        self.assertEqual(dict(multidata), sample_data)
+
+    def test_lazy_sections(self) -> None:
+        """Tests that sections are only decoded when accessed, by corrupting one that's never accessed."""
+        data = bytearray(encode_multidata(sample_data))
+        table_length = int.from_bytes(data[-4:], "little")
+        offset, length = json.loads(data[-4 - table_length:-4])["sections"]["spheres"]
+        data[offset + length] ^= 0xFF  # the last byte of the spheres section, after the format byte
+        multidata = decode_multidata(bytes(data))
+        self.assertEqual(multidata["locations"], sample_data["locations"])
+        self.assertIn("spheres", multidata)
+        with self.assertRaises(zlib.error):
+            multidata["spheres"]
+
+    def test_modify(self) -> None:
+        multidata = decode_multidata(encode_multidata(sample_data))
+        multidata["slot_data"][1]["goal"] = 3
+        multidata["race_mode"] = 1
+        self.assertEqual(multidata.pop("locations"), sample_data["locations"])
+        reencoded = decode_multidata(encode_multidata(multidata))
+        self.assertEqual(reencoded["slot_data"], {1: {"goal": 3}})
+        self.assertEqual(reencoded["race_mode"], 1)
+        self.assertNotIn("locations", reencoded)
+        self.assertEqual(reencoded["spheres"], sample_data["spheres"])
+
+    def test_codecs(self) -> None:
+        for codec in multidata_codecs:
+            for level in (0, 9):
+                with self.subTest(codec=codec, level=level):
+                    multidata = decode_multidata(encode_multidata(sample_data, codec, level))
+                    self.assertEqual(dict(multidata), sample_data)
+
+    def test_reencode_other_codec(self) -> None:
+        """Tests that sections are recompressed when writing with a different codec than they were read with."""
+        multidata = decode_multidata(encode_multidata(sample_data, "lzma"))
+        reencoded = decode_multidata(encode_multidata(multidata, "zlib"))
+        self.assertEqual(reencoded.codec, "zlib")
+        self.assertEqual(dict(reencoded), sample_data)
+
+    def test_compression_settings(self) -> None:
+        """Tests that codecs and levels multidata can't be written with are rejected."""
+        check_multidata_compression("lzma", 9)
+        for codec, level in (("zstd", 6), ("lzma", 10), ("bz2", -1), ("zlib", "6")):
+            with self.subTest(codec=codec, level=level), self.assertRaises(ValueError):
+                check_multidata_compression(codec, level)
+
+    def test_forbidden_global(self) -> None:
+        """Tests that writing multidata fails if it couldn't be loaded again."""
+        for value in (print, unittest.TestCase, unittest.TestCase(), {1: [{"nested": Version(0, 1, 0)}]}):
+            with self.subTest(value=value), self.assertRaises(pickle.PicklingError):
+                encode_multidata({"slot_data": {1: {"value": value}}})
+
+    def test_allowed_globals(self) -> None:
+        """Tests that the classes restricted_loads allows can be written."""
+        slot_data = {"counter": Counter(a=1), "groups": frozenset({"a"}), "toggle": Toggle(1),
+                     "hint_status": HintStatus.HINT_FOUND, "items": [NetworkItem(1, 2, 3, 0)]}
+        self.assertEqual(decode_multidata(encode_multidata({"slot_data": {1: slot_data}}))["slot_data"],
+                         {1: slot_data})
+
+    def test_format_3(self) -> None:
+        data = bytes([3]) + zlib.compress(pickle.dumps(sample_data), 9)
+        self.assertEqual(decode_multidata(data), sample_data)
+
+    def test_format_4(self) -> None:
+        sections = {key: zlib.compress(pickle.dumps(value), 9) for key, value in sample_data.items()}
+        table_of_contents: dict[str, tuple[int, int]] = {}
+        offset = 0
+        for key, section in sections.items():
+            table_of_contents[key] = (offset, len(section))
+            offset += len(section)
+        encoded_table = json.dumps(table_of_contents).encode()
+        data = b"".join((bytes([4]), len(encoded_table).to_bytes(4, "little"), encoded_table, *sections.values()))
+        self.assertEqual(dict(decode_multidata(data)), sample_data)
@@ -1,5 +1,7 @@
 # Tests for Generate.py (ArchipelagoGenerate.exe)
 
+import json
+import logging
 import unittest
 import os
 import os.path
@@ -72,6 +74,50 @@ class TestGenerateMain(unittest.TestCase):
 
         self.assertOutput(self.output_tempdir.name)
 
+    def test_generate_profile(self):
+        profile_path = os.path.join(self.output_tempdir.name, "trace.json")
+        sys.argv = [sys.argv[0], '--seed', '0',
+                    '--player_files_path', str(self.abs_input_dir),
+                    '--outputpath', self.output_tempdir.name,
+                    '--profile_out', profile_path]
+        Main.main(*Generate.main())
+
+        self.assertOutput(self.output_tempdir.name)
+        with open(profile_path, encoding="utf-8") as f:
+            trace = json.load(f)
+        spans = {event["name"]: event for event in trace["traceEvents"] if event["ph"] == "X"}
+        for stage in ("generation", "create_regions", "set_rules", "main fill", "write_multidata"):
+            self.assertIn(stage, spans)
+        self.assertGreater(spans["generation"]["args"]["sweeps"], 0)
+        self.assertIsInstance(trace["ruleEvaluations"], list)
+
+    def test_generate_batch(self):
+        summary_path = os.path.join(self.output_tempdir.name, "summary.json")
+        args = Generate.mystery_argparse(['--seed', '0', '--seeds', '2', '--workers', '2',
+                                          '--batch_paths', str(self.abs_input_dir),
+                                          '--outputpath', self.output_tempdir.name,
+                                          '--batch_summary', summary_path])
+        # the batch and its seeds log to user_path, so keep their logs out of the repository
+        log_tempdir = TemporaryDirectory(prefix='AP_logs_')
+        Generate.Utils.user_path.cached_path = log_tempdir.name
+        try:
+            results = Generate.batch_main(args)
+        finally:
+            Generate.Utils.user_path.cached_path = str(self.generate_dir)
+            root_logger = logging.getLogger()
+            for handler in root_logger.handlers[:]:
+                if isinstance(handler, logging.FileHandler):
+                    root_logger.removeHandler(handler)
+                    handler.close()
+            log_tempdir.cleanup()
+
+        self.assertEqual(sorted(result["seed"] for result in results), [0, 1])
+        self.assertEqual(len(list(Path(self.output_tempdir.name).glob("*.zip"))), 2)
+        with open(summary_path, encoding="utf-8") as f:
+            summary = json.load(f)
+        self.assertEqual(summary["seeds"], 2)
+        self.assertEqual(summary["failed"], 0, summary["results"])
+
     def test_generate_yaml(self):
         # override host.yaml
         from settings import get_settings
@@ -108,6 +154,8 @@ class TestGenerateWeights(TestGenerateMain):
     # don't need to run these tests
     test_generate_absolute = None
     test_generate_relative = None
+    test_generate_profile = None
+    test_generate_batch = None
 
     def test_generate_yaml(self):
         from settings import get_settings
@@ -126,8 +174,8 @@ class TestGenerateWeights(TestGenerateMain):
 
         # there's likely a better way to do this, but hardcode the results from seed 1 to ensure they're always this
         expected_results = {
-            "accessibility": [0, 2, 0, 2, 2],
-            "progression_balancing": [0, 50, 99, 0, 50],
+            "accessibility": [0, 0, 0, 2, 2],
+            "progression_balancing": [0, 99, 0, 99, 0],
         }
 
         self.assertEqual(seed, 1)
@@ -137,3 +185,15 @@ class TestGenerateWeights(TestGenerateMain):
                     result, getattr(namespace, option_name)[player].value,
                     "Generated results from weights file did not match expected value."
                 )
+
+    def test_roll_workers(self):
+        """Tests that rolling the player files in worker processes gives the same results as rolling them in order."""
+        results = []
+        for roll_workers in ("1", "3"):
+            args = Generate.mystery_argparse(["--seed", "1", "--multi", "5", "--roll_workers", roll_workers,
+                                              "--player_files_path", str(self.abs_input_dir)])
+            namespace, seed = Generate.main(args)
+            results.append({option_name: {player: option.value for player, option in values.items()}
+                            for option_name, values in vars(namespace).items()
+                            if option_name in {"accessibility", "progression_balancing"}})
+        self.assertEqual(results[0], results[1])
@@ -0,0 +1,35 @@
+# Tests for Utils.is_compressible
+
+import os
+import unittest
+import zipfile
+import zlib
+from tempfile import TemporaryDirectory
+
+from Utils import is_compressible
+
+
+class TestIsCompressible(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = TemporaryDirectory(prefix="AP_compressible_")
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+
+    def write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.temp_dir.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_text(self) -> None:
+        spoiler = "\n".join(f"Location {i} (Player{i % 4}): Item {i * 7} (Player{i % 3})" for i in range(10_000))
+        self.assertTrue(is_compressible(self.write("AP_Spoiler.txt", spoiler.encode())))
+
+    def test_compressed(self) -> None:
+        data = os.urandom(2 ** 14) * 4
+        self.assertFalse(is_compressible(self.write("AP.archipelago", bytes([4]) + zlib.compress(data, 9))))
+        zip_path = os.path.join(self.temp_dir.name, "AP_P1.apcontainer")
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("patch", data)
+        self.assertFalse(is_compressible(zip_path))
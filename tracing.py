@@ -0,0 +1,214 @@
+"""
+Structured traces of a generation, written as Chrome trace-event JSON for chrome://tracing or https://ui.perfetto.dev.
+
+Main.main records one while ``--profile_out`` is given. Spans are recorded for every generation stage, world method and
+fill_restrictive call. Counters track sweeps and their duration, fill rounds, placements and swaps, state copies and
+peak memory, and the evaluations of every instrumented access_rule are counted and timed per Location and Entrance.
+While no trace is recorded, ``current`` is None and the hooks in the core classes only check that.
+"""
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import typing
+from collections import Counter
+from collections.abc import Callable, Iterator
+
+if typing.TYPE_CHECKING:
+    from BaseClasses import CollectionState, Entrance, Location, MultiWorld
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+__all__ = ["GenerationTrace", "current", "record", "span", "traced"]
+
+T = typing.TypeVar("T")
+
+current: typing.Optional["GenerationTrace"] = None
+"""The trace being recorded, if any."""
+
+
+def peak_rss() -> typing.Optional[int]:
+    """Returns the peak resident set size of this process in bytes, or None if the platform can't tell."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class CountedRule:
+    """Wraps an access_rule to count and time its evaluations. Other attributes are looked up on the wrapped rule."""
+    __slots__ = ("rule", "spot", "calls", "duration")
+    rule: Callable[["CollectionState"], bool]
+    spot: typing.Union["Location", "Entrance"]
+    calls: int
+    duration: int
+    """Total time spent in the rule in nanoseconds, including nested rules."""
+
+    def __init__(self, rule: Callable[["CollectionState"], bool], spot: typing.Union["Location", "Entrance"]) -> None:
+        self.rule = rule
+        self.spot = spot
+        self.calls = 0
+        self.duration = 0
+
+    def __call__(self, state: "CollectionState") -> bool:
+        start = time.perf_counter_ns()
+        try:
+            return self.rule(state)
+        finally:
+            self.duration += time.perf_counter_ns() - start
+            self.calls += 1
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self.rule, name)
+
+
+class GenerationTrace:
+    """Collects trace events of one generation."""
+    events: list[dict[str, typing.Any]]
+    counters: Counter[str]
+    """Running totals, like the number of sweeps, emitted as counter events at the end of every stage"""
+    rules: list[CountedRule]
+    start: int
+    pid: int
+
+    def __init__(self) -> None:
+        self.events = []
+        self.counters = Counter()
+        self.rules = []
+        self.start = time.perf_counter_ns()
+        self.pid = os.getpid()
+        self._thread_names: dict[int, str] = {}
+
+    def _timestamp(self, ns: int) -> float:
+        return (ns - self.start) / 1000
+
+    def _tid(self) -> int:
+        thread = threading.current_thread()
+        if thread.ident not in self._thread_names:
+            self._thread_names[thread.ident] = thread.name
+        return thread.ident
+
+    def add_span(self, name: str, category: str, start: int, end: int, **args: typing.Any) -> None:
+        """Adds a complete event from start to end, given in time.perf_counter_ns."""
+        event = {"name": name, "cat": category, "ph": "X", "ts": self._timestamp(start),
+                 "dur": (end - start) / 1000, "pid": self.pid, "tid": self._tid()}
+        if args:
+            event["args"] = args
+        self.events.append(event)
+
+    @contextlib.contextmanager
+    def span(self, name: str, category: str = "stage", **args: typing.Any) -> Iterator[dict[str, typing.Any]]:
+        """
+        Records the time spent in the with block. The yielded dict can be filled with more args for the event.
+        The changes of the counters during the block are added to the args.
+        Spans of the "stage" category also record the counter totals and peak memory once they end.
+        """
+        counters = self.counters.copy()
+        start = time.perf_counter_ns()
+        try:
+            yield args
+        finally:
+            end = time.perf_counter_ns()
+            for counter, value in self.counters.items():
+                if value != counters[counter]:
+                    args[counter] = round(value - counters[counter], 3)
+            if category == "stage":
+                peak = peak_rss()
+                if peak is not None:
+                    args["peak_rss_mib"] = round(peak / 2 ** 20, 1)
+                    self.add_counter("peak memory", end, rss_mib=args["peak_rss_mib"])
+                self.add_counter("totals", end, **self.counters)
+            self.add_span(name, category, start, end, **args)
+
+    def add_counter(self, name: str, ns: int, **values: float) -> None:
+        self.events.append({"name": name, "ph": "C", "ts": self._timestamp(ns), "pid": self.pid, "args": values})
+
+    def count(self, name: str, start: typing.Optional[int] = None) -> None:
+        """Counts one occurrence of name. If start is given, the time since is added to the "{name} ms" total."""
+        self.counters[name] += 1
+        if start is not None:
+            self.counters[f"{name} ms"] += (time.perf_counter_ns() - start) / 1_000_000
+
+    def instrument_rules(self, multiworld: "MultiWorld") -> None:
+        """Wraps the access_rule of every Location and Entrance that has one in a CountedRule."""
+        from BaseClasses import default_access_rule
+        for spot in [*multiworld.get_locations(), *multiworld.get_entrances()]:
+            rule = spot.access_rule
+            if rule is default_access_rule or isinstance(rule, CountedRule):
+                continue
+            counted = CountedRule(rule, spot)
+            try:
+                spot.access_rule = counted
+            except AttributeError:  # a subclass with __slots__ that overrides access_rule with a method
+                continue
+            self.rules.append(counted)
+
+    def restore_rules(self) -> None:
+        """Unwraps the access_rules wrapped by instrument_rules that weren't replaced since."""
+        for counted in self.rules:
+            if counted.spot.access_rule is counted:
+                counted.spot.access_rule = counted.rule
+
+    def rule_evaluations(self) -> list[dict[str, typing.Any]]:
+        """Returns the instrumented rules that were evaluated, most expensive first."""
+        evaluated = sorted((counted for counted in self.rules if counted.calls),
+                           key=lambda counted: counted.duration, reverse=True)
+        return [{"spot": counted.spot.name, "type": type(counted.spot).__name__, "player": counted.spot.player,
+                 "calls": counted.calls, "ms": round(counted.duration / 1_000_000, 3)} for counted in evaluated]
+
+    def to_json(self) -> dict[str, typing.Any]:
+        metadata = [{"name": "thread_name", "ph": "M", "pid": self.pid, "tid": tid, "args": {"name": name}}
+                    for tid, name in self._thread_names.items()]
+        return {
+            "traceEvents": metadata + self.events,
+            "displayTimeUnit": "ms",
+            "ruleEvaluations": self.rule_evaluations(),
+        }
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_json(), f)
+
+
+def span(name: str, category: str = "stage", **args: typing.Any) -> typing.ContextManager[dict[str, typing.Any]]:
+    """Returns GenerationTrace.span of the current trace, or a context manager that does nothing if there is none."""
+    trace = current
+    return trace.span(name, category, **args) if trace else contextlib.nullcontext({})
+
+
+def traced(category: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorates a function to record a span for each of its calls while a trace is recorded.
+    The span is named after the function and its name argument, if it was given one."""
+    def decorator(function: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(function)
+        def wrapper(*args: typing.Any, **kwargs: typing.Any) -> T:
+            trace = current
+            if not trace:
+                return function(*args, **kwargs)
+            name = kwargs.get("name")
+            with trace.span(f"{function.__name__} {name}" if name else function.__name__, category):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def record(path: str) -> Iterator[GenerationTrace]:
+    """Sets a new GenerationTrace as current for the with block, and writes it to path afterwards, even on errors."""
+    global current
+    if current is not None:
+        raise RuntimeError("Another generation trace is already being recorded.")
+    trace = current = GenerationTrace()
+    try:
+        with trace.span("generation"):
+            yield trace
+    finally:
+        current = None
+        trace.restore_rules()
+        trace.write(path)
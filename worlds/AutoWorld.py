@@ -7,12 +7,13 @@ import sys
 import time
 from random import Random
 from dataclasses import make_dataclass
-from typing import (Any, Callable, ClassVar, Dict, FrozenSet, Iterable, List, Mapping, Optional, Set, TextIO, Tuple,
-                    TYPE_CHECKING, Type, Union)
+from typing import (Any, Callable, ClassVar, Dict, FrozenSet, Iterable, Iterator, List, Mapping, Optional, Protocol,
+                    Set, TextIO, Tuple, TYPE_CHECKING, Type, Union)
 
 from Options import item_and_loc_options, ItemsAccessibility, OptionGroup, PerGameCommonOptions
-from BaseClasses import CollectionState
+from BaseClasses import CollectionState, ItemIndex
 from Utils import Version
+import tracing
 
 if TYPE_CHECKING:
     from BaseClasses import MultiWorld, Item, Location, Tutorial, Region, Entrance
@@ -26,8 +27,93 @@ class InvalidItemError(KeyError):
     pass
 
 
+class WorldSourceProtocol(Protocol):
+    path: str
+    version: Version
+
+    def load(self) -> bool: ...
+
+
+class WorldTypes(Dict[str, Type["World"]]):
+    """
+    The registered world types by game. Worlds whose game is known from their manifest are added as lazy sources, and
+    only imported once their game is looked up. Iterating the registry or taking its length imports all of them first.
+    Worlds can add logic mixins to CollectionState on import, so look up every game before creating states.
+    """
+    lazy_sources: Dict[str, WorldSourceProtocol]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.lazy_sources = {}
+
+    def add_lazy_source(self, game: str, source: WorldSourceProtocol) -> bool:
+        """Adds a source to import once game is looked up. Returns False if game is known already."""
+        if super().__contains__(game) or game in self.lazy_sources:
+            return False
+        self.lazy_sources[game] = source
+        return True
+
+    def register(self, game: str, world_type: Type[World]) -> None:
+        """Registers a newly created world type, taking the version of its lazy source if there is one."""
+        if super().__contains__(game):
+            raise RuntimeError(f"""Game {game} already registered in 
+                {self[game].__file__} when attempting to register from
+                {world_type.__file__}.""")
+        source = self.lazy_sources.pop(game, None)
+        if source:
+            world_type.world_version = source.version
+        self[game] = world_type
+
+    def __missing__(self, game: str) -> Type[World]:
+        source = self.lazy_sources.get(game)
+        if source is None:
+            raise KeyError(game)
+        source.load()
+        self.lazy_sources.pop(game, None)
+        return super().__getitem__(game)  # KeyError if the world failed to load or has a different game
+
+    def __contains__(self, game: object) -> bool:
+        return super().__contains__(game) or (game in self.lazy_sources and self.get(game) is not None)
+
+    def get(self, game: str, default: Any = None) -> Any:
+        try:
+            return self[game]
+        except KeyError:
+            return default
+
+    def load_all(self) -> None:
+        """Imports every world of a lazy source."""
+        for game in list(self.lazy_sources):
+            if game in self.lazy_sources:  # a world can import another
+                self.get(game)
+
+    def loaded(self) -> Dict[str, Type[World]]:
+        """Returns the world types that are imported already, without importing any others."""
+        return dict(super().items())
+
+    def __iter__(self) -> Iterator[str]:
+        self.load_all()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        self.load_all()
+        return super().__len__()
+
+    def keys(self):  # type: ignore[override]
+        self.load_all()
+        return super().keys()
+
+    def values(self):  # type: ignore[override]
+        self.load_all()
+        return super().values()
+
+    def items(self):  # type: ignore[override]
+        self.load_all()
+        return super().items()
+
+
 class AutoWorldRegister(type):
-    world_types: Dict[str, Type[World]] = {}
+    world_types: WorldTypes = WorldTypes()
     __file__: str
     zip_path: Optional[str]
     settings_key: str
@@ -84,11 +170,7 @@ class AutoWorldRegister(type):
         new_class = super().__new__(mcs, name, bases, dct)
         new_class.__file__ = sys.modules[new_class.__module__].__file__
         if "game" in dct:
-            if dct["game"] in AutoWorldRegister.world_types:
-                raise RuntimeError(f"""Game {dct["game"]} already registered in 
-                {AutoWorldRegister.world_types[dct["game"]].__file__} when attempting to register from
-                {new_class.__file__}.""")
-            AutoWorldRegister.world_types[dct["game"]] = new_class
+            AutoWorldRegister.world_types.register(dct["game"], new_class)
         if ".apworld" in new_class.__file__:
             new_class.zip_path = pathlib.Path(new_class.__file__).parents[1]
         if "settings_key" not in dct:
@@ -161,7 +243,13 @@ class WebWorldRegister(type):
 def _timed_call(method: Callable[..., Any], *args: Any,
                 multiworld: Optional["MultiWorld"] = None, player: Optional[int] = None) -> Any:
     start = time.perf_counter()
-    ret = method(*args)
+    trace = tracing.current
+    if trace:
+        trace_args = {"player": player, "player_name": multiworld.player_name[player]} if player and multiworld else {}
+        with trace.span(method.__qualname__, "world", **trace_args):
+            ret = method(*args)
+    else:
+        ret = method(*args)
     taken = time.perf_counter() - start
     if taken > 1.0:
         if player and multiworld:
@@ -188,6 +276,11 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
 
 
 def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
+    with tracing.span(method_name):
+        _call_all(multiworld, method_name, *args)
+
+
+def _call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types: Set[AutoWorldRegister] = set()
     for player in multiworld.player_ids:
         prev_item_count = len(multiworld.itempool)
@@ -212,6 +305,20 @@ def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
             _timed_call(stage_callable, multiworld, *args)
 
 
+def call_write_output(world_type: Type["World"], payload: Any, output_directory: str,
+                      player: int, player_name: str) -> None:
+    """Runs world_type.write_output, meant to be submitted to a process pool with a payload from prepare_output."""
+    try:
+        world_type.write_output(payload, output_directory)
+    except Exception as e:
+        message = f"Exception in {world_type.write_output} for player {player}, named {player_name}."
+        if sys.version_info >= (3, 11, 0):
+            e.add_note(message)  # PEP 678
+        else:
+            logging.error(message)
+        raise e
+
+
 class WebWorld(metaclass=WebWorldRegister):
     """Webhost integration"""
 
@@ -314,6 +421,31 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    rule_dependency_index: bool = False
+    """If True, blocked Entrances whose access_rule declares `item_dependencies` are only re-tested once one of those
+    items changes in state, instead of on every reachability update. Rules without declared dependencies are re-tested
+    as usual. This requires every change to this world's items in state to go through CollectionState.add_item(),
+    remove_item() or set_item(), access rules to be final before reachability is first evaluated, and
+    blocked_connections to only be changed by CollectionState itself, so it is not compatible with entrance_rando.
+    See worlds.generic.Rules.declare_item_dependencies."""
+
+    indexed_prog_items: bool = False
+    """If True, this world's items in CollectionState.prog_items are counted in an array indexed by item_name_to_id and
+    item_name_groups names instead of a Counter, which makes copying states and group lookups cheaper at the cost of
+    slightly slower lookups by name. Count 0 is treated like an absent item. See BaseClasses.ItemCounts."""
+
+    self_contained_logic: bool = False
+    """If True, this world's access rules only depend on this player's own items and reachability, never on another
+    player's state. Sweeps then skip the extra pass that re-checks this player's locations once no player gained
+    anything new, which is only needed for worlds whose logic looks at other players."""
+
+    compiled_region_graph: bool = False
+    """If True, this world's region graph is compiled into integer-indexed arrays once connect_entrances has run.
+    CollectionStates created afterwards search it by entrance id, keep blocked_connections as one flag per entrance
+    and pass entrances without an access_rule without testing them, so paths may differ from the regular search.
+    The graph must not change after connect_entrances, every exit must be connected to one of this player's regions,
+    and blocked_connections may only be changed through its set methods. See BaseClasses.RegionGraph."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
@@ -427,6 +559,24 @@ class World(metaclass=AutoWorldRegister):
         """
         pass
 
+    def prepare_output(self, output_directory: str) -> Any:
+        """
+        Used instead of generate_output by worlds that override write_output.
+        Like generate_output, this method gets called from a threadpool, so use self.random instead of
+        multiworld.random. It should do all work that needs the multiworld, returning a picklable payload for
+        write_output, and leave the CPU-heavy rest to write_output. Returning None skips write_output for this player.
+        """
+        return None
+
+    @classmethod
+    def write_output(cls, payload: Any, output_directory: str) -> None:
+        """
+        Writes the output files from the payload returned by prepare_output.
+        This method gets called in a separate process, so CPU-heavy patching of different players runs in parallel.
+        It has no access to the multiworld or the world instance, and changes to the payload are not sent back.
+        """
+        pass
+
     def fill_slot_data(self) -> Mapping[str, Any]:  # json of WebHostLib.models.Slot
         """
         What is returned from this function will be in the `slot_data` field
@@ -568,6 +718,15 @@ class World(metaclass=AutoWorldRegister):
     def player_name(self) -> str:
         return self.multiworld.get_player_name(self.player)
 
+    @classmethod
+    def get_item_index(cls) -> ItemIndex:
+        """Returns the ItemIndex used for this world's prog_items if indexed_prog_items is set, created on first use."""
+        item_index: Optional[ItemIndex] = cls.__dict__.get("_item_index")
+        if item_index is None:
+            item_index = ItemIndex(cls.item_name_to_id, cls.item_name_groups)
+            cls._item_index = item_index
+        return item_index
+
     @classmethod
     def get_data_package_data(cls) -> "GamesPackage":
         sorted_item_name_groups = {
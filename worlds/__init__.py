@@ -7,11 +7,13 @@ import warnings
 import zipimport
 import time
 import dataclasses
+import functools
+import hashlib
 import json
-from typing import List
+from typing import Any, Dict, Iterator, List
 
-from NetUtils import DataPackage
-from Utils import local_path, user_path, Version, version_tuple, tuplize_version
+from NetUtils import DataPackage, GamesPackage
+from Utils import cache_path, get_file_safe_name, local_path, user_path, Version, version_tuple, tuplize_version
 
 local_folder = os.path.dirname(__file__)
 user_folder = user_path("worlds") if user_path() != local_path() else user_path("custom_worlds")
@@ -50,6 +52,28 @@ class WorldSource:
             return os.path.join(local_folder, self.path)
         return self.path
 
+    @property
+    def module_name(self) -> str:
+        if self.is_zip:
+            return f"worlds.{os.path.basename(self.path).rsplit('.', 1)[0]}"
+        return f"worlds.{self.path}"
+
+    @functools.cached_property
+    def stamp(self) -> str:
+        """Fingerprint of the versions and of the modification times and sizes of the source's files."""
+        files: list[tuple[str, int, int]] = []
+        if self.is_zip:
+            stat = os.stat(self.resolved_path)
+            files.append((self.path, stat.st_mtime_ns, stat.st_size))
+        else:
+            for dirpath, dirnames, filenames in os.walk(self.resolved_path):
+                dirnames[:] = sorted(dirname for dirname in dirnames if dirname != "__pycache__")
+                for filename in sorted(filenames):
+                    file_path = os.path.join(dirpath, filename)
+                    stat = os.stat(file_path)
+                    files.append((os.path.relpath(file_path, self.resolved_path), stat.st_mtime_ns, stat.st_size))
+        return hashlib.sha1(repr((version_tuple, self.version, files)).encode()).hexdigest()
+
     def load(self) -> bool:
         try:
             start = time.perf_counter()
@@ -102,35 +126,40 @@ for folder in (folder for folder in (user_folder, local_folder) if folder):
             elif entry.is_file() and entry.name.endswith(".apworld"):
                 world_sources.append(WorldSource(file_name, is_zip=True, relative=relative))
 
-# import all submodules to trigger AutoWorldRegister
+from .AutoWorld import AutoWorldRegister
+
+
+def find_manifest(world_source: WorldSource) -> dict:
+    for dirpath, dirnames, filenames in os.walk(world_source.resolved_path):
+        for file in filenames:
+            if file.endswith("archipelago.json"):
+                with open(os.path.join(dirpath, file), mode="r", encoding="utf-8") as manifest_file:
+                    return json.load(manifest_file)
+    return {}
+
+
+# worlds with a manifest naming their game are imported once their game is looked up in AutoWorldRegister,
+# import all other submodules to trigger AutoWorldRegister
 world_sources.sort()
 apworlds: list[WorldSource] = []
+game_sources: Dict[str, WorldSource] = {}  # sources of the worlds registered by their manifest's game
 for world_source in world_sources:
     # load all loose files first:
     if world_source.is_zip:
         apworlds.append(world_source)
+        continue
+    manifest = find_manifest(world_source)
+    game = manifest.get("game")
+    if game:
+        world_source.version = tuplize_version(manifest.get("world_version", "0.0.0"))
+        if AutoWorldRegister.world_types.add_lazy_source(game, world_source):
+            game_sources[game] = world_source
+        else:
+            logging.warning(f"Did not load {world_source.path} as its game {game} is already loaded.")
+            failed_world_loads.append(os.path.basename(world_source.path))
     else:
         world_source.load()
 
-
-from .AutoWorld import AutoWorldRegister
-
-for world_source in world_sources:
-    if not world_source.is_zip:
-        # look for manifest
-        manifest = {}
-        for dirpath, dirnames, filenames in os.walk(world_source.resolved_path):
-            for file in filenames:
-                if file.endswith("archipelago.json"):
-                    with open(os.path.join(dirpath, file), mode="r", encoding="utf-8") as manifest_file:
-                        manifest = json.load(manifest_file)
-                    break
-            if manifest:
-                break
-        game = manifest.get("game")
-        if game in AutoWorldRegister.world_types:
-            AutoWorldRegister.world_types[game].world_version = tuplize_version(manifest.get("world_version", "0.0.0"))
-
 if apworlds:
     # encapsulation for namespace / gc purposes
     def load_apworlds() -> None:
@@ -175,24 +204,176 @@ if apworlds:
             key=lambda element: element[1].world_version if element[1].world_version else Version(0, 0, 0),
             reverse=True)
         for apworld_source, apworld in core_compatible:
-            if apworld.game and apworld.game in AutoWorldRegister.world_types:
+            if apworld.world_version:
+                apworld_source.version = apworld.world_version
+            if not apworld.game:
+                apworld_source.load()
+            elif AutoWorldRegister.world_types.add_lazy_source(apworld.game, apworld_source):
+                game_sources[apworld.game] = apworld_source
+            else:
                 fail_world(apworld.game,
                            f"Did not load {apworld_source.path} "
                            f"as its game {apworld.game} is already loaded.",
                            add_as_failed_to_load=False)
-            else:
-                apworld_source.load()
-                if apworld.game in AutoWorldRegister.world_types:
-                    # world could fail to load at this point
-                    if apworld.world_version:
-                        AutoWorldRegister.world_types[apworld.game].world_version = apworld.world_version
     load_apworlds()
     del load_apworlds
 
 del apworlds
 
-# Build the data package for each game.
+
+def get_game_source(game: str) -> WorldSource | None:
+    """Returns the source of the world of game, without importing it."""
+    if game in game_sources:
+        return game_sources[game]
+    world_type = AutoWorldRegister.world_types.loaded().get(game)
+    if world_type:
+        for world_source in world_sources:
+            if world_type.__module__ == world_source.module_name or \
+                    world_type.__module__.startswith(f"{world_source.module_name}."):
+                return world_source
+    return None
+
+
+class DataPackageCache:
+    """
+    Data packages built by this install, stored in the cache directory by checksum and indexed by the stamp of the
+    world source that built them. A package is built again once its source's stamp changed. Packages are kept apart
+    from the ones clients receive from servers, which have no name groups.
+    """
+    sources: Dict[str, Dict[str, Any]] | None = None
+    changed: bool = False
+    package_keys = ("checksum", "item_name_groups", "item_name_to_id", "location_name_groups", "location_name_to_id")
+
+    @property
+    def path(self) -> str:
+        return cache_path("datapackage_server", "world_sources.json")
+
+    @staticmethod
+    def package_path(game: str, checksum: str) -> str:
+        return cache_path("datapackage_server", get_file_safe_name(game), f"{get_file_safe_name(checksum)}.json")
+
+    def _get_sources(self) -> Dict[str, Dict[str, Any]]:
+        if self.sources is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.sources = json.load(f)
+            except (OSError, ValueError):
+                self.sources = {}
+        return self.sources
+
+    def get(self, source: WorldSource, game: str) -> GamesPackage | None:
+        entry = self._get_sources().get(source.resolved_path)
+        if not entry or entry["stamp"] != source.stamp or game not in entry["games"]:
+            return None
+        checksum = entry["games"][game]
+        try:
+            with open(self.package_path(game, checksum), "r", encoding="utf-8") as f:
+                package = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # the checksum in the index is trusted, as it names the file and is kept with the stamp of the source
+        if not isinstance(package, dict) or tuple(sorted(package)) != self.package_keys or \
+                package["checksum"] != checksum or \
+                not all(isinstance(package[key], dict) for key in self.package_keys[1:]):
+            logging.debug(f"Discarding invalid cached data package of {game}.")
+            return None
+        return package
+
+    def put(self, source: WorldSource, game: str, package: GamesPackage) -> None:
+        sources = self._get_sources()
+        entry = sources.get(source.resolved_path)
+        if not entry or entry["stamp"] != source.stamp:
+            entry = sources[source.resolved_path] = {"stamp": source.stamp, "games": {}}
+        package_path = self.package_path(game, package["checksum"])
+        try:
+            os.makedirs(os.path.dirname(package_path), exist_ok=True)
+            with open(package_path, "w", encoding="utf-8") as f:
+                json.dump(package, f, ensure_ascii=False, separators=(",", ":"))
+        except OSError as e:
+            logging.debug(f"Could not store data package of {game}: {e}")
+            return
+        entry["games"][game] = package["checksum"]
+        self.changed = True
+
+    def save(self) -> None:
+        if not self.changed:
+            return
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(self.sources, f)
+            os.replace(temp_path, self.path)
+            self.changed = False
+        except OSError as e:
+            logging.debug(f"Could not store data package cache: {e}")
+
+
+data_package_cache = DataPackageCache()
+
+
+class DataPackageGames(Dict[str, GamesPackage]):
+    """
+    The data package of every game, read from the data package cache or built the first time it is looked up.
+    Iterating it or taking its length gets all of them, importing only the worlds that are not cached.
+    """
+    complete: bool = False
+    building: bool = False
+
+    def __missing__(self, game: str) -> GamesPackage:
+        source = get_game_source(game)
+        package = data_package_cache.get(source, game) if source else None
+        if package is None:
+            package = AutoWorldRegister.world_types[game].get_data_package_data()
+            if source:
+                data_package_cache.put(source, game, package)
+                if not self.building:
+                    data_package_cache.save()
+        self[game] = package
+        return package
+
+    def __contains__(self, game: object) -> bool:
+        return super().__contains__(game) or self.get(game) is not None  # type: ignore[arg-type]
+
+    def get(self, game: str, default: Any = None) -> Any:
+        try:
+            return self[game]
+        except KeyError:
+            return default
+
+    def build_all(self) -> None:
+        if not self.complete:
+            self.building = True
+            try:
+                for game in [*AutoWorldRegister.world_types.loaded(), *AutoWorldRegister.world_types.lazy_sources]:
+                    self.get(game)
+                self.complete = True
+            finally:
+                self.building = False
+                data_package_cache.save()
+
+    def __iter__(self) -> Iterator[str]:
+        self.build_all()
+        return super().__iter__()
+
+    def __len__(self) -> int:
+        self.build_all()
+        return super().__len__()
+
+    def keys(self):  # type: ignore[override]
+        self.build_all()
+        return super().keys()
+
+    def values(self):  # type: ignore[override]
+        self.build_all()
+        return super().values()
+
+    def items(self):  # type: ignore[override]
+        self.build_all()
+        return super().items()
+
+
 network_data_package: DataPackage = {
-    "games": {world_name: world.get_data_package_data() for world_name, world in AutoWorldRegister.world_types.items()},
+    "games": DataPackageGames(),
 }
 
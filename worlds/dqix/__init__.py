@@ -1,7 +1,9 @@
 from typing import Optional
 
 from BaseClasses import Tutorial, Item, ItemClassification, Location, Region
+from rule_builder import Has
 from ..AutoWorld import World, WebWorld
+from ..generic.Rules import set_rule
 from .Items import DQIXItems
 from .Client import DQIXClient
 from .Locations import DQIXLocations
@@ -39,6 +41,10 @@ class DragonQuestIX(World):
     game = "Dragon Quest IX"
     required_client_version = (0, 6, 3)
     origin_region_name = "Angel Falls"
+    rule_dependency_index = True
+    indexed_prog_items = True
+    self_contained_logic = True
+    compiled_region_graph = True
     web = DragonQuestIXWeb()
 
     location_helper = DQIXLocations()
@@ -160,14 +166,14 @@ class DragonQuestIX(World):
         region_realm_of_the_mighty.add_locations(locations=self.location_helper.get_locations_for_group(region_realm_of_the_mighty.name), location_type=DQIXLocation)
 
         region_angel_falls.connect(connecting_region=region_hexagon)
-        region_angel_falls.connect(connecting_region=region_stornway, rule=lambda state: state.has(item="Inny", player=self.player, count=1))  # Maybe magic beast hide from the boss?
+        set_rule(region_angel_falls.connect(connecting_region=region_stornway), Has("Inny"))  # Maybe magic beast hide from the boss?
 
         region_stornway.connect(connecting_region=region_zere)
         region_stornway.connect(connecting_region=region_brigadoom)
         region_zere.connect(connecting_region=region_brigadoom)
         region_stornway.connect(connecting_region=region_coffinwell)
 
-        region_coffinwell.connect(connecting_region=region_quarantomb, rule=lambda state: state.has(item="Quarantomb key", player=self.player))
+        set_rule(region_coffinwell.connect(connecting_region=region_quarantomb), Has("Quarantomb key"))
         region_coffinwell.connect(connecting_region=region_alltrades_abbey)  # Has returned to the Observatory, perhaps count benevolessence?
         region_coffinwell.connect(connecting_region=region_porth_llaffan)  # Has returned to the Observatory, perhaps count benevolessence?
         region_coffinwell.connect(connecting_region=region_observatory)  # Has returned to the Observatory, perhaps count benevolessence?
@@ -178,7 +184,7 @@ class DragonQuestIX(World):
         region_alltrades_abbey.connect(connecting_region=region_tower_of_trades)
         region_alltrades_abbey.connect(connecting_region=region_porth_llaffan)
 
-        region_porth_llaffan.connect(connecting_region=region_slurry_quay, rule=lambda state: state.has(item="Fygg", player=self.player, count=1))
+        set_rule(region_porth_llaffan.connect(connecting_region=region_slurry_quay), Has("Fygg"))
         region_porth_llaffan.connect(connecting_region=region_tywll_cave)
 
         region_slurry_quay.connect(connecting_region=region_dourbridge)
@@ -197,7 +203,7 @@ class DragonQuestIX(World):
         region_ocean.connect(connecting_region=region_batsureg)
         region_ocean.connect(connecting_region=region_swinedimpels)
         region_ocean.connect(connecting_region=region_wormwood_creek)
-        region_ocean.connect(connecting_region=region_ship, rule=lambda state: state.has(item="Ultimate key", player=self.player))
+        set_rule(region_ocean.connect(connecting_region=region_ship), Has("Ultimate key"))
 
         region_gleeba.connect(connecting_region=region_plumbed_depths)
 
@@ -205,14 +211,14 @@ class DragonQuestIX(World):
 
         region_swinedimpels.connect(connecting_region=region_old_school)
 
-        region_wormwood_creek.connect(connecting_region=region_bowhole, rule=lambda state: state.has(item="Serene necklace", player=self.player))
+        set_rule(region_wormwood_creek.connect(connecting_region=region_bowhole), Has("Serene necklace"))
 
-        region_bowhole.connect(connecting_region=region_upover, rule=lambda state: state.has(item="Wyrmlight bow", player=self.player))
+        set_rule(region_bowhole.connect(connecting_region=region_upover), Has("Wyrmlight bow"))
 
         region_upover.connect(connecting_region=region_magmaroo)
-        region_upover.connect(connecting_region=region_goretress, rule=lambda state: state.has(item="Drunken Dragon", player=self.player))
+        set_rule(region_upover.connect(connecting_region=region_goretress), Has("Drunken Dragon"))
 
-        region_goretress.connect(connecting_region=region_gittingham_palace, rule=lambda state: state.has(item="Ultimate key", player=self.player, count=1))  # After boss has been defeated
+        set_rule(region_goretress.connect(connecting_region=region_gittingham_palace), Has("Ultimate key"))  # After boss has been defeated
 
         region_gittingham_palace.connect(connecting_region=region_oubliette)
         region_oubliette.connect(connecting_region=region_realm_of_the_mighty)  # After "killed" by Corvus, perhaps game chapter
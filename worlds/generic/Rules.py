@@ -2,7 +2,9 @@ import collections
 import logging
 import typing
 
-from BaseClasses import LocationProgressType, MultiWorld, Location, Region, Entrance
+from BaseClasses import LocationProgressType, MultiWorld, Location, Region, Entrance, default_access_rule, \
+    default_item_rule
+from rule_builder import Rule
 
 if typing.TYPE_CHECKING:
     import BaseClasses
@@ -69,7 +71,7 @@ def locality_rules(multiworld: MultiWorld):
             if (location.player, location.item_rule) in func_cache:
                 location.item_rule = func_cache[location.player, location.item_rule]
             # empty rule that just returns True, overwrite
-            elif location.item_rule is Location.item_rule:
+            elif location.item_rule is default_item_rule:
                 func_cache[location.player, location.item_rule] = location.item_rule = \
                     lambda i, sending_blockers = forbid_data[location.player], \
                                             old_rule = location.item_rule: \
@@ -96,26 +98,61 @@ def exclusion_rules(multiworld: MultiWorld, player: int, exclude_locations: typi
                 logging.warning(f"Unable to exclude location {loc_name} in player {player}'s world.")
 
 
-def set_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"], rule: CollectionRule):
+def compile_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"], rule: Rule) -> CollectionRule:
+    """Compiles a rule_builder Rule for the player owning spot.
+    Regions checked by the rule are registered as indirect conditions if spot is an Entrance."""
+    multiworld = spot.parent_region.multiworld
+    rule = rule.simplify()
+    if isinstance(spot, Entrance):
+        for region_name in rule.region_dependencies(multiworld.worlds[spot.player]):
+            multiworld.register_indirect_condition(multiworld.get_region(region_name, spot.player), spot)
+    return rule.compile(multiworld.worlds[spot.player])
+
+
+def set_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"],
+             rule: typing.Union[CollectionRule, Rule]):
+    if isinstance(rule, Rule):
+        rule = compile_rule(spot, rule)
     spot.access_rule = rule
 
 
-def add_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"], rule: CollectionRule, combine="and"):
+def add_rule(spot: typing.Union["BaseClasses.Location", "BaseClasses.Entrance"],
+             rule: typing.Union[CollectionRule, Rule], combine="and"):
+    if isinstance(rule, Rule):
+        rule = compile_rule(spot, rule)
     old_rule = spot.access_rule
     # empty rule, replace instead of add
-    if old_rule is Location.access_rule or old_rule is Entrance.access_rule:
+    if old_rule is default_access_rule:
         spot.access_rule = rule if combine == "and" else old_rule
     else:
         if combine == "and":
             spot.access_rule = lambda state: rule(state) and old_rule(state)
         else:
             spot.access_rule = lambda state: rule(state) or old_rule(state)
+        old_dependencies = getattr(old_rule, "item_dependencies", None)
+        new_dependencies = getattr(rule, "item_dependencies", None)
+        if old_dependencies is not None and new_dependencies is not None:
+            spot.access_rule = declare_item_dependencies(spot.access_rule, *old_dependencies, *new_dependencies)
+
+
+def declare_item_dependencies(rule: CollectionRule, *item_names: str) -> CollectionRule:
+    """Declares that the result of rule only changes when the count of one of item_names, belonging to the owning
+    player, changes. Used by worlds with World.rule_dependency_index to skip re-testing blocked Entrances.
+    Only declare dependencies for rules that do not check regions, locations, other entrances or other players' items.
+    Returns rule, wrapped in a function if it can't hold the declaration, like bound methods, so use the returned rule."""
+    try:
+        rule.item_dependencies = frozenset(item_names)  # type: ignore[attr-defined]
+    except AttributeError:
+        wrapped_rule = rule
+        rule = lambda state: wrapped_rule(state)
+        rule.item_dependencies = frozenset(item_names)  # type: ignore[attr-defined]
+    return rule
 
 
 def forbid_item(location: "BaseClasses.Location", item: str, player: int):
     old_rule = location.item_rule
     # empty rule
-    if old_rule is Location.item_rule:
+    if old_rule is default_item_rule:
         location.item_rule = lambda i: i.name != item or i.player != player
     else:
         location.item_rule = lambda i: (i.name != item or i.player != player) and old_rule(i)
@@ -135,7 +172,7 @@ def forbid_items(location: "BaseClasses.Location", items: typing.Set[str]):
 def add_item_rule(location: "BaseClasses.Location", rule: ItemRule, combine: str = "and"):
     old_rule = location.item_rule
     # empty rule, replace instead of add
-    if old_rule is Location.item_rule:
+    if old_rule is default_item_rule:
         location.item_rule = rule if combine == "and" else old_rule
     else:
         if combine == "and":
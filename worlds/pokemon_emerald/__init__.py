@@ -614,7 +614,7 @@ class PokemonEmeraldWorld(World):
 
         randomize_types(self)
 
-    def generate_output(self, output_directory: str) -> None:
+    def prepare_output(self, output_directory: str) -> Tuple[PokemonEmeraldProcedurePatch, str]:
         self.modified_trainers = copy.deepcopy(emerald_data.trainers)
         self.modified_tmhm_moves = copy.deepcopy(emerald_data.tmhm_moves)
         self.modified_legendary_encounters = copy.deepcopy(emerald_data.legendary_encounters)
@@ -654,8 +654,11 @@ class PokemonEmeraldWorld(World):
         del self.modified_starters
         del self.modified_species
 
-        # Write Output
-        out_file_name = self.multiworld.get_out_file_name_base(self.player)
+        return patch, self.multiworld.get_out_file_name_base(self.player)
+
+    @classmethod
+    def write_output(cls, payload: Tuple[PokemonEmeraldProcedurePatch, str], output_directory: str) -> None:
+        patch, out_file_name = payload
         patch.write(os.path.join(output_directory, f"{out_file_name}{patch.patch_file_ending}"))
 
     def write_spoiler(self, spoiler_handle: TextIO):
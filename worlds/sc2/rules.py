@@ -1,7 +1,7 @@
 from math import floor
 from typing import TYPE_CHECKING, Set, Optional, Callable, Dict, Tuple, Iterable
 
-from BaseClasses import CollectionState, Location
+from BaseClasses import CollectionState, default_access_rule
 from .item.item_groups import kerrigan_non_ulimates, kerrigan_logic_active_abilities
 from .item.item_names import PROGRESSIVE_PROTOSS_AIR_WEAPON, PROGRESSIVE_PROTOSS_AIR_ARMOR, PROGRESSIVE_PROTOSS_SHIELDS
 from .options import (
@@ -3595,7 +3595,7 @@ class SC2Logic:
 
     def has_race_units(self, target: int, race: SC2Race) -> Callable[["CollectionState"], bool]:
         if target == 0 or race == SC2Race.ANY:
-            return Location.access_rule
+            return default_access_rule
         result = self.unit_count_functions.get((race, target))
         if result is not None:
             return result